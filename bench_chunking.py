@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark script comparing the token-aware markdown chunker with the previous
+character-window smart_chunk_markdown.
+
+Chunks the markdown files given on the command line, or a generated document of
+CHUNK_BENCH_SIZE_MB megabytes mixing headings, prose, lists and fenced code blocks.
+Reports chunking time, the number of chunks, their size in tokens and how many
+chunks cut a fenced code block in two.
+
+Usage: python bench_chunking.py [file.md ...]
+"""
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+# Add src directory to path
+src_path = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_path))
+
+from chunking import CHARS_PER_TOKEN, chunk_markdown, get_token_counter
+
+SIZE_MB = float(os.getenv("CHUNK_BENCH_SIZE_MB", "5"))
+CHUNK_SIZE = int(os.getenv("CHUNK_BENCH_CHUNK_SIZE", "5000"))
+RUNS = 3
+
+
+def legacy_smart_chunk_markdown(text: str, chunk_size: int = 5000) -> List[str]:
+    """The character-window chunker used before the token-aware chunker."""
+    chunks = []
+    start = 0
+    text_length = len(text)
+
+    while start < text_length:
+        end = start + chunk_size
+        if end >= text_length:
+            chunks.append(text[start:].strip())
+            break
+
+        chunk = text[start:end]
+        code_block = chunk.rfind('```')
+        if code_block != -1 and code_block > chunk_size * 0.3:
+            end = start + code_block
+        elif '\n\n' in chunk:
+            last_break = chunk.rfind('\n\n')
+            if last_break > chunk_size * 0.3:
+                end = start + last_break
+        elif '. ' in chunk:
+            last_period = chunk.rfind('. ')
+            if last_period > chunk_size * 0.3:
+                end = start + last_period + 1
+
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        start = end
+
+    return chunks
+
+
+def generate_document(size_mb: float, seed: int = 0) -> str:
+    """Generate a documentation-like markdown document of about size_mb megabytes."""
+    rng = random.Random(seed)
+    words = ("crawler browser session config request response markdown vector index query "
+             "embedding chunk token server client async await result cache page link").split()
+    target = int(size_mb * 1024 * 1024)
+    parts = []
+    size = 0
+    section = 0
+    while size < target:
+        section += 1
+        blocks = [f"## Section {section}", f"### Details {section}"]
+        for _ in range(rng.randint(2, 6)):
+            kind = rng.random()
+            if kind < 0.55:
+                sentences = [" ".join(rng.choices(words, k=rng.randint(6, 20))).capitalize() + "." for _ in range(rng.randint(2, 8))]
+                blocks.append(" ".join(sentences))
+            elif kind < 0.75:
+                blocks.append("\n".join(f"- {' '.join(rng.choices(words, k=rng.randint(3, 8)))}" for _ in range(rng.randint(2, 6))))
+            else:
+                lines = [f"    {rng.choice(words)}_{i} = {rng.choice(words)}({rng.randint(0, 99)})" for i in range(rng.randint(3, 60))]
+                blocks.append("```python\ndef example():\n" + "\n".join(lines) + "\n```")
+        part = "\n\n".join(blocks) + "\n\n"
+        parts.append(part)
+        size += len(part)
+    return "# Generated documentation\n\n" + "".join(parts)
+
+
+def split_fences(chunks: List[str]) -> int:
+    """Count chunks with an odd number of fence lines, i.e. that cut a code block."""
+    return sum(
+        1 for chunk in chunks
+        if sum(1 for line in chunk.splitlines() if line.lstrip().startswith(("```", "~~~"))) % 2
+    )
+
+
+def measure(name: str, chunk: Callable[[str], List[str]], text: str, count_tokens: Callable[[str], int]) -> None:
+    """Time a chunker over RUNS runs and print statistics about its chunks."""
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        chunks = chunk(text)
+        timings.append(time.perf_counter() - start)
+    tokens = [count_tokens(c) for c in chunks]
+    print(f"  {name}:")
+    print(f"    - time: {min(timings) * 1000:.1f}ms (best of {RUNS}), {len(text) / min(timings) / 1024 / 1024:.1f} MB/s")
+    print(f"    - chunks: {len(chunks)}, tokens per chunk: median {statistics.median(tokens):.0f}, max {max(tokens)}")
+    print(f"    - chunks cutting a code block: {split_fences(chunks)}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        documents = {path: Path(path).read_text(encoding="utf-8") for path in sys.argv[1:]}
+    else:
+        documents = {f"generated ({SIZE_MB:g} MB)": generate_document(SIZE_MB)}
+
+    count_tokens = get_token_counter()
+    max_tokens = CHUNK_SIZE // CHARS_PER_TOKEN
+
+    print("Benchmarking Markdown Chunking")
+    print("=" * 50)
+    print(f"Chunk size: {CHUNK_SIZE} characters / {max_tokens} tokens")
+    for name, text in documents.items():
+        print(f"\n{name}: {len(text) / 1024 / 1024:.2f} MB")
+        measure("legacy smart_chunk_markdown", lambda t: legacy_smart_chunk_markdown(t, CHUNK_SIZE), text, count_tokens)
+        measure("chunk_markdown (tokenizer)", lambda t: chunk_markdown(t, max_tokens, count_tokens=count_tokens), text, count_tokens)
+        measure("chunk_markdown (estimated tokens)", lambda t: chunk_markdown(t, max_tokens, count_tokens=lambda s: len(s) // CHARS_PER_TOKEN + 1), text, count_tokens)
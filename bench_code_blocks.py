@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark suite for code block extraction.
+
+Compares the single-pass fence-aware extract_code_blocks with the previous
+implementation that paired ``` positions and copied the surrounding context of every
+block. Each case is a generated document shaped like a different kind of page:
+many small snippets, a few large examples, tilde and nested fences, and prose
+without code. Reports the best time over REPEATS runs, the peak memory allocated
+during extraction, and the number of blocks found.
+
+Usage: python bench_code_blocks.py [file.md ...]
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List
+
+# Add src directory to path
+src_path = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_path))
+
+from code_blocks import extract_code_blocks
+
+REPEATS = int(os.getenv("CODE_BENCH_REPEATS", "5"))
+MIN_LENGTH = int(os.getenv("CODE_BENCH_MIN_LENGTH", "200"))
+
+
+def legacy_extract_code_blocks(markdown_content: str, min_length: int = 1000) -> List[Dict[str, str]]:
+    """The ``` position pairing extractor used before the fence-aware scanner."""
+    code_blocks = []
+    content = markdown_content.strip()
+    start_offset = 3 if content.startswith('```') else 0
+
+    backtick_positions = []
+    pos = start_offset
+    while True:
+        pos = markdown_content.find('```', pos)
+        if pos == -1:
+            break
+        backtick_positions.append(pos)
+        pos += 3
+
+    i = 0
+    while i < len(backtick_positions) - 1:
+        start_pos = backtick_positions[i]
+        end_pos = backtick_positions[i + 1]
+        code_section = markdown_content[start_pos + 3:end_pos]
+        lines = code_section.split('\n', 1)
+        if len(lines) > 1:
+            first_line = lines[0].strip()
+            if first_line and ' ' not in first_line and len(first_line) < 20:
+                language = first_line
+                code_content = lines[1].strip()
+            else:
+                language = ""
+                code_content = code_section.strip()
+        else:
+            language = ""
+            code_content = code_section.strip()
+
+        if len(code_content) < min_length:
+            i += 2
+            continue
+
+        context_before = markdown_content[max(0, start_pos - 1000):start_pos].strip()
+        context_after = markdown_content[end_pos + 3:min(len(markdown_content), end_pos + 3 + 1000)].strip()
+        code_blocks.append({
+            'code': code_content,
+            'language': language,
+            'context_before': context_before,
+            'context_after': context_after,
+            'full_context': f"{context_before}\n\n{code_content}\n\n{context_after}"
+        })
+        i += 2
+
+    return code_blocks
+
+
+def prose(rng: random.Random, sentences: int) -> str:
+    words = "the crawler stores each page as markdown and splits it into chunks before embedding them".split()
+    return " ".join(" ".join(rng.choices(words, k=12)).capitalize() + "." for _ in range(sentences))
+
+
+def code(rng: random.Random, lines: int, fence: str = "```", language: str = "python") -> str:
+    body = "\n".join(f"    value_{i} = compute({rng.randint(0, 999)}, retries={rng.randint(1, 5)})" for i in range(lines))
+    return f"{fence}{language}\ndef example():\n{body}\n{fence}"
+
+
+def many_small_blocks(rng: random.Random) -> str:
+    return "\n\n".join(f"{prose(rng, 2)}\n\n{code(rng, rng.randint(2, 12), language='bash')}" for _ in range(3000))
+
+
+def few_large_blocks(rng: random.Random) -> str:
+    return "\n\n".join(f"{prose(rng, 20)}\n\n{code(rng, 400)}" for _ in range(40))
+
+
+def tilde_and_nested_fences(rng: random.Random) -> str:
+    parts = []
+    for i in range(1000):
+        if i % 3 == 0:
+            # A markdown example containing a fenced block, wrapped in a longer fence
+            parts.append(f"````markdown\n{prose(rng, 1)}\n\n{code(rng, 8)}\n````")
+        elif i % 3 == 1:
+            parts.append(code(rng, 15, fence="~~~"))
+        else:
+            parts.append(code(rng, 15))
+        parts.append(prose(rng, 3))
+    return "\n\n".join(parts)
+
+
+def prose_only(rng: random.Random) -> str:
+    return "\n\n".join(prose(rng, 8) for _ in range(4000))
+
+
+CASES: Dict[str, Callable[[random.Random], str]] = {
+    "many small blocks": many_small_blocks,
+    "few large blocks": few_large_blocks,
+    "tilde and nested fences": tilde_and_nested_fences,
+    "prose only": prose_only
+}
+
+
+def measure(name: str, extract: Callable[[str], list], text: str) -> None:
+    """Print the best time, peak allocated memory and block count of an extractor."""
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        blocks = extract(text)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    extract(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {name:<38} {min(timings) * 1000:8.2f}ms  peak {peak / 1024 / 1024:7.2f} MB  {len(blocks):5d} blocks")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        documents = {path: Path(path).read_text(encoding="utf-8") for path in sys.argv[1:]}
+    else:
+        documents = {name: generate(random.Random(0)) for name, generate in CASES.items()}
+
+    print("Benchmarking Code Block Extraction")
+    print("=" * 50)
+    print(f"Minimum code length: {MIN_LENGTH} characters, best of {REPEATS} runs")
+    for name, text in documents.items():
+        print(f"\n{name}: {len(text) / 1024 / 1024:.2f} MB")
+        measure("legacy (pairs ``` positions)", lambda t: legacy_extract_code_blocks(t, MIN_LENGTH), text)
+        measure("fence-aware scanner", lambda t: extract_code_blocks(t, MIN_LENGTH, {}), text)
+        # What store_code_examples_for_page reads: the code and both contexts of each block
+        measure("fence-aware scanner + context access",
+                lambda t: [(b.code, b.context_before, b.context_after) for b in extract_code_blocks(t, MIN_LENGTH, {})], text)
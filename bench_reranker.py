@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Benchmark script comparing the PyTorch and int8 ONNX Runtime reranking backends.
+
+Both backends rerank the same result sets through RerankExecutor, the path used by
+perform_rag_query and search_code_examples, with the score cache disabled. Reports
+latency per reranked result set and how closely the ONNX ranking agrees with PyTorch.
+
+Requires the ONNX extra: pip install -e ".[onnx]"
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+# Add src directory to path
+src_path = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_path))
+
+from reranker import RerankExecutor, load_reranking_model
+
+ITERATIONS = int(os.getenv("RERANK_BENCH_ITERATIONS", "20"))
+RESULTS_PER_QUERY = int(os.getenv("RERANK_BENCH_RESULTS", "25"))
+
+QUERIES = [
+    "how do I configure a headless browser for crawling",
+    "python async context manager example",
+    "what is reciprocal rank fusion",
+    "set up row level security in postgres",
+    "retry failed http requests with exponential backoff",
+    "parse a sitemap xml file",
+    "difference between hnsw and ivfflat indexes",
+    "stream large files without loading them into memory"
+]
+
+PASSAGES = [
+    "BrowserConfig accepts headless=True to launch Chromium without a visible window, which is the default for servers.",
+    "An async context manager defines __aenter__ and __aexit__, or can be written with contextlib.asynccontextmanager.",
+    "Reciprocal rank fusion scores each document by the sum of 1 / (k + rank) over the ranked lists it appears in.",
+    "Enable row level security with ALTER TABLE ... ENABLE ROW LEVEL SECURITY and add policies for each role.",
+    "Exponential backoff doubles the wait between retries, usually with jitter, until a maximum number of attempts.",
+    "A sitemap is an XML document listing <url><loc> entries; a sitemap index lists other sitemaps instead.",
+    "HNSW builds a layered proximity graph with better recall per query, ivfflat clusters vectors into lists and scans the nearest ones.",
+    "Reading a file in fixed-size chunks inside a loop keeps memory usage constant regardless of the file size.",
+    "The crawler caches responses on disk unless CacheMode.BYPASS is passed in the run configuration.",
+    "pgvector supports cosine, inner product and euclidean distance operators on vector columns.",
+    "Supabase exposes Postgres functions over HTTP through PostgREST remote procedure calls.",
+    "Markdown headings start with one to six hash characters followed by a space.",
+    "The event loop runs coroutines cooperatively; blocking calls should be moved to a thread pool.",
+    "Tokenizers split text into subword units before it is passed to a transformer model.",
+    "Gzip-compressed responses can be decompressed incrementally with zlib.decompressobj.",
+    "Connection pools reuse open database connections instead of creating one per request.",
+    "robots.txt files tell crawlers which paths of a site they may fetch.",
+    "Cross-encoders score a query and a document jointly and are more accurate than bi-encoders for reranking.",
+    "Environment variables are read with os.getenv and can be loaded from a .env file with python-dotenv.",
+    "A generator function yields values lazily and keeps its state between calls to next().",
+    "JSONB columns store parsed JSON and support GIN indexes for containment queries.",
+    "Chunking splits long documents into pieces that fit the embedding model's context window.",
+    "Rate limits are commonly enforced with a token bucket refilled at a fixed rate.",
+    "Docker images are built from a Dockerfile and can expose ports with the EXPOSE instruction.",
+    "Neo4j stores data as nodes and relationships and is queried with the Cypher language."
+]
+
+
+def make_result_sets() -> List[List[Dict[str, str]]]:
+    """Create one result set per query, rotating the passages so every set is ordered differently."""
+    result_sets = []
+    for q, _ in enumerate(QUERIES):
+        results = []
+        for i in range(RESULTS_PER_QUERY):
+            passage = PASSAGES[(i + q * 3) % len(PASSAGES)]
+            results.append({"id": i, "content": passage})
+        result_sets.append(results)
+    return result_sets
+
+
+def kendall_tau(first: List[int], second: List[int]) -> float:
+    """Kendall rank correlation between two orderings of the same ids."""
+    position = {item: i for i, item in enumerate(second)}
+    concordant = discordant = 0
+    for i in range(len(first)):
+        for j in range(i + 1, len(first)):
+            if position[first[i]] < position[first[j]]:
+                concordant += 1
+            else:
+                discordant += 1
+    pairs = concordant + discordant
+    return (concordant - discordant) / pairs if pairs else 1.0
+
+
+async def run_backend(backend: str, result_sets: List[List[Dict[str, str]]]):
+    """Rerank every result set ITERATIONS times and return per-call latencies and the final rankings."""
+    start = time.perf_counter()
+    reranker = RerankExecutor(load_reranking_model(backend), cache_size=0)
+    load_seconds = time.perf_counter() - start
+
+    # Warm up the model so one-off initialization is not measured
+    await reranker.rerank(QUERIES[0], [dict(r) for r in result_sets[0]])
+
+    latencies = []
+    rankings = []
+    for _ in range(ITERATIONS):
+        rankings = []
+        for query, results in zip(QUERIES, result_sets):
+            start = time.perf_counter()
+            reranked = await reranker.rerank(query, [dict(r) for r in results])
+            latencies.append(time.perf_counter() - start)
+            rankings.append([r["id"] for r in reranked])
+    reranker.close()
+    return load_seconds, latencies, rankings
+
+
+def report(backend: str, load_seconds: float, latencies: List[float]) -> None:
+    latencies = sorted(latencies)
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+    print(f"{backend:>5}: load {load_seconds:.2f}s, "
+          f"median {statistics.median(latencies) * 1000:.1f}ms, "
+          f"p95 {p95 * 1000:.1f}ms per {RESULTS_PER_QUERY} results")
+
+
+async def main() -> None:
+    print("Benchmarking Reranking Backends")
+    print("=" * 50)
+    result_sets = make_result_sets()
+
+    torch_load, torch_latencies, torch_rankings = await run_backend("torch", result_sets)
+    report("torch", torch_load, torch_latencies)
+    onnx_load, onnx_latencies, onnx_rankings = await run_backend("onnx", result_sets)
+    report("onnx", onnx_load, onnx_latencies)
+
+    speedup = statistics.median(torch_latencies) / statistics.median(onnx_latencies)
+    top1 = sum(t[0] == o[0] for t, o in zip(torch_rankings, onnx_rankings)) / len(QUERIES)
+    top5 = statistics.mean(len(set(t[:5]) & set(o[:5])) / 5 for t, o in zip(torch_rankings, onnx_rankings))
+    tau = statistics.mean(kendall_tau(t, o) for t, o in zip(torch_rankings, onnx_rankings))
+
+    print("\nRanking agreement (onnx vs torch)")
+    print(f"  - Top-1 match: {top1:.0%}")
+    print(f"  - Top-5 overlap: {top5:.0%}")
+    print(f"  - Kendall tau: {tau:.3f}")
+    print(f"\nONNX median speedup: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
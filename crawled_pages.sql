@@ -4,6 +4,7 @@ create extension if not exists vector;
 -- Drop tables if they exist (to allow rerunning the script)
 drop table if exists crawled_pages;
 drop table if exists code_examples;
+drop table if exists crawl_metadata;
 drop table if exists sources;
 
 -- Create the sources table
@@ -24,6 +25,7 @@ create table crawled_pages (
     metadata jsonb not null default '{}'::jsonb,
     source_id text not null,
     embedding vector(768),  -- Default: OpenAI (1536), Ollama varies (768 for nomic-embed-text, 1024 for mxbai-embed-large)
+    content_tsv tsvector generated always as (to_tsvector('english', content)) stored,  -- Lexemes for keyword search
     created_at timestamp with time zone default timezone('utc'::text, now()) not null,
     
     -- Add a unique constraint to prevent duplicate chunks for the same URL
@@ -33,8 +35,10 @@ create table crawled_pages (
     foreign key (source_id) references sources(source_id)
 );
 
--- Create an index for better vector similarity search performance
-create index on crawled_pages using ivfflat (embedding vector_cosine_ops);
+-- Create an index for better vector similarity search performance.
+-- HNSW does not need existing rows to build a good index, unlike ivfflat whose lists are
+-- computed from the rows present at build time (see rebuild_vector_indexes below).
+create index idx_crawled_pages_embedding on crawled_pages using hnsw (embedding vector_cosine_ops) with (m = 16, ef_construction = 64);
 
 -- Create an index on metadata for faster filtering
 create index idx_crawled_pages_metadata on crawled_pages using gin (metadata);
@@ -43,11 +47,14 @@ create index idx_crawled_pages_metadata on crawled_pages using gin (metadata);
 CREATE INDEX idx_crawled_pages_source_id ON crawled_pages (source_id);
 
 -- Create a function to search for documentation chunks
+drop function if exists match_crawled_pages(vector, int, jsonb, text);
 create or replace function match_crawled_pages (
   query_embedding vector(768),
   match_count int default 10,
   filter jsonb DEFAULT '{}'::jsonb,
-  source_filter text DEFAULT NULL
+  source_filter text DEFAULT NULL,
+  ef_search int DEFAULT NULL,
+  probes int DEFAULT NULL
 ) returns table (
   id bigint,
   url varchar,
@@ -61,6 +68,13 @@ language plpgsql
 as $$
 #variable_conflict use_column
 begin
+  -- Per-query recall/latency trade-off for HNSW (ef_search) and ivfflat (probes) indexes
+  if ef_search is not null then
+    perform set_config('hnsw.ef_search', ef_search::text, true);
+  end if;
+  if probes is not null then
+    perform set_config('ivfflat.probes', probes::text, true);
+  end if;
   return query
   select
     id,
@@ -78,6 +92,123 @@ begin
 end;
 $$;
 
+-- Create a full-text index for keyword search over documentation chunks
+create index idx_crawled_pages_content_tsv on crawled_pages using gin (content_tsv);
+
+-- Create a function for keyword search over documentation chunks, ranked by cover density
+create or replace function keyword_match_crawled_pages (
+  query_text text,
+  match_count int default 10,
+  filter jsonb DEFAULT '{}'::jsonb,
+  source_filter text DEFAULT NULL
+) returns table (
+  id bigint,
+  url varchar,
+  chunk_number integer,
+  content text,
+  metadata jsonb,
+  source_id text,
+  rank float
+)
+language sql stable
+as $$
+  select
+    cp.id,
+    cp.url,
+    cp.chunk_number,
+    cp.content,
+    cp.metadata,
+    cp.source_id,
+    ts_rank_cd(cp.content_tsv, websearch_to_tsquery('english', query_text))::float as rank
+  from crawled_pages cp
+  where cp.content_tsv @@ websearch_to_tsquery('english', query_text)
+    and cp.metadata @> filter
+    and (source_filter is null or cp.source_id = source_filter)
+  order by rank desc
+  limit match_count;
+$$;
+
+-- Create a function for hybrid search over documentation chunks.
+-- Vector and full-text matches are ranked separately and fused with reciprocal rank fusion
+-- (score = sum of 1 / (rrf_k + rank)), so chunks found by both searches come first.
+drop function if exists hybrid_match_crawled_pages(text, vector, int, jsonb, text, int);
+create or replace function hybrid_match_crawled_pages (
+  query_text text,
+  query_embedding vector(768),
+  match_count int default 10,
+  filter jsonb DEFAULT '{}'::jsonb,
+  source_filter text DEFAULT NULL,
+  rrf_k int default 60,
+  ef_search int DEFAULT NULL,
+  probes int DEFAULT NULL
+) returns table (
+  id bigint,
+  url varchar,
+  chunk_number integer,
+  content text,
+  metadata jsonb,
+  source_id text,
+  similarity float,
+  rrf_score float
+)
+language plpgsql
+as $$
+#variable_conflict use_column
+begin
+  -- Per-query recall/latency trade-off for HNSW (ef_search) and ivfflat (probes) indexes
+  if ef_search is not null then
+    perform set_config('hnsw.ef_search', ef_search::text, true);
+  end if;
+  if probes is not null then
+    perform set_config('ivfflat.probes', probes::text, true);
+  end if;
+  return query
+    with vector_matches as (
+      select
+        cp.id,
+        row_number() over (order by cp.embedding <=> query_embedding) as rank_ix
+      from crawled_pages cp
+      where cp.metadata @> filter
+        and (source_filter is null or cp.source_id = source_filter)
+      order by rank_ix
+      limit match_count * 2
+    ),
+    keyword_matches as (
+      select
+        cp.id,
+        row_number() over (
+          order by ts_rank_cd(cp.content_tsv, websearch_to_tsquery('english', query_text)) desc
+        ) as rank_ix
+      from crawled_pages cp
+      where cp.content_tsv @@ websearch_to_tsquery('english', query_text)
+        and cp.metadata @> filter
+        and (source_filter is null or cp.source_id = source_filter)
+      order by rank_ix
+      limit match_count * 2
+    ),
+    fused as (
+      select
+        coalesce(v.id, k.id) as id,
+        (coalesce(1.0 / (rrf_k + v.rank_ix), 0.0) + coalesce(1.0 / (rrf_k + k.rank_ix), 0.0))::float as rrf_score
+      from vector_matches v
+      full outer join keyword_matches k on v.id = k.id
+    )
+    select
+      cp.id,
+      cp.url,
+      cp.chunk_number,
+      cp.content,
+      cp.metadata,
+      cp.source_id,
+      1 - (cp.embedding <=> query_embedding) as similarity,
+      f.rrf_score
+    from fused f
+    join crawled_pages cp on cp.id = f.id
+    order by f.rrf_score desc
+    limit match_count;
+end;
+$$;
+
 -- Enable RLS on the crawled_pages table
 alter table crawled_pages enable row level security;
 
@@ -108,6 +239,7 @@ create table code_examples (
     metadata jsonb not null default '{}'::jsonb,
     source_id text not null,
     embedding vector(768),  -- Default: OpenAI (1536), Ollama varies (768 for nomic-embed-text, 1024 for mxbai-embed-large)
+    content_tsv tsvector generated always as (to_tsvector('english', content || ' ' || summary)) stored,  -- Lexemes for keyword search
     created_at timestamp with time zone default timezone('utc'::text, now()) not null,
     
     -- Add a unique constraint to prevent duplicate chunks for the same URL
@@ -117,8 +249,10 @@ create table code_examples (
     foreign key (source_id) references sources(source_id)
 );
 
--- Create an index for better vector similarity search performance
-create index on code_examples using ivfflat (embedding vector_cosine_ops);
+-- Create an index for better vector similarity search performance.
+-- HNSW does not need existing rows to build a good index, unlike ivfflat whose lists are
+-- computed from the rows present at build time (see rebuild_vector_indexes below).
+create index idx_code_examples_embedding on code_examples using hnsw (embedding vector_cosine_ops) with (m = 16, ef_construction = 64);
 
 -- Create an index on metadata for faster filtering
 create index idx_code_examples_metadata on code_examples using gin (metadata);
@@ -127,11 +261,14 @@ create index idx_code_examples_metadata on code_examples using gin (metadata);
 CREATE INDEX idx_code_examples_source_id ON code_examples (source_id);
 
 -- Create a function to search for code examples
+drop function if exists match_code_examples(vector, int, jsonb, text);
 create or replace function match_code_examples (
   query_embedding vector(768),
   match_count int default 10,
   filter jsonb DEFAULT '{}'::jsonb,
-  source_filter text DEFAULT NULL
+  source_filter text DEFAULT NULL,
+  ef_search int DEFAULT NULL,
+  probes int DEFAULT NULL
 ) returns table (
   id bigint,
   url varchar,
@@ -146,6 +283,13 @@ language plpgsql
 as $$
 #variable_conflict use_column
 begin
+  -- Per-query recall/latency trade-off for HNSW (ef_search) and ivfflat (probes) indexes
+  if ef_search is not null then
+    perform set_config('hnsw.ef_search', ef_search::text, true);
+  end if;
+  if probes is not null then
+    perform set_config('ivfflat.probes', probes::text, true);
+  end if;
   return query
   select
     id,
@@ -164,6 +308,125 @@ begin
 end;
 $$;
 
+-- Create a full-text index for keyword search over code examples and their summaries
+create index idx_code_examples_content_tsv on code_examples using gin (content_tsv);
+
+-- Create a function for keyword search over code examples, ranked by cover density
+create or replace function keyword_match_code_examples (
+  query_text text,
+  match_count int default 10,
+  filter jsonb DEFAULT '{}'::jsonb,
+  source_filter text DEFAULT NULL
+) returns table (
+  id bigint,
+  url varchar,
+  chunk_number integer,
+  content text,
+  summary text,
+  metadata jsonb,
+  source_id text,
+  rank float
+)
+language sql stable
+as $$
+  select
+    ce.id,
+    ce.url,
+    ce.chunk_number,
+    ce.content,
+    ce.summary,
+    ce.metadata,
+    ce.source_id,
+    ts_rank_cd(ce.content_tsv, websearch_to_tsquery('english', query_text))::float as rank
+  from code_examples ce
+  where ce.content_tsv @@ websearch_to_tsquery('english', query_text)
+    and ce.metadata @> filter
+    and (source_filter is null or ce.source_id = source_filter)
+  order by rank desc
+  limit match_count;
+$$;
+
+-- Create a function for hybrid search over code examples, fused with reciprocal rank fusion
+drop function if exists hybrid_match_code_examples(text, vector, int, jsonb, text, int);
+create or replace function hybrid_match_code_examples (
+  query_text text,
+  query_embedding vector(768),
+  match_count int default 10,
+  filter jsonb DEFAULT '{}'::jsonb,
+  source_filter text DEFAULT NULL,
+  rrf_k int default 60,
+  ef_search int DEFAULT NULL,
+  probes int DEFAULT NULL
+) returns table (
+  id bigint,
+  url varchar,
+  chunk_number integer,
+  content text,
+  summary text,
+  metadata jsonb,
+  source_id text,
+  similarity float,
+  rrf_score float
+)
+language plpgsql
+as $$
+#variable_conflict use_column
+begin
+  -- Per-query recall/latency trade-off for HNSW (ef_search) and ivfflat (probes) indexes
+  if ef_search is not null then
+    perform set_config('hnsw.ef_search', ef_search::text, true);
+  end if;
+  if probes is not null then
+    perform set_config('ivfflat.probes', probes::text, true);
+  end if;
+  return query
+    with vector_matches as (
+      select
+        ce.id,
+        row_number() over (order by ce.embedding <=> query_embedding) as rank_ix
+      from code_examples ce
+      where ce.metadata @> filter
+        and (source_filter is null or ce.source_id = source_filter)
+      order by rank_ix
+      limit match_count * 2
+    ),
+    keyword_matches as (
+      select
+        ce.id,
+        row_number() over (
+          order by ts_rank_cd(ce.content_tsv, websearch_to_tsquery('english', query_text)) desc
+        ) as rank_ix
+      from code_examples ce
+      where ce.content_tsv @@ websearch_to_tsquery('english', query_text)
+        and ce.metadata @> filter
+        and (source_filter is null or ce.source_id = source_filter)
+      order by rank_ix
+      limit match_count * 2
+    ),
+    fused as (
+      select
+        coalesce(v.id, k.id) as id,
+        (coalesce(1.0 / (rrf_k + v.rank_ix), 0.0) + coalesce(1.0 / (rrf_k + k.rank_ix), 0.0))::float as rrf_score
+      from vector_matches v
+      full outer join keyword_matches k on v.id = k.id
+    )
+    select
+      ce.id,
+      ce.url,
+      ce.chunk_number,
+      ce.content,
+      ce.summary,
+      ce.metadata,
+      ce.source_id,
+      1 - (ce.embedding <=> query_embedding) as similarity,
+      f.rrf_score
+    from fused f
+    join code_examples ce on ce.id = f.id
+    order by f.rrf_score desc
+    limit match_count;
+end;
+$$;
+
 -- Enable RLS on the code_examples table
 alter table code_examples enable row level security;
 
@@ -172,4 +435,62 @@ create policy "Allow public read access to code_examples"
   on code_examples
   for select
   to public
-  using (true);
\ No newline at end of file
+  using (true);
+
+-- Create the crawl metadata table used by incremental re-crawls
+create table crawl_metadata (
+    url varchar primary key,
+    content_hash text,  -- SHA-256 of the page markdown at the last incremental crawl
+    etag text,  -- ETag response header at the last crawl
+    last_modified text,  -- Last-Modified response header at the last crawl
+    sitemap_lastmod text,  -- <lastmod> value from the sitemap at the last crawl
+    updated_at timestamp with time zone default timezone('utc'::text, now()) not null
+);
+
+-- Enable RLS on the crawl_metadata table
+alter table crawl_metadata enable row level security;
+
+-- Create a policy that allows anyone to read crawl_metadata
+create policy "Allow public read access to crawl_metadata"
+  on crawl_metadata
+  for select
+  to public
+  using (true);
+
+-- Rebuild the vector indexes of crawled_pages and code_examples.
+-- Use 'hnsw' (default) for an index that stays accurate as the tables grow, or 'ivfflat'
+-- after a bulk load to size the ivfflat lists to the current row count
+-- (rows / 1000 up to one million rows, sqrt(rows) above, as recommended by pgvector).
+-- Run with: select rebuild_vector_indexes('ivfflat');
+create or replace function rebuild_vector_indexes (
+  index_method text default 'hnsw'
+) returns void
+language plpgsql
+as $$
+declare
+  table_name text;
+  row_count bigint;
+  lists int;
+begin
+  if index_method not in ('hnsw', 'ivfflat') then
+    raise exception 'index_method must be hnsw or ivfflat, got %', index_method;
+  end if;
+
+  foreach table_name in array array['crawled_pages', 'code_examples'] loop
+    execute format('drop index if exists %I', 'idx_' || table_name || '_embedding');
+    if index_method = 'hnsw' then
+      execute format(
+        'create index %I on %I using hnsw (embedding vector_cosine_ops) with (m = 16, ef_construction = 64)',
+        'idx_' || table_name || '_embedding', table_name
+      );
+    else
+      execute format('select count(*) from %I', table_name) into row_count;
+      lists := greatest(10, case when row_count <= 1000000 then row_count / 1000 else sqrt(row_count)::int end);
+      execute format(
+        'create index %I on %I using ivfflat (embedding vector_cosine_ops) with (lists = %s)',
+        'idx_' || table_name || '_embedding', table_name, lists
+      );
+    end if;
+  end loop;
+end;
+$$;
@@ -0,0 +1,326 @@
+"""
+Pool of headless browsers shared by the crawl tools of the Crawl4AI MCP server.
+
+Each crawl call leases a session on one of the pool's browsers, so a long
+smart_crawl_url no longer blocks a concurrent crawl_single_page. Calls go to the
+least busy browser, more browsers are launched as load grows, and when every
+session is taken, waiting calls are served by priority, then in arrival order.
+Browsers are restarted after a number of pages, when their memory grows past a
+threshold, or when a crawl call on them fails.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Minimum seconds between two measurements of the browsers' memory
+MEMORY_CHECK_INTERVAL = 5.0
+
+
+@dataclass(eq=False)
+class _Browser:
+    crawler: Any
+    pages: int = 0
+    leases: int = 0
+    retiring: bool = False
+
+
+class BrowserPool:
+    """Fixed-size pool of AsyncWebCrawler instances created on demand and recycled when unhealthy."""
+
+    def __init__(
+        self,
+        create: Callable[[], Awaitable[Any]],
+        close: Callable[[Any], Awaitable[None]],
+        size: int = 2,
+        max_sessions: int = 10,
+        max_pages: int = 500,
+        max_memory_mb: float = 0
+    ):
+        """
+        Create an empty pool.
+
+        Args:
+            create: Coroutine function launching a browser
+            close: Coroutine function shutting a browser down
+            size: Maximum number of browsers running at once
+            max_sessions: Maximum number of concurrent crawl calls per browser
+            max_pages: Pages crawled by a browser before it is restarted (0 for no limit)
+            max_memory_mb: Average browser memory in MB above which a browser is restarted (0 for no limit)
+        """
+        self.size = max(1, size)
+        self.max_sessions = max(1, max_sessions)
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self._create = create
+        self._close = close
+
+        # Running browsers, including retiring ones that still serve their last calls
+        self._browsers: Set[_Browser] = set()
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        # Browsers running or being launched, not counting retiring ones
+        self._open = 0
+        self._starting = 0
+        self._tasks: Set[asyncio.Task] = set()
+        self._memory_checked_at = 0.0
+
+        self.pages_crawled = 0
+        self.recycled = 0
+
+    def crawler(self, priority: int, fetcher: Optional[Any] = None) -> "PooledCrawler":
+        """
+        Get a crawler whose calls run on browsers leased from this pool.
+
+        Args:
+            priority: Scheduling priority of the calls (lower values are served first)
+            fetcher: Optional StaticFetcher tried before the browser for each page
+        """
+        return PooledCrawler(self, priority, fetcher)
+
+    @asynccontextmanager
+    async def lease(self, priority: int) -> AsyncIterator[_Browser]:
+        """
+        Lease a browser session for the duration of the block.
+
+        The caller adds the number of pages it crawled to the leased browser's pages.
+        If the block raises, the browser is assumed broken and restarted.
+        """
+        browser = await self._acquire(priority)
+        healthy = False
+        try:
+            yield browser
+            healthy = True
+        except (asyncio.CancelledError, GeneratorExit):
+            # The caller gave up, the browser itself is fine
+            healthy = True
+            raise
+        finally:
+            self._release(browser, healthy)
+
+    def warmup(self) -> None:
+        """Launch the first browser in the background."""
+        if self._open == 0:
+            self._start_browser()
+
+    async def _acquire(self, priority: int) -> _Browser:
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self._dispatch()
+        try:
+            return await future
+        except asyncio.CancelledError:
+            # Hand back a browser that was assigned just before the caller was cancelled
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self._release(future.result(), healthy=True)
+            else:
+                future.cancel()
+            raise
+
+    def _least_busy(self) -> Optional[_Browser]:
+        available = [b for b in self._browsers if not b.retiring and b.leases < self.max_sessions]
+        return min(available, key=lambda b: b.leases, default=None)
+
+    def _dispatch(self) -> None:
+        # Hand sessions on the least busy browsers to the highest-priority waiters
+        while self._waiters:
+            future = self._waiters[0][2]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            browser = self._least_busy()
+            if browser is None:
+                break
+            heapq.heappop(self._waiters)
+            browser.leases += 1
+            future.set_result(browser)
+            # Spread load over more browsers once every running browser is busy
+            if browser.leases > 1 and self._starting == 0 and self._open < self.size:
+                self._start_browser()
+
+        # Launch browsers for the calls that could not get a session, up to the pool size
+        waiting = sum(1 for _, _, future in self._waiters if not future.done())
+        while self._starting < waiting and self._open < self.size:
+            self._start_browser()
+
+    def _start_browser(self) -> None:
+        self._open += 1
+        self._starting += 1
+        self._track(self._launch())
+
+    def _track(self, coroutine: Awaitable[None]) -> None:
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _launch(self) -> None:
+        try:
+            crawler = await self._create()
+        except Exception as e:
+            self._open -= 1
+            self._starting -= 1
+            print(f"Failed to start browser: {e}")
+            # Fail one waiter rather than retrying forever when the browser cannot start
+            while self._waiters:
+                _, _, future = heapq.heappop(self._waiters)
+                if not future.done():
+                    future.set_exception(e)
+                    break
+            self._dispatch()
+            return
+
+        self._starting -= 1
+        self._browsers.add(_Browser(crawler))
+        self._dispatch()
+
+    def _release(self, browser: _Browser, healthy: bool) -> None:
+        if browser not in self._browsers:
+            return
+        browser.leases -= 1
+        if not browser.retiring and (not healthy or self._needs_recycling(browser)):
+            # Stop handing out the browser and replace it; it closes once its last call returns
+            browser.retiring = True
+            self.recycled += 1
+            self._open -= 1
+        if browser.retiring and browser.leases == 0:
+            self._browsers.discard(browser)
+            self._track(self._shutdown(browser))
+        self._dispatch()
+
+    def _needs_recycling(self, browser: _Browser) -> bool:
+        if self.max_pages and browser.pages >= self.max_pages:
+            return True
+        if self.max_memory_mb and psutil is not None:
+            # Scanning the process tree is not free, so reuse the last measurement for a while
+            now = time.monotonic()
+            if now - self._memory_checked_at >= MEMORY_CHECK_INTERVAL:
+                self._memory_checked_at = now
+                memory_mb = _browser_memory_mb()
+                return memory_mb is not None and memory_mb / max(1, len(self._browsers)) > self.max_memory_mb
+        return False
+
+    async def _shutdown(self, browser: _Browser) -> None:
+        try:
+            await self._close(browser.crawler)
+        except Exception as e:
+            print(f"Error closing browser: {e}")
+
+    async def close(self) -> None:
+        """Wait for browsers being launched, then close every browser."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+        browsers, self._browsers = list(self._browsers), set()
+        self._open = 0
+        await asyncio.gather(*(self._shutdown(browser) for browser in browsers))
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the number of running, busy and starting browsers, waiting calls and recycling counters."""
+        return {
+            "size": self.size,
+            "running": len(self._browsers),
+            "busy_sessions": sum(browser.leases for browser in self._browsers),
+            "starting": self._starting,
+            "waiting": sum(1 for _, _, future in self._waiters if not future.done()),
+            "pages_crawled": self.pages_crawled,
+            "recycled": self.recycled
+        }
+
+
+class PooledCrawler:
+    """
+    Stand-in for AsyncWebCrawler that runs each arun/arun_many call on a leased browser.
+
+    A browser is only held for the duration of one call, so long crawls made of many
+    calls (e.g. one arun_many per depth level) share the pool with other tool calls.
+    With a StaticFetcher, pages are first fetched over plain HTTP and only the ones
+    that need JavaScript are rendered in a browser.
+    """
+
+    def __init__(self, pool: BrowserPool, priority: int, fetcher: Optional[Any] = None):
+        self.pool = pool
+        self.fetcher = fetcher
+        self._priority = priority
+
+    async def arun(self, url: str, config: Any = None, **kwargs) -> Any:
+        """Crawl a single URL, on a leased browser unless the page can be fetched without one."""
+        if self.fetcher:
+            result = await self.fetcher.fetch(url)
+            if result is not None:
+                return result
+        async with self.pool.lease(self._priority) as browser:
+            result = await browser.crawler.arun(url=url, config=config, **kwargs)
+            self._count(browser, 1)
+        return result
+
+    async def arun_many(self, urls: List[str], config: Any = None, **kwargs) -> Any:
+        """Crawl several URLs on a leased browser, returning an async iterator if config.stream is set."""
+        if getattr(config, "stream", False):
+            return self._stream_many(urls, config, **kwargs)
+
+        results = []
+        remaining = urls
+        if self.fetcher:
+            fetched = await asyncio.gather(*(self.fetcher.fetch(url) for url in urls))
+            results = [result for result in fetched if result is not None]
+            remaining = [url for url, result in zip(urls, fetched) if result is None]
+        if not remaining:
+            return results
+
+        async with self.pool.lease(self._priority) as browser:
+            browser_results = await browser.crawler.arun_many(urls=remaining, config=config, **kwargs)
+            self._count(browser, len(remaining))
+        return results + list(browser_results)
+
+    async def _stream_many(self, urls: List[str], config: Any, **kwargs) -> AsyncIterator[Any]:
+        remaining = urls
+        if self.fetcher:
+            remaining = []
+            fetches = [asyncio.ensure_future(self._fetch(url)) for url in urls]
+            try:
+                for next_fetch in asyncio.as_completed(fetches):
+                    url, result = await next_fetch
+                    if result is None:
+                        remaining.append(url)
+                    else:
+                        yield result
+            finally:
+                for fetch in fetches:
+                    fetch.cancel()
+        if not remaining:
+            return
+
+        # The browser stays leased until the stream is exhausted or closed
+        async with self.pool.lease(self._priority) as browser:
+            async for result in await browser.crawler.arun_many(urls=remaining, config=config, **kwargs):
+                self._count(browser, 1)
+                yield result
+
+    async def _fetch(self, url: str) -> Tuple[str, Any]:
+        return url, await self.fetcher.fetch(url)
+
+    def _count(self, browser: _Browser, pages: int) -> None:
+        browser.pages += pages
+        self.pool.pages_crawled += pages
+
+
+def _browser_memory_mb() -> Optional[float]:
+    """Get the combined resident memory in MB of this process's child processes (the browsers)."""
+    try:
+        children = psutil.Process().children(recursive=True)
+    except psutil.Error:
+        return None
+    total = 0
+    for child in children:
+        try:
+            total += child.memory_info().rss
+        except psutil.Error:
+            continue
+    return total / (1024 * 1024)
@@ -0,0 +1,376 @@
+"""
+Token-aware markdown chunking for the Crawl4AI MCP server.
+
+A document is scanned once and split into blocks (headings, fenced code blocks and
+paragraphs), each measured once with the embedding model's tokenizer. Blocks are then
+packed into chunks up to a token budget. Fenced code blocks are never split, chunks
+preferably start at a heading, and consecutive chunks can overlap by trailing blocks,
+the earliest of which is cut at a sentence or word when only its end fits.
+The heading breadcrumb and size of each chunk are tracked in the same pass.
+"""
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Rough number of characters per token, used when no tokenizer is available
+CHARS_PER_TOKEN = 4
+
+# Start a new chunk at a heading once the current chunk is filled past this fraction
+HEADING_BREAK_RATIO = 0.3
+
+_FENCE_OPEN = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+_HEADING = re.compile(r"^ {0,3}(#{1,6})(?:[ \t]+|$)")
+_BLOCK_START_CHARS = ("`", "~", "#", " ")
+_CLOSING_HASHES = re.compile(r"\s+#+$")
+
+# Separator between the headings of a section path
+SECTION_PATH_SEPARATOR = " > "
+# Sentence ends and line breaks, where oversized paragraphs are split
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD_BREAK = re.compile(r"\s+")
+
+
+@dataclass
+class Block:
+    """A heading, fenced code block or paragraph, as offsets into the document."""
+    kind: str
+    start: int
+    end: int
+    tokens: int
+    words: int
+    # Titles of the enclosing headings, including the block itself for headings
+    path: Tuple[str, ...] = ()
+    level: int = 0
+
+
+@dataclass
+class Chunk:
+    """A chunk of a document with its section breadcrumb and size."""
+    text: str
+    section: List[str] = field(default_factory=list)
+    headers: List[str] = field(default_factory=list)
+    word_count: int = 0
+    token_count: int = 0
+
+    def metadata(self) -> Dict[str, Any]:
+        """
+        Get the chunk metadata stored with the chunk.
+
+        section_headings is a list so that a jsonb containment filter such as
+        {"section_headings": ["Installation"]} matches every chunk of a section.
+        """
+        return {
+            "headers": "; ".join(self.headers),
+            "section_path": SECTION_PATH_SEPARATOR.join(self.section),
+            "section_headings": self.section,
+            "char_count": len(self.text),
+            "word_count": self.word_count,
+            "token_count": self.token_count
+        }
+
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+@lru_cache(maxsize=None)
+def get_token_counter(model: Optional[str] = None) -> Callable[[str], int]:
+    """
+    Get a function counting the tokens of a text for an embedding model.
+
+    Uses the model's tiktoken encoding (cl100k_base for models tiktoken doesn't know,
+    such as Ollama models), or an estimate of CHARS_PER_TOKEN characters per token
+    when tiktoken or its encoding files are not available.
+
+    Args:
+        model: Embedding model name (defaults to the configured embedding model)
+
+    Returns:
+        Function returning the number of tokens of a text
+    """
+    if tiktoken is None:
+        return _estimate_tokens
+    if model is None:
+        from utils import get_embedding_model_name
+        model = get_embedding_model_name()
+    try:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # The encoding files are downloaded on first use, which fails offline
+        print(f"Tokenizer unavailable, estimating token counts: {e}")
+        return _estimate_tokens
+    return lambda text: len(encoding.encode_ordinary(text))
+
+
+def parse_blocks(text: str, count_tokens: Callable[[str], int]) -> List[Block]:
+    """
+    Split a markdown document into heading, code and text blocks in a single pass.
+
+    A fenced code block runs from its opening ``` or ~~~ fence to the next fence of the
+    same character that is at least as long, or to the end of the document if unclosed.
+    Each block records the path of headings it is nested under.
+
+    Args:
+        text: Markdown document
+        count_tokens: Function counting the tokens of a text
+
+    Returns:
+        Blocks in document order
+    """
+    blocks = []
+    position = 0
+    paragraph_start = None
+    paragraph_end = 0
+    fence = None
+    fence_start = 0
+    # Open headings as (level, title), and their titles as the current path
+    headings: List[Tuple[int, str]] = []
+    path: Tuple[str, ...] = ()
+
+    def add(kind: str, start: int, end: int, level: int = 0) -> None:
+        segment = text[start:end]
+        blocks.append(Block(kind, start, end, count_tokens(segment), len(segment.split()), path, level))
+
+    for line in text.splitlines(keepends=True):
+        line_start = position
+        position += len(line)
+        content = line.rstrip()
+        line_end = line_start + len(content)
+
+        if fence is not None:
+            stripped = content.lstrip(" ")
+            if stripped.startswith(fence) and not stripped.strip(fence[0]) and len(content) - len(stripped) <= 3:
+                add("code", fence_start, line_end)
+                fence = None
+            continue
+
+        # Only lines starting with a fence, hash or indent character can open a block
+        opening = heading = None
+        if content[:1] in _BLOCK_START_CHARS:
+            opening = _FENCE_OPEN.match(content)
+            if opening and opening.group(1)[0] == "`" and "`" in content[opening.end():]:
+                opening = None
+            heading = None if opening else _HEADING.match(content)
+        if opening or heading or not content:
+            if paragraph_start is not None:
+                add("text", paragraph_start, paragraph_end)
+                paragraph_start = None
+            if opening:
+                fence = opening.group(1)
+                fence_start = line_start
+            elif heading:
+                level = len(heading.group(1))
+                title = _CLOSING_HASHES.sub("", content[heading.end():]).strip()
+                while headings and headings[-1][0] >= level:
+                    headings.pop()
+                headings.append((level, title))
+                path = tuple(title for _, title in headings)
+                add("heading", line_start, line_end, level)
+            continue
+
+        if paragraph_start is None:
+            paragraph_start = line_start + len(line) - len(line.lstrip())
+        paragraph_end = line_end
+
+    if fence is not None:
+        add("code", fence_start, len(text.rstrip()))
+    elif paragraph_start is not None:
+        add("text", paragraph_start, paragraph_end)
+    return blocks
+
+
+def _split_block(text: str, block: Block, max_tokens: int, count_tokens: Callable[[str], int]) -> List[Block]:
+    """Split an oversized text block at sentence or line breaks, then by length."""
+    pieces = []
+    piece_start = block.start
+    for match in _SENTENCE_BREAK.finditer(text, block.start, block.end):
+        pieces.append((piece_start, match.start()))
+        piece_start = match.end()
+    pieces.append((piece_start, block.end))
+
+    parts = []
+    for start, end in pieces:
+        tokens = count_tokens(text[start:end])
+        if tokens <= max_tokens:
+            if parts and parts[-1].tokens + tokens <= max_tokens:
+                merged = parts[-1]
+                merged.end = end
+                merged.tokens += tokens
+                merged.words += len(text[start:end].split())
+            else:
+                parts.append(Block("text", start, end, tokens, len(text[start:end].split()), block.path))
+            continue
+        # A single sentence longer than the budget is cut into windows of about max_tokens
+        window = max(1, (end - start) * max_tokens // tokens)
+        window_start = start
+        while window_start < end:
+            window_end = min(end, window_start + window)
+            if window_end < end:
+                # Cut at the last space of the window rather than inside a word
+                space = text.rfind(" ", window_start + 1, window_end)
+                if space != -1:
+                    window_end = space
+            piece = text[window_start:window_end]
+            parts.append(Block("text", window_start, window_end, count_tokens(piece), len(piece.split()), block.path))
+            window_start = window_end
+            while window_start < end and text[window_start] == " ":
+                window_start += 1
+    return parts
+
+
+def _block_tail(text: str, block: Block, max_tokens: int, count_tokens: Callable[[str], int]) -> Optional[Block]:
+    """The longest end of a text block that fits in max_tokens, starting at a sentence or else at a word."""
+    tail = None
+    for boundary in (_SENTENCE_BREAK, _WORD_BREAK):
+        starts = [match.end() for match in boundary.finditer(text, block.start, block.end)]
+        # Tails only get shorter as their start moves right, so binary search the first one that fits
+        low, high = 0, len(starts)
+        while low < high:
+            middle = (low + high) // 2
+            if count_tokens(text[starts[middle]:block.end]) <= max_tokens:
+                high = middle
+            else:
+                low = middle + 1
+        if low < len(starts) and starts[low] < block.end:
+            piece = text[starts[low]:block.end]
+            candidate = Block("text", starts[low], block.end, count_tokens(piece), len(piece.split()), block.path)
+            if tail is None or candidate.tokens > tail.tokens:
+                tail = candidate
+        # Whole sentences are preferred as long as they fill at least half of the budget
+        if tail is not None and tail.tokens * 2 >= max_tokens:
+            break
+    return tail
+
+
+def chunk_markdown_sections(
+    text: str,
+    max_tokens: int = 1000,
+    overlap_tokens: int = 0,
+    count_tokens: Optional[Callable[[str], int]] = None
+) -> List[Chunk]:
+    """
+    Split a markdown document into chunks of whole blocks up to a token budget.
+
+    A chunk is closed when the next block would exceed the budget, or at a heading
+    once the chunk is HEADING_BREAK_RATIO full, and a heading is kept with the block
+    that follows it. Paragraphs longer than the budget are split at sentence breaks;
+    fenced code blocks longer than the budget become a chunk of their own instead.
+
+    With overlap_tokens, the trailing blocks of a chunk are repeated at the start of the
+    next one unless it starts a new section. When the next text block back only partly
+    fits, its end is repeated from a sentence (or word) boundary, so overlap is not lost
+    to paragraphs longer than overlap_tokens. Code blocks are only repeated whole, and
+    the overlap never takes a chunk over max_tokens: it is limited to max_tokens minus
+    the tokens of the block that starts the next chunk.
+
+    The section of a chunk is the heading path of its first block that isn't a heading
+    or repeated from the previous chunk.
+
+    Args:
+        text: Markdown document
+        max_tokens: Maximum number of tokens per chunk
+        overlap_tokens: Maximum number of tokens of trailing blocks repeated at the start of the next chunk
+        count_tokens: Function counting the tokens of a text (defaults to the embedding model's tokenizer)
+
+    Returns:
+        List of chunks
+    """
+    count_tokens = count_tokens or get_token_counter()
+    max_tokens = max(1, max_tokens)
+
+    chunks = []
+    current: List[Block] = []
+    current_tokens = 0
+    # Number of blocks at the start of current repeated from the previous chunk
+    carried = 0
+
+    def close(blocks: List[Block], carried: int) -> Chunk:
+        own = blocks[carried:]
+        anchor = next((block for block in own if block.kind != "heading"), own[-1])
+        return Chunk(
+            text=text[blocks[0].start:blocks[-1].end],
+            section=list(anchor.path),
+            headers=[f"{'#' * block.level} {block.path[-1]}" for block in blocks if block.kind == "heading"],
+            word_count=sum(block.words for block in blocks),
+            token_count=sum(block.tokens for block in blocks)
+        )
+
+    def emit(next_block: Block) -> None:
+        nonlocal current, current_tokens, carried
+        # A heading closing the chunk belongs to the section starting in the next one
+        held = []
+        while len(current) - carried > 1 and current[-1].kind == "heading":
+            held.insert(0, current.pop())
+            current_tokens -= held[0].tokens
+        chunks.append(close(current, carried))
+
+        # Carry whole trailing blocks into the next chunk, unless it starts a new section
+        keep = 0
+        kept_tokens = 0
+        # The overlap has to fit in the next chunk together with the block starting it
+        room = min(overlap_tokens, max_tokens - next_block.tokens)
+        if not held and next_block.kind != "heading":
+            while keep < len(current) - 1 and kept_tokens + current[-1 - keep].tokens <= room:
+                kept_tokens += current[-1 - keep].tokens
+                keep += 1
+        carry = current[len(current) - keep:] if keep else []
+        # Fill the rest of the overlap with the end of the next text block back
+        if not held and next_block.kind != "heading" and kept_tokens < room and current[-1 - keep].kind == "text":
+            tail = _block_tail(text, current[-1 - keep], room - kept_tokens, count_tokens)
+            if tail is not None:
+                carry.insert(0, tail)
+                kept_tokens += tail.tokens
+                keep += 1
+        current = carry
+        current_tokens = kept_tokens + sum(block.tokens for block in held)
+        carried = keep
+        current.extend(held)
+
+    for block in parse_blocks(text, count_tokens):
+        parts = [block] if block.tokens <= max_tokens or block.kind != "text" else _split_block(text, block, max_tokens, count_tokens)
+        for part in parts:
+            heading_break = part.kind == "heading" and current_tokens >= max_tokens * HEADING_BREAK_RATIO
+            # Headings stay with the block that follows them, even if that exceeds the budget
+            has_content = any(block.kind != "heading" for block in current[carried:])
+            if has_content and (current_tokens + part.tokens > max_tokens or heading_break):
+                emit(part)
+            # Drop overlap that no longer fits together with the new block
+            while carried and current_tokens + part.tokens > max_tokens:
+                current_tokens -= current.pop(0).tokens
+                carried -= 1
+            current.append(part)
+            current_tokens += part.tokens
+
+    if len(current) > carried:
+        chunks.append(close(current, carried))
+    return chunks
+
+
+def chunk_markdown(
+    text: str,
+    max_tokens: int = 1000,
+    overlap_tokens: int = 0,
+    count_tokens: Optional[Callable[[str], int]] = None
+) -> List[str]:
+    """
+    Split a markdown document into chunks of whole blocks up to a token budget, see chunk_markdown_sections.
+
+    Args:
+        text: Markdown document
+        max_tokens: Maximum number of tokens per chunk
+        overlap_tokens: Maximum number of tokens of trailing blocks repeated at the start of the next chunk
+        count_tokens: Function counting the tokens of a text (defaults to the embedding model's tokenizer)
+
+    Returns:
+        List of chunk texts
+    """
+    return [chunk.text for chunk in chunk_markdown_sections(text, max_tokens, overlap_tokens, count_tokens)]
@@ -0,0 +1,179 @@
+"""
+Fenced code block extraction for the Crawl4AI MCP server.
+
+Markdown is scanned once, line by line, and fences are matched the way CommonMark
+does: a block opened by ``` or ~~~ is only closed by a fence of the same character
+that is at least as long, so nested, unbalanced and tilde fences no longer shift
+every following block. Blocks are returned as offsets into the document; the code
+and its surrounding context are only copied out when they are read.
+"""
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+# Characters of surrounding text available as context on each side of a code block
+CONTEXT_CHARS = 1000
+
+# Default minimum code length in characters
+DEFAULT_MIN_LENGTH = 1000
+
+# Lines that can open or close a fence: up to 3 spaces of indent, then 3+ backticks or tildes
+_FENCE_LINE = re.compile(r" {0,3}(`{3,}|~{3,})([^\n]*)")
+
+
+@dataclass
+class CodeBlock:
+    """
+    A fenced code block, as offsets into the document it was found in.
+
+    Supports dictionary access (block['code'], block['context_before'], ...) for the
+    callers written against the former dictionary results.
+    """
+    language: str
+    start: int       # Start of the opening fence
+    end: int         # End of the closing fence (or of the document if unclosed)
+    code_start: int
+    code_end: int
+    document: Optional[str] = field(default=None, repr=False, compare=False)
+
+    @property
+    def code(self) -> str:
+        return self.document[self.code_start:self.code_end].strip("\r\n").rstrip()
+
+    @property
+    def context_before(self) -> str:
+        return self.document[max(0, self.start - CONTEXT_CHARS):self.start].strip()
+
+    @property
+    def context_after(self) -> str:
+        return self.document[self.end:self.end + CONTEXT_CHARS].strip()
+
+    @property
+    def full_context(self) -> str:
+        return f"{self.context_before}\n\n{self.code}\n\n{self.context_after}"
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in ("code", "language", "context_before", "context_after", "full_context"):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Only the offsets cross process boundaries, the receiver already has the document
+        state = dict(self.__dict__)
+        state["document"] = None
+        return state
+
+
+def parse_min_lengths(value: Optional[str]) -> Dict[str, int]:
+    """
+    Parse per-language minimum code lengths such as "bash=200,shell=200,python=800".
+
+    Args:
+        value: Comma-separated language=length pairs
+
+    Returns:
+        Dictionary of lowercase language to minimum length
+    """
+    min_lengths = {}
+    for item in (value or "").split(","):
+        language, _, length = item.partition("=")
+        if language.strip() and length.strip().isdigit():
+            min_lengths[language.strip().lower()] = int(length)
+    return min_lengths
+
+
+def _fence_lines(markdown_content: str):
+    """Yield a match for every line that looks like a fence, found with str.find."""
+    length = len(markdown_content)
+    next_backticks = markdown_content.find("```")
+    next_tildes = markdown_content.find("~~~")
+
+    while next_backticks != -1 or next_tildes != -1:
+        position = min(p for p in (next_backticks, next_tildes) if p != -1)
+        line_start = markdown_content.rfind("\n", 0, position) + 1
+        line_end = markdown_content.find("\n", position)
+        if line_end == -1:
+            line_end = length
+
+        match = _FENCE_LINE.match(markdown_content, line_start, line_end)
+        if match is not None and match.start(1) == position:
+            yield match
+
+        # The rest of the line can't hold another fence
+        if next_backticks != -1 and next_backticks < line_end:
+            next_backticks = markdown_content.find("```", line_end)
+        if next_tildes != -1 and next_tildes < line_end:
+            next_tildes = markdown_content.find("~~~", line_end)
+
+
+def iter_fenced_blocks(markdown_content: str):
+    """
+    Scan a markdown document for fenced code blocks in a single pass.
+
+    Args:
+        markdown_content: The markdown document
+
+    Yields:
+        CodeBlock for every fenced block, including empty and unclosed ones
+    """
+    fence = None
+    language = ""
+    start = code_start = 0
+    length = len(markdown_content)
+
+    # Only fence lines are visited, the text between them is never split or copied
+    for match in _fence_lines(markdown_content):
+        marker, info = match.group(1), match.group(2)
+
+        if fence is None:
+            # A backtick fence's info string can't contain backticks (that is inline code)
+            if marker[0] == "`" and "`" in info:
+                continue
+            fence = marker
+            language = info.split(None, 1)[0].lower() if info.strip() else ""
+            start = match.start()
+            code_start = min(match.end() + 1, length)
+            continue
+
+        if marker[0] == fence[0] and len(marker) >= len(fence) and not info.strip():
+            yield CodeBlock(language, start, min(match.end() + 1, length), code_start, match.start(), markdown_content)
+            fence = None
+
+    if fence is not None:
+        yield CodeBlock(language, start, length, code_start, length, markdown_content)
+
+
+def extract_code_blocks(
+    markdown_content: str,
+    min_length: Optional[int] = None,
+    min_length_by_language: Optional[Dict[str, int]] = None
+) -> List[CodeBlock]:
+    """
+    Extract code blocks from markdown content along with context.
+
+    The minimum lengths default to CODE_BLOCK_MIN_LENGTH and CODE_BLOCK_MIN_LENGTHS
+    (e.g. "bash=200,python=800"), so short shell snippets can be kept while long
+    examples are required for other languages.
+
+    Args:
+        markdown_content: The markdown content to extract code blocks from
+        min_length: Minimum length of code blocks to extract (default: 1000 characters)
+        min_length_by_language: Minimum lengths overriding min_length for some languages
+
+    Returns:
+        List of code blocks, whose code and context are read from the document on access
+    """
+    if min_length is None:
+        min_length = int(os.getenv("CODE_BLOCK_MIN_LENGTH", str(DEFAULT_MIN_LENGTH)))
+    if min_length_by_language is None:
+        min_length_by_language = parse_min_lengths(os.getenv("CODE_BLOCK_MIN_LENGTHS"))
+
+    code_blocks = []
+    for block in iter_fenced_blocks(markdown_content):
+        required = min_length_by_language.get(block.language, min_length)
+        # The raw span bounds the code length, so short blocks are skipped without copying them
+        if block.code_end - block.code_start < required or len(block.code) < required:
+            continue
+        code_blocks.append(block)
+    return code_blocks
@@ -6,26 +6,20 @@ the appropriate crawl method based on URL type (sitemap, txt file, or regular we
 Also includes AI hallucination detection and repository parsing tools using Neo4j knowledge graphs.
 """
 from mcp.server.fastmcp import FastMCP, Context
-from sentence_transformers import CrossEncoder
 from contextlib import asynccontextmanager
-from collections.abc import AsyncIterator
+from collections.abc import AsyncIterator, AsyncIterable
 from dataclasses import dataclass
-from typing import List, Dict, Any, Optional
-from urllib.parse import urlparse, urldefrag
-from xml.etree import ElementTree
+from typing import List, Dict, Any, Optional, Tuple, TYPE_CHECKING
+from urllib.parse import urlparse
 from dotenv import load_dotenv
 from supabase import Client
 from pathlib import Path
-import requests
+import httpx
 import asyncio
 import json
 import os
-import re
-import concurrent.futures
 import sys
 
-from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode, MemoryAdaptiveDispatcher
-
 # Add knowledge_graphs folder to path for importing knowledge graph modules
 knowledge_graphs_path = Path(__file__).resolve().parent.parent / 'knowledge_graphs'
 sys.path.append(str(knowledge_graphs_path))
@@ -34,19 +28,40 @@ from utils import (
     get_supabase_client, 
     add_documents_to_supabase, 
     search_documents,
-    extract_code_blocks,
-    generate_code_example_summary,
+    search_documents_async,
+    hybrid_search_documents,
+    hybrid_search_documents_async,
+    generate_code_example_summaries,
     add_code_examples_to_supabase,
     update_source_info,
     extract_source_summary,
-    search_code_examples
+    search_code_examples_async,
+    hybrid_search_code_examples_async,
+    get_embedding_cache_stats,
+    get_query_embedding_cache_stats,
+    create_query_embeddings_async,
+    compute_content_hash,
+    get_crawl_metadata,
+    get_page_hashes,
+    build_crawl_metadata,
+    update_crawl_metadata,
+    get_embedding_model_name
 )
-
-# Import knowledge graph modules
-from knowledge_graph_validator import KnowledgeGraphValidator
-from parse_repo_into_neo4j import DirectNeo4jExtractor
-from ai_script_analyzer import AIScriptAnalyzer
-from hallucination_reporter import HallucinationReporter
+from llm_scheduler import get_llm_scheduler, set_llm_priority, PRIORITY_INTERACTIVE, PRIORITY_BULK
+from reranker import RerankExecutor, load_reranking_model
+from lazy_resource import LazyResource
+from browser_pool import BrowserPool, PooledCrawler
+from static_fetch import StaticFetcher
+from frontier import FrontierCrawler
+from sitemap import iter_sitemap_entries
+from chunking import CHARS_PER_TOKEN, Chunk, chunk_markdown_sections
+from code_blocks import CodeBlock, extract_code_blocks
+from page_processing import PageProcessor, ProcessedPage
+
+# crawl4ai, the reranking model and the knowledge graph modules are imported where they
+# are first used, so the server starts without loading the browser, torch or neo4j stacks
+if TYPE_CHECKING:
+    from crawl4ai import AsyncWebCrawler
 
 # Load environment variables from the project root .env file
 project_root = Path(__file__).resolve().parent.parent
@@ -115,24 +130,25 @@ def validate_github_url(repo_url: str) -> Dict[str, Any]:
 # Create a dataclass for our application context
 @dataclass
 class Crawl4AIContext:
-    """Context for the Crawl4AI MCP server."""
-    crawler: AsyncWebCrawler
-    supabase_client: Client
-    reranking_model: Optional[CrossEncoder] = None
-    knowledge_validator: Optional[Any] = None  # KnowledgeGraphValidator when available
-    repo_extractor: Optional[Any] = None       # DirectNeo4jExtractor when available
-
-@asynccontextmanager
-async def crawl4ai_lifespan(server: FastMCP) -> AsyncIterator[Crawl4AIContext]:
     """
-    Manages the Crawl4AI client lifecycle.
+    Context for the Crawl4AI MCP server.
     
-    Args:
-        server: The FastMCP server instance
-        
-    Yields:
-        Crawl4AIContext: The context containing the Crawl4AI crawler and Supabase client
+    Browsers are launched by the pool as crawl calls need them. The reranker and Neo4j
+    components are created on first use (or by the startup warmup); call
+    `await context.<component>.get()` to obtain them.
     """
+    browser_pool: BrowserPool
+    supabase_client: Client
+    reranker: LazyResource  # RerankExecutor when USE_RERANKING is enabled
+    knowledge_validator: LazyResource  # KnowledgeGraphValidator when available
+    repo_extractor: LazyResource       # DirectNeo4jExtractor when available
+    static_fetcher: Optional[StaticFetcher] = None  # When USE_HTTP_FETCH is enabled
+    page_processor: Optional[PageProcessor] = None  # Chunks pages and extracts code blocks off the event loop
+
+async def create_crawler() -> "AsyncWebCrawler":
+    """Launch the headless browser used by the crawl tools."""
+    from crawl4ai import AsyncWebCrawler, BrowserConfig
+    
     # Create browser configuration
     browser_config = BrowserConfig(
         headless=True,
@@ -142,77 +158,139 @@ async def crawl4ai_lifespan(server: FastMCP) -> AsyncIterator[Crawl4AIContext]:
     # Initialize the crawler
     crawler = AsyncWebCrawler(config=browser_config)
     await crawler.__aenter__()
+    return crawler
+
+async def create_reranker() -> Optional[RerankExecutor]:
+    """Load the cross-encoder model for reranking if enabled."""
+    if os.getenv("USE_RERANKING", "false") != "true":
+        return None
+    
+    # Loading the model is CPU-bound, so keep it off the event loop
+    model = await asyncio.to_thread(load_reranking_model)
+    return RerankExecutor(
+        model,
+        batch_window_ms=float(os.getenv("RERANK_BATCH_WINDOW_MS", "5")),
+        max_batch_size=int(os.getenv("RERANK_MAX_BATCH_SIZE", "256")),
+        cache_size=int(os.getenv("RERANK_CACHE_SIZE", "10000"))
+    )
+
+def get_neo4j_credentials() -> Optional[Tuple[str, str, str]]:
+    """Get the Neo4j URI, user and password if knowledge graph functionality is enabled and configured."""
+    if os.getenv("USE_KNOWLEDGE_GRAPH", "false") != "true":
+        return None
+    neo4j_uri = os.getenv("NEO4J_URI")
+    neo4j_user = os.getenv("NEO4J_USER")
+    neo4j_password = os.getenv("NEO4J_PASSWORD")
+    if not (neo4j_uri and neo4j_user and neo4j_password):
+        return None
+    return neo4j_uri, neo4j_user, neo4j_password
+
+async def create_knowledge_validator() -> Optional[Any]:
+    """Connect the knowledge graph validator to Neo4j if configured."""
+    credentials = get_neo4j_credentials()
+    if not credentials:
+        return None
+    
+    from knowledge_graph_validator import KnowledgeGraphValidator
+    
+    knowledge_validator = KnowledgeGraphValidator(*credentials)
+    try:
+        await knowledge_validator.initialize()
+    except Exception as e:
+        print(f"Failed to initialize knowledge graph validator: {format_neo4j_error(e)}")
+        return None
+    return knowledge_validator
+
+async def create_repo_extractor() -> Optional[Any]:
+    """Connect the repository extractor to Neo4j if configured."""
+    credentials = get_neo4j_credentials()
+    if not credentials:
+        return None
+    
+    from parse_repo_into_neo4j import DirectNeo4jExtractor
     
+    repo_extractor = DirectNeo4jExtractor(*credentials)
+    try:
+        await repo_extractor.initialize()
+    except Exception as e:
+        print(f"Failed to initialize repository extractor: {format_neo4j_error(e)}")
+        return None
+    return repo_extractor
+
+@asynccontextmanager
+async def crawl4ai_lifespan(server: FastMCP) -> AsyncIterator[Crawl4AIContext]:
+    """
+    Manages the Crawl4AI client lifecycle.
+    
+    Slow components are not created here, so the server accepts connections right away.
+    Unless WARMUP_ON_STARTUP is "false", they are created in the background instead.
+    
+    Args:
+        server: The FastMCP server instance
+        
+    Yields:
+        Crawl4AIContext: The context containing the Crawl4AI crawler and Supabase client
+    """
     # Initialize Supabase client
     supabase_client = get_supabase_client()
     
-    # Initialize cross-encoder model for reranking if enabled
-    reranking_model = None
-    if os.getenv("USE_RERANKING", "false") == "true":
-        try:
-            reranking_model = CrossEncoder("cross-encoder/ms-marco-MiniLM-L-6-v2")
-        except Exception as e:
-            print(f"Failed to load reranking model: {e}")
-            reranking_model = None
+    browser_pool = BrowserPool(
+        create_crawler,
+        close=lambda crawler: crawler.__aexit__(None, None, None),
+        size=int(os.getenv("BROWSER_POOL_SIZE", "2")),
+        max_sessions=int(os.getenv("BROWSER_MAX_SESSIONS", "10")),
+        max_pages=int(os.getenv("BROWSER_MAX_PAGES", "500")),
+        max_memory_mb=float(os.getenv("BROWSER_MAX_MEMORY_MB", "2048"))
+    )
+    # Fetch static pages over plain HTTP before falling back to the browser if enabled
+    static_fetcher = None
+    if os.getenv("USE_HTTP_FETCH", "false") == "true":
+        static_fetcher = StaticFetcher(max_connections=int(os.getenv("HTTP_FETCH_MAX_CONNECTIONS", "32")))
+    # Chunking and code block extraction run in worker processes, started on first use
+    page_processor = PageProcessor(
+        max_workers=int(os.getenv("PAGE_PROCESS_WORKERS", "2")),
+        model=get_embedding_model_name()
+    )
     
-    # Initialize Neo4j components if configured and enabled
-    knowledge_validator = None
-    repo_extractor = None
+    reranker = LazyResource("Reranking model", create_reranker, close=lambda reranker: asyncio.to_thread(reranker.close))
+    knowledge_validator = LazyResource("Knowledge graph validator", create_knowledge_validator, close=lambda validator: validator.close())
+    repo_extractor = LazyResource("Repository extractor", create_repo_extractor, close=lambda extractor: extractor.close())
     
     # Check if knowledge graph functionality is enabled
     knowledge_graph_enabled = os.getenv("USE_KNOWLEDGE_GRAPH", "false") == "true"
-    
-    if knowledge_graph_enabled:
-        neo4j_uri = os.getenv("NEO4J_URI")
-        neo4j_user = os.getenv("NEO4J_USER")
-        neo4j_password = os.getenv("NEO4J_PASSWORD")
-        
-        if neo4j_uri and neo4j_user and neo4j_password:
-            try:
-                print("Initializing knowledge graph components...")
-                
-                # Initialize knowledge graph validator
-                knowledge_validator = KnowledgeGraphValidator(neo4j_uri, neo4j_user, neo4j_password)
-                await knowledge_validator.initialize()
-                print("✓ Knowledge graph validator initialized")
-                
-                # Initialize repository extractor
-                repo_extractor = DirectNeo4jExtractor(neo4j_uri, neo4j_user, neo4j_password)
-                await repo_extractor.initialize()
-                print("✓ Repository extractor initialized")
-                
-            except Exception as e:
-                print(f"Failed to initialize Neo4j components: {format_neo4j_error(e)}")
-                knowledge_validator = None
-                repo_extractor = None
-        else:
-            print("Neo4j credentials not configured - knowledge graph tools will be unavailable")
-    else:
+    if not knowledge_graph_enabled:
         print("Knowledge graph functionality disabled - set USE_KNOWLEDGE_GRAPH=true to enable")
+    elif not get_neo4j_credentials():
+        print("Neo4j credentials not configured - knowledge graph tools will be unavailable")
+    
+    # Start creating the enabled components without waiting for them
+    if os.getenv("WARMUP_ON_STARTUP", "true") == "true":
+        browser_pool.warmup()
+        if os.getenv("USE_RERANKING", "false") == "true":
+            reranker.warmup()
+        if get_neo4j_credentials():
+            knowledge_validator.warmup()
+            repo_extractor.warmup()
     
     try:
         yield Crawl4AIContext(
-            crawler=crawler,
+            browser_pool=browser_pool,
             supabase_client=supabase_client,
-            reranking_model=reranking_model,
+            reranker=reranker,
             knowledge_validator=knowledge_validator,
-            repo_extractor=repo_extractor
+            repo_extractor=repo_extractor,
+            static_fetcher=static_fetcher,
+            page_processor=page_processor
         )
     finally:
         # Clean up all components
-        await crawler.__aexit__(None, None, None)
-        if knowledge_validator:
-            try:
-                await knowledge_validator.close()
-                print("✓ Knowledge graph validator closed")
-            except Exception as e:
-                print(f"Error closing knowledge validator: {e}")
-        if repo_extractor:
-            try:
-                await repo_extractor.close()
-                print("✓ Repository extractor closed")
-            except Exception as e:
-                print(f"Error closing repository extractor: {e}")
+        await browser_pool.close()
+        if static_fetcher:
+            await static_fetcher.close()
+        await reranker.close()
+        await knowledge_validator.close()
+        await repo_extractor.close()
+        page_processor.close()
 
 # Initialize FastMCP server
 mcp = FastMCP(
@@ -223,40 +301,31 @@ mcp = FastMCP(
     port=os.getenv("PORT", "8051")
 )
 
-def rerank_results(model: CrossEncoder, query: str, results: List[Dict[str, Any]], content_key: str = "content") -> List[Dict[str, Any]]:
+# Maximum number of queries accepted by perform_rag_queries
+MAX_BATCH_QUERIES = 20
+
+async def rerank_results(reranker: RerankExecutor, query: str, results: List[Dict[str, Any]], content_key: str = "content", namespace: str = "crawled_pages") -> List[Dict[str, Any]]:
     """
-    Rerank search results using a cross-encoder model.
+    Rerank search results using the cross-encoder reranker.
+    
+    Scoring runs on the reranker's own thread, batched with concurrent requests,
+    and previously computed (query, chunk) scores are reused.
     
     Args:
-        model: The cross-encoder model to use for reranking
+        reranker: The reranker wrapping the cross-encoder model
         query: The search query
         results: List of search results
         content_key: The key in each result dict that contains the text content
+        namespace: Table the results come from ("crawled_pages" or "code_examples")
         
     Returns:
         Reranked list of results
     """
-    if not model or not results:
+    if not reranker or not results:
         return results
     
     try:
-        # Extract content from results
-        texts = [result.get(content_key, "") for result in results]
-        
-        # Create pairs of [query, document] for the cross-encoder
-        pairs = [[query, text] for text in texts]
-        
-        # Get relevance scores from the cross-encoder
-        scores = model.predict(pairs)
-        
-        # Add scores to results and sort by score (descending)
-        for i, result in enumerate(results):
-            result["rerank_score"] = float(scores[i])
-        
-        # Sort by rerank score
-        reranked = sorted(results, key=lambda x: x.get("rerank_score", 0), reverse=True)
-        
-        return reranked
+        return await reranker.rerank(query, results, content_key=content_key, namespace=namespace)
     except Exception as e:
         print(f"Error during reranking: {e}")
         return results
@@ -285,126 +354,341 @@ def is_txt(url: str) -> bool:
     """
     return url.endswith('.txt')
 
-def parse_sitemap(sitemap_url: str) -> List[str]:
+async def parse_sitemap(sitemap_url: str, lastmod_since: Optional[str] = None) -> List[str]:
     """
     Parse a sitemap and extract URLs.
     
     Args:
         sitemap_url: URL of the sitemap
+        lastmod_since: Optional ISO date, pages last modified before it are skipped
         
     Returns:
         List of URLs found in the sitemap
     """
-    resp = requests.get(sitemap_url)
-    urls = []
+    return [entry['url'] for entry in await parse_sitemap_entries(sitemap_url, lastmod_since)]
 
-    if resp.status_code == 200:
-        try:
-            tree = ElementTree.fromstring(resp.content)
-            urls = [loc.text for loc in tree.findall('.//{*}loc')]
-        except Exception as e:
-            print(f"Error parsing sitemap XML: {e}")
+async def parse_sitemap_entries(sitemap_url: str, lastmod_since: Optional[str] = None) -> List[Dict[str, Optional[str]]]:
+    """
+    Parse a sitemap and extract URLs along with their <lastmod> values.
+    
+    Nested sitemap indexes and gzipped sitemaps are followed, see sitemap.iter_sitemap_entries.
+    
+    Args:
+        sitemap_url: URL of the sitemap
+        lastmod_since: Optional ISO date, pages last modified before it are skipped
+        
+    Returns:
+        List of dictionaries with the URL and its lastmod value (None if absent)
+    """
+    return [
+        {'url': entry.url, 'lastmod': entry.lastmod}
+        async for entry in iter_sitemap_entries(sitemap_url, lastmod_since, max_concurrent=sitemap_max_concurrent())
+    ]
 
-    return urls
+def sitemap_max_concurrent() -> int:
+    """Get the maximum number of sitemaps of a sitemap index downloaded at once."""
+    return int(os.getenv("SITEMAP_MAX_CONCURRENT_FETCHES", "4"))
 
 def smart_chunk_markdown(text: str, chunk_size: int = 5000) -> List[str]:
-    """Split text into chunks, respecting code blocks and paragraphs."""
-    chunks = []
-    start = 0
-    text_length = len(text)
-
-    while start < text_length:
-        # Calculate end position
-        end = start + chunk_size
-
-        # If we're at the end of the text, just take what's left
-        if end >= text_length:
-            chunks.append(text[start:].strip())
-            break
-
-        # Try to find a code block boundary first (```)
-        chunk = text[start:end]
-        code_block = chunk.rfind('```')
-        if code_block != -1 and code_block > chunk_size * 0.3:
-            end = start + code_block
-
-        # If no code block, try to break at a paragraph
-        elif '\n\n' in chunk:
-            # Find the last paragraph break
-            last_break = chunk.rfind('\n\n')
-            if last_break > chunk_size * 0.3:  # Only break if we're past 30% of chunk_size
-                end = start + last_break
-
-        # If no paragraph break, try to break at a sentence
-        elif '. ' in chunk:
-            # Find the last sentence break
-            last_period = chunk.rfind('. ')
-            if last_period > chunk_size * 0.3:  # Only break if we're past 30% of chunk_size
-                end = start + last_period + 1
-
-        # Extract chunk and clean it up
-        chunk = text[start:end].strip()
-        if chunk:
-            chunks.append(chunk)
-
-        # Move start position for next chunk
-        start = end
-
-    return chunks
-
-def extract_section_info(chunk: str) -> Dict[str, Any]:
-    """
-    Extracts headers and stats from a chunk.
+    """
+    Split text into chunks of whole headings, paragraphs and code blocks, see smart_chunk_sections.
     
     Args:
-        chunk: Markdown chunk
+        text: Markdown text
+        chunk_size: Approximate maximum size of each chunk in characters
         
     Returns:
-        Dictionary with headers and stats
+        List of chunks
     """
-    headers = re.findall(r'^(#+)\s+(.+)$', chunk, re.MULTILINE)
-    header_str = '; '.join([f'{h[0]} {h[1]}' for h in headers]) if headers else ''
+    return [chunk.text for chunk in smart_chunk_sections(text, chunk_size)]
 
-    return {
-        "headers": header_str,
-        "char_count": len(chunk),
-        "word_count": len(chunk.split())
-    }
+def smart_chunk_sections(text: str, chunk_size: int = 5000) -> List[Chunk]:
+    """
+    Split text into chunks along with their heading breadcrumb and size, see chunking.chunk_markdown_sections.
+    
+    Chunks are sized in tokens of the embedding model. The chunk_size in characters is
+    converted to a token budget unless CHUNK_MAX_TOKENS is set.
+    
+    Args:
+        text: Markdown text
+        chunk_size: Approximate maximum size of each chunk in characters
+        
+    Returns:
+        List of chunks, whose metadata() holds the section path and size of the chunk
+    """
+    max_tokens, overlap_tokens = get_chunk_budget(chunk_size)
+    return chunk_markdown_sections(text, max_tokens=max_tokens, overlap_tokens=overlap_tokens)
 
-def process_code_example(args):
+def get_chunk_budget(chunk_size: int = 5000) -> Tuple[int, int]:
+    """
+    Get the token budget and overlap of a chunk from CHUNK_MAX_TOKENS and CHUNK_OVERLAP_TOKENS.
+    
+    Args:
+        chunk_size: Approximate maximum size of each chunk in characters, used if CHUNK_MAX_TOKENS is not set
+        
+    Returns:
+        Tuple of (maximum tokens per chunk, overlap tokens)
+    """
+    max_tokens = int(os.getenv("CHUNK_MAX_TOKENS", "0")) or max(1, chunk_size // CHARS_PER_TOKEN)
+    return max_tokens, int(os.getenv("CHUNK_OVERLAP_TOKENS", "0"))
+
+async def process_page_content(
+    page_processor: Optional[PageProcessor],
+    markdown: str,
+    chunk_size: int = 5000,
+    extract_code: bool = False
+) -> ProcessedPage:
     """
-    Process a single code example to generate its summary.
-    This function is designed to be used with concurrent.futures.
+    Chunk a page and extract its code blocks in the page processing pool.
     
     Args:
-        args: Tuple containing (code, context_before, context_after)
+        page_processor: PageProcessor of the server (None processes the page in a thread)
+        markdown: Markdown content of the page
+        chunk_size: Approximate maximum size of each chunk in characters
+        extract_code: Whether to extract the code blocks of the page
         
     Returns:
-        The generated summary
+        ProcessedPage with the chunks and, if requested, the code blocks
+    """
+    page_processor = page_processor or PageProcessor(max_workers=0, model=get_embedding_model_name())
+    max_tokens, overlap_tokens = get_chunk_budget(chunk_size)
+    return await page_processor.process(markdown, max_tokens, overlap_tokens, extract_code=extract_code)
+
+def store_code_examples_for_page(supabase_client: Client, url: str, markdown: str, code_blocks: Optional[List[CodeBlock]] = None) -> int:
     """
-    code, context_before, context_after = args
-    return generate_code_example_summary(code, context_before, context_after)
+    Extract, summarize and store the code examples of a single crawled page.
+
+    Args:
+        supabase_client: Supabase client
+        url: URL of the crawled page
+        markdown: Markdown content of the page
+        code_blocks: Code blocks already extracted from the page, extracted here if None
+
+    Returns:
+        Number of code examples stored
+    """
+    if code_blocks is None:
+        code_blocks = extract_code_blocks(markdown)
+    if not code_blocks:
+        return 0
+
+    summaries = generate_code_example_summaries(code_blocks)
+
+    parsed_url = urlparse(url)
+    source_id = parsed_url.netloc or parsed_url.path
+
+    # Code is read out of the page once per block
+    codes = [block['code'] for block in code_blocks]
+    code_metadatas = []
+    for i, (block, code) in enumerate(zip(code_blocks, codes)):
+        code_metadatas.append({
+            "chunk_index": i,
+            "url": url,
+            "source": source_id,
+            "language": block['language'],
+            "char_count": len(code),
+            "word_count": len(code.split())
+        })
+
+    add_code_examples_to_supabase(
+        supabase_client,
+        [url] * len(code_blocks),
+        list(range(len(code_blocks))),
+        codes,
+        summaries,
+        code_metadatas
+    )
+    return len(code_blocks)
+
+async def index_crawl_stream(
+    supabase_client: Client,
+    pages: AsyncIterable[Dict[str, Any]],
+    crawl_type: str,
+    chunk_size: int = 5000,
+    queue_size: int = 8,
+    incremental: bool = False,
+    sitemap_lastmods: Optional[Dict[str, str]] = None,
+    page_processor: Optional[PageProcessor] = None
+) -> Dict[str, Any]:
+    """
+    Chunk, embed and store pages as they arrive from a streaming crawl.
+
+    The crawl, chunking and indexing stages run concurrently and are connected by
+    bounded queues, so only a handful of pages are held in memory at any time and
+    the embedding backend works while the crawler is still fetching pages.
+
+    Args:
+        supabase_client: Supabase client
+        pages: Async iterable of dictionaries with URL and markdown content
+        crawl_type: Crawl type recorded in each chunk's metadata
+        chunk_size: Maximum size of each content chunk in characters
+        queue_size: Maximum number of pages buffered between two stages
+        incremental: Whether to skip unchanged pages and only rewrite changed chunks
+        sitemap_lastmods: Optional mapping of URLs to their sitemap <lastmod> value,
+            recorded in the crawl metadata in incremental mode
+        page_processor: PageProcessor chunking several pages at once in worker processes
+
+    Returns:
+        Dictionary with crawl and storage statistics
+    """
+    page_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    index_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    sitemap_lastmods = sitemap_lastmods or {}
+
+    extract_code_examples_enabled = os.getenv("USE_AGENTIC_RAG", "false") == "true"
+    source_summaries: Dict[str, str] = {}
+    source_word_counts: Dict[str, int] = {}
+    crawl_time = str(asyncio.current_task().get_coro().__name__)
+    stats = {"pages_crawled": 0, "pages_unchanged": 0, "chunks_stored": 0, "code_examples_stored": 0, "urls_crawled": []}
+
+    async def crawl_stage():
+        try:
+            async for doc in pages:
+                await page_queue.put(doc)
+        finally:
+            await page_queue.put(None)
+
+    async def process(source_url: str, source_id: str, md: str, crawl_row: Dict[str, Any]) -> None:
+        processed = await process_page_content(page_processor, md, chunk_size, extract_code_examples_enabled)
+        chunks = [chunk.text for chunk in processed.chunks]
+        metadatas = []
+        for i, chunk in enumerate(processed.chunks):
+            meta = chunk.metadata()
+            meta["chunk_index"] = i
+            meta["url"] = source_url
+            meta["source"] = source_id
+            meta["crawl_type"] = crawl_type
+            meta["crawl_time"] = crawl_time
+            metadatas.append(meta)
+            source_word_counts[source_id] += meta.get("word_count", 0)
+        await index_queue.put((source_url, md, crawl_row, chunks, metadatas, processed.code_blocks))
+
+    async def chunk_stage():
+        # Pages are processed concurrently by the worker processes and indexed as they finish
+        max_in_flight = max(1, page_processor.max_workers if page_processor else 1)
+        in_flight = set()
+        try:
+            while (doc := await page_queue.get()) is not None:
+                source_url = doc['url']
+                md = doc['markdown']
+                parsed_url = urlparse(source_url)
+                source_id = parsed_url.netloc or parsed_url.path
+                page_hash = compute_content_hash(md)
+                crawl_row = build_crawl_metadata(source_url, page_hash, doc.get('response_headers'), sitemap_lastmods.get(source_url))
+
+                if incremental:
+                    previous_hashes = await asyncio.to_thread(get_page_hashes, supabase_client, [source_url])
+                    if previous_hashes.get(source_url) == page_hash:
+                        await asyncio.to_thread(update_crawl_metadata, supabase_client, [crawl_row])
+                        stats["pages_unchanged"] += 1
+                        source_word_counts[source_id] = source_word_counts.get(source_id, 0) + len(md.split())
+                        continue
+
+                # The source row must exist before any of its chunks are inserted
+                if source_id not in source_summaries:
+                    summary = await asyncio.to_thread(extract_source_summary, source_id, md[:5000])
+                    await asyncio.to_thread(update_source_info, supabase_client, source_id, summary, 0)
+                    source_summaries[source_id] = summary
+                    source_word_counts.setdefault(source_id, 0)
+
+                if len(in_flight) >= max_in_flight:
+                    done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        task.result()
+                in_flight.add(asyncio.create_task(process(source_url, source_id, md, crawl_row)))
+            if in_flight:
+                await asyncio.gather(*in_flight)
+        finally:
+            for task in in_flight:
+                task.cancel()
+            await index_queue.put(None)
+
+    async def index_stage():
+        while (item := await index_queue.get()) is not None:
+            source_url, md, crawl_row, chunks, metadatas, code_blocks = item
+            chunks_written = 0
+            if chunks:
+                chunks_written = await asyncio.to_thread(
+                    add_documents_to_supabase,
+                    supabase_client,
+                    [source_url] * len(chunks),
+                    list(range(len(chunks))),
+                    chunks,
+                    metadatas,
+                    {source_url: md},
+                    incremental=incremental
+                )
+            if extract_code_examples_enabled:
+                stats["code_examples_stored"] += await asyncio.to_thread(
+                    store_code_examples_for_page, supabase_client, source_url, md, code_blocks
+                )
+            if incremental:
+                await asyncio.to_thread(update_crawl_metadata, supabase_client, [crawl_row])
+            stats["pages_crawled"] += 1
+            stats["chunks_stored"] += chunks_written
+            if len(stats["urls_crawled"]) < 5:
+                stats["urls_crawled"].append(source_url)
+
+    tasks = [asyncio.create_task(stage()) for stage in (crawl_stage, chunk_stage, index_stage)]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    # Record the final word counts now that every page has been seen
+    for source_id, summary in source_summaries.items():
+        await asyncio.to_thread(update_source_info, supabase_client, source_id, summary, source_word_counts[source_id])
+
+    stats["sources_updated"] = len(source_summaries)
+    return stats
 
 @mcp.tool()
-async def crawl_single_page(ctx: Context, url: str) -> str:
+async def crawl_single_page(ctx: Context, url: str, incremental: bool = False) -> str:
     """
     Crawl a single web page and store its content in Supabase.
     
     This tool is ideal for quickly retrieving content from a specific URL without following links.
     The content is stored in Supabase for later retrieval and querying.
     
+    With incremental=True the page is skipped if its content has not changed since the
+    last incremental crawl, and otherwise only the chunks that changed are re-embedded.
+    A conditional HEAD request using the recorded ETag/Last-Modified values is tried
+    first so unchanged pages do not need a browser session at all.
+    
     Args:
         ctx: The MCP server provided context
         url: URL of the web page to crawl
+        incremental: Only re-index content that changed since the last crawl (default: False)
     
     Returns:
         Summary of the crawling operation and storage in Supabase
     """
+    # A single page is usually requested interactively, so its LLM calls go ahead of bulk crawls
+    set_llm_priority(PRIORITY_INTERACTIVE)
     try:
-        # Get the crawler from the context
-        crawler = ctx.request_context.lifespan_context.crawler
+        # Get a crawler running on the shared browser pool
+        crawler = ctx.request_context.lifespan_context.browser_pool.crawler(
+            PRIORITY_INTERACTIVE, fetcher=ctx.request_context.lifespan_context.static_fetcher
+        )
         supabase_client = ctx.request_context.lifespan_context.supabase_client
         
+        # Skip the browser entirely if the server reports the page as unchanged
+        if incremental:
+            _, unchanged_urls = await filter_unchanged_urls(supabase_client, [url])
+            if unchanged_urls:
+                parsed_url = urlparse(url)
+                return json.dumps({
+                    "success": True,
+                    "url": url,
+                    "unchanged": True,
+                    "chunks_stored": 0,
+                    "code_examples_stored": 0,
+                    "source_id": parsed_url.netloc or parsed_url.path
+                }, indent=2)
+        
+        from crawl4ai import CrawlerRunConfig, CacheMode
+        
         # Configure the crawl
         run_config = CrawlerRunConfig(cache_mode=CacheMode.BYPASS, stream=False)
         
@@ -416,8 +700,29 @@ async def crawl_single_page(ctx: Context, url: str) -> str:
             parsed_url = urlparse(url)
             source_id = parsed_url.netloc or parsed_url.path
             
-            # Chunk the content
-            chunks = smart_chunk_markdown(result.markdown)
+            # Skip the page entirely if it is unchanged since the last incremental crawl
+            page_hash = compute_content_hash(result.markdown)
+            crawl_row = build_crawl_metadata(url, page_hash, result.response_headers)
+            if incremental:
+                previous_hashes = await asyncio.to_thread(get_page_hashes, supabase_client, [url])
+                if previous_hashes.get(url) == page_hash:
+                    await asyncio.to_thread(update_crawl_metadata, supabase_client, [crawl_row])
+                    return json.dumps({
+                        "success": True,
+                        "url": url,
+                        "unchanged": True,
+                        "chunks_stored": 0,
+                        "code_examples_stored": 0,
+                        "content_length": len(result.markdown),
+                        "source_id": source_id
+                    }, indent=2)
+            
+            # Chunk the content and extract code blocks in the page processing pool
+            extract_code_examples = os.getenv("USE_AGENTIC_RAG", "false") == "true"
+            processed = await process_page_content(
+                ctx.request_context.lifespan_context.page_processor, result.markdown, extract_code=extract_code_examples
+            )
+            chunks = processed.chunks
             
             # Prepare data for Supabase
             urls = []
@@ -429,10 +734,10 @@ async def crawl_single_page(ctx: Context, url: str) -> str:
             for i, chunk in enumerate(chunks):
                 urls.append(url)
                 chunk_numbers.append(i)
-                contents.append(chunk)
+                contents.append(chunk.text)
                 
-                # Extract metadata
-                meta = extract_section_info(chunk)
+                # Section path and size are computed while chunking
+                meta = chunk.metadata()
                 meta["chunk_index"] = i
                 meta["url"] = url
                 meta["source"] = source_id
@@ -446,71 +751,36 @@ async def crawl_single_page(ctx: Context, url: str) -> str:
             url_to_full_document = {url: result.markdown}
             
             # Update source information FIRST (before inserting documents)
-            source_summary = extract_source_summary(source_id, result.markdown[:5000])  # Use first 5000 chars for summary
-            update_source_info(supabase_client, source_id, source_summary, total_word_count)
+            source_summary = await asyncio.to_thread(extract_source_summary, source_id, result.markdown[:5000])  # Use first 5000 chars for summary
+            await asyncio.to_thread(update_source_info, supabase_client, source_id, source_summary, total_word_count)
             
             # Add documentation chunks to Supabase (AFTER source exists)
-            add_documents_to_supabase(supabase_client, urls, chunk_numbers, contents, metadatas, url_to_full_document)
+            chunks_stored = await asyncio.to_thread(add_documents_to_supabase, supabase_client, urls, chunk_numbers, contents, metadatas, url_to_full_document, incremental=incremental)
             
             # Extract and process code examples only if enabled
-            extract_code_examples = os.getenv("USE_AGENTIC_RAG", "false") == "true"
+            code_examples_stored = 0
             if extract_code_examples:
-                code_blocks = extract_code_blocks(result.markdown)
-                if code_blocks:
-                    code_urls = []
-                    code_chunk_numbers = []
-                    code_examples = []
-                    code_summaries = []
-                    code_metadatas = []
-                    
-                    # Process code examples in parallel
-                    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-                        # Prepare arguments for parallel processing
-                        summary_args = [(block['code'], block['context_before'], block['context_after']) 
-                                        for block in code_blocks]
-                        
-                        # Generate summaries in parallel
-                        summaries = list(executor.map(process_code_example, summary_args))
-                    
-                    # Prepare code example data
-                    for i, (block, summary) in enumerate(zip(code_blocks, summaries)):
-                        code_urls.append(url)
-                        code_chunk_numbers.append(i)
-                        code_examples.append(block['code'])
-                        code_summaries.append(summary)
-                        
-                        # Create metadata for code example
-                        code_meta = {
-                            "chunk_index": i,
-                            "url": url,
-                            "source": source_id,
-                            "char_count": len(block['code']),
-                            "word_count": len(block['code'].split())
-                        }
-                        code_metadatas.append(code_meta)
-                    
-                    # Add code examples to Supabase
-                    add_code_examples_to_supabase(
-                        supabase_client, 
-                        code_urls, 
-                        code_chunk_numbers, 
-                        code_examples, 
-                        code_summaries, 
-                        code_metadatas
-                    )
+                code_examples_stored = await asyncio.to_thread(store_code_examples_for_page, supabase_client, url, result.markdown, processed.code_blocks)
+            
+            if incremental:
+                await asyncio.to_thread(update_crawl_metadata, supabase_client, [crawl_row])
             
             return json.dumps({
                 "success": True,
                 "url": url,
-                "chunks_stored": len(chunks),
-                "code_examples_stored": len(code_blocks) if code_blocks else 0,
+                "chunks_stored": chunks_stored,
+                "code_examples_stored": code_examples_stored,
                 "content_length": len(result.markdown),
                 "total_word_count": total_word_count,
                 "source_id": source_id,
                 "links_count": {
                     "internal": len(result.links.get("internal", [])),
                     "external": len(result.links.get("external", []))
-                }
+                },
+                "embedding_cache": get_embedding_cache_stats(),
+                "llm_scheduler": get_llm_scheduler().stats(),
+                "browser_pool": crawler.pool.stats(),
+                "http_fetch": crawler.fetcher.stats() if crawler.fetcher else None
             }, indent=2)
         else:
             return json.dumps({
@@ -526,16 +796,18 @@ async def crawl_single_page(ctx: Context, url: str) -> str:
         }, indent=2)
 
 @mcp.tool()
-async def smart_crawl_url(ctx: Context, url: str, max_depth: int = 3, max_concurrent: int = 10, chunk_size: int = 5000) -> str:
+async def smart_crawl_url(ctx: Context, url: str, max_depth: int = 3, max_concurrent: int = 10, chunk_size: int = 5000, incremental: bool = False, max_pages: int = None, lastmod_since: str = None) -> str:
     """
     Intelligently crawl a URL based on its type and store content in Supabase.
     
     This tool automatically detects the URL type and applies the appropriate crawling method:
-    - For sitemaps: Extracts and crawls all URLs in parallel
+    - For sitemaps: Extracts and crawls all URLs in parallel, following nested sitemap indexes
     - For text files (llms.txt): Directly retrieves the content
     - For regular webpages: Recursively crawls internal links up to the specified depth
     
     All crawled content is chunked and stored in Supabase for later retrieval and querying.
+    With incremental=True, pages unchanged since the last incremental crawl are skipped and
+    only the chunks that changed on the other pages are re-embedded.
     
     Args:
         ctx: The MCP server provided context
@@ -543,18 +815,31 @@ async def smart_crawl_url(ctx: Context, url: str, max_depth: int = 3, max_concur
         max_depth: Maximum recursion depth for regular URLs (default: 3)
         max_concurrent: Maximum number of concurrent browser sessions (default: 10)
         chunk_size: Maximum size of each content chunk in characters (default: 1000)
+        incremental: Only re-index content that changed since the last crawl (default: False)
+        max_pages: Maximum number of pages to crawl recursively for regular URLs (default: CRAWL_MAX_PAGES, unlimited if unset)
+        lastmod_since: For sitemaps, only crawl pages whose <lastmod> is on or after this ISO date, e.g. "2024-06-01" (default: all pages)
     
     Returns:
         JSON string with crawl summary and storage information
     """
+    set_llm_priority(PRIORITY_BULK)
     try:
-        # Get the crawler from the context
-        crawler = ctx.request_context.lifespan_context.crawler
+        # Get a crawler running on the shared browser pool
+        crawler = ctx.request_context.lifespan_context.browser_pool.crawler(
+            PRIORITY_BULK, fetcher=ctx.request_context.lifespan_context.static_fetcher
+        )
         supabase_client = ctx.request_context.lifespan_context.supabase_client
+        page_processor = ctx.request_context.lifespan_context.page_processor
         
+        # Streaming mode: index each page as soon as it is crawled
+        if os.getenv("USE_STREAMING_CRAWL", "false") == "true":
+            return await _smart_crawl_url_streaming(crawler, supabase_client, url, max_depth, max_concurrent, chunk_size, incremental, max_pages, lastmod_since, page_processor)
+
         # Determine the crawl strategy
         crawl_results = []
         crawl_type = None
+        sitemap_lastmods = {}
+        not_modified_urls = []
         
         if is_txt(url):
             # For text files, use simple crawl
@@ -562,21 +847,27 @@ async def smart_crawl_url(ctx: Context, url: str, max_depth: int = 3, max_concur
             crawl_type = "text_file"
         elif is_sitemap(url):
             # For sitemaps, extract URLs and crawl in parallel
-            sitemap_urls = parse_sitemap(url)
+            sitemap_entries = await parse_sitemap_entries(url, lastmod_since)
+            sitemap_urls = [entry['url'] for entry in sitemap_entries]
             if not sitemap_urls:
                 return json.dumps({
                     "success": False,
                     "url": url,
                     "error": "No URLs found in sitemap"
                 }, indent=2)
-            crawl_results = await crawl_batch(crawler, sitemap_urls, max_concurrent=max_concurrent)
+            sitemap_lastmods = {entry['url']: entry['lastmod'] for entry in sitemap_entries if entry['lastmod']}
+            # Skip URLs the sitemap or server reports as unchanged before spending browser sessions on them
+            if incremental:
+                sitemap_urls, not_modified_urls = await filter_unchanged_urls(supabase_client, sitemap_urls, sitemap_lastmods)
+            if sitemap_urls:
+                crawl_results = await crawl_batch(crawler, sitemap_urls, max_concurrent=max_concurrent)
             crawl_type = "sitemap"
         else:
             # For regular URLs, use recursive crawl
-            crawl_results = await crawl_recursive_internal_links(crawler, [url], max_depth=max_depth, max_concurrent=max_concurrent)
+            crawl_results = await crawl_recursive_internal_links(crawler, [url], max_depth=max_depth, max_concurrent=max_concurrent, max_pages=max_pages)
             crawl_type = "webpage"
         
-        if not crawl_results:
+        if not crawl_results and not not_modified_urls:
             return json.dumps({
                 "success": False,
                 "url": url,
@@ -594,11 +885,27 @@ async def smart_crawl_url(ctx: Context, url: str, max_depth: int = 3, max_concur
         source_content_map = {}
         source_word_counts = {}
         
+        # In incremental mode, skip pages whose content is unchanged since the last crawl
+        page_hashes = {doc['url']: compute_content_hash(doc['markdown']) for doc in crawl_results}
+        pages_crawled = len(crawl_results)
+        unchanged_docs = []
+        if incremental:
+            previous_hashes = await asyncio.to_thread(get_page_hashes, supabase_client, list(page_hashes))
+            unchanged_docs = [doc for doc in crawl_results if previous_hashes.get(doc['url']) == page_hashes[doc['url']]]
+            crawl_results = [doc for doc in crawl_results if previous_hashes.get(doc['url']) != page_hashes[doc['url']]]
+        
+        # Chunk the pages and extract their code blocks in parallel in the page processing pool
+        extract_code_examples_enabled = os.getenv("USE_AGENTIC_RAG", "false") == "true"
+        processed_pages = await asyncio.gather(*(
+            process_page_content(page_processor, doc['markdown'], chunk_size, extract_code_examples_enabled)
+            for doc in crawl_results
+        ))
+        
         # Process documentation chunks
-        for doc in crawl_results:
+        for doc, processed in zip(crawl_results, processed_pages):
             source_url = doc['url']
             md = doc['markdown']
-            chunks = smart_chunk_markdown(md, chunk_size=chunk_size)
+            chunks = processed.chunks
             
             # Extract source_id
             parsed_url = urlparse(source_url)
@@ -612,10 +919,10 @@ async def smart_crawl_url(ctx: Context, url: str, max_depth: int = 3, max_concur
             for i, chunk in enumerate(chunks):
                 urls.append(source_url)
                 chunk_numbers.append(i)
-                contents.append(chunk)
+                contents.append(chunk.text)
                 
-                # Extract metadata
-                meta = extract_section_info(chunk)
+                # Section path and size are computed while chunking
+                meta = chunk.metadata()
                 meta["chunk_index"] = i
                 meta["url"] = source_url
                 meta["source"] = source_id
@@ -628,91 +935,59 @@ async def smart_crawl_url(ctx: Context, url: str, max_depth: int = 3, max_concur
                 
                 chunk_count += 1
         
+        # Unchanged pages still count towards the word count of sources that are updated
+        for doc in unchanged_docs:
+            parsed_url = urlparse(doc['url'])
+            source_id = parsed_url.netloc or parsed_url.path
+            if source_id in source_word_counts:
+                source_word_counts[source_id] += len(doc['markdown'].split())
+        
         # Create url_to_full_document mapping
         url_to_full_document = {}
         for doc in crawl_results:
             url_to_full_document[doc['url']] = doc['markdown']
         
         # Update source information for each unique source FIRST (before inserting documents)
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-            source_summary_args = [(source_id, content) for source_id, content in source_content_map.items()]
-            source_summaries = list(executor.map(lambda args: extract_source_summary(args[0], args[1]), source_summary_args))
+        source_summary_args = [(source_id, content) for source_id, content in source_content_map.items()]
+        source_summaries = await asyncio.gather(*(
+            asyncio.to_thread(extract_source_summary, source_id, content)
+            for source_id, content in source_summary_args
+        ))
         
         for (source_id, _), summary in zip(source_summary_args, source_summaries):
             word_count = source_word_counts.get(source_id, 0)
-            update_source_info(supabase_client, source_id, summary, word_count)
+            await asyncio.to_thread(update_source_info, supabase_client, source_id, summary, word_count)
         
         # Add documentation chunks to Supabase (AFTER sources exist)
         batch_size = 20
-        add_documents_to_supabase(supabase_client, urls, chunk_numbers, contents, metadatas, url_to_full_document, batch_size=batch_size)
+        chunk_count = await asyncio.to_thread(add_documents_to_supabase, supabase_client, urls, chunk_numbers, contents, metadatas, url_to_full_document, batch_size=batch_size, incremental=incremental)
         
         # Extract and process code examples from all documents only if enabled
-        extract_code_examples_enabled = os.getenv("USE_AGENTIC_RAG", "false") == "true"
+        code_examples_stored = 0
         if extract_code_examples_enabled:
-            all_code_blocks = []
-            code_urls = []
-            code_chunk_numbers = []
-            code_examples = []
-            code_summaries = []
-            code_metadatas = []
-            
-            # Extract code blocks from all documents
-            for doc in crawl_results:
-                source_url = doc['url']
-                md = doc['markdown']
-                code_blocks = extract_code_blocks(md)
-                
-                if code_blocks:
-                    # Process code examples in parallel
-                    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-                        # Prepare arguments for parallel processing
-                        summary_args = [(block['code'], block['context_before'], block['context_after']) 
-                                        for block in code_blocks]
-                        
-                        # Generate summaries in parallel
-                        summaries = list(executor.map(process_code_example, summary_args))
-                    
-                    # Prepare code example data
-                    parsed_url = urlparse(source_url)
-                    source_id = parsed_url.netloc or parsed_url.path
-                    
-                    for i, (block, summary) in enumerate(zip(code_blocks, summaries)):
-                        code_urls.append(source_url)
-                        code_chunk_numbers.append(len(code_examples))  # Use global code example index
-                        code_examples.append(block['code'])
-                        code_summaries.append(summary)
-                        
-                        # Create metadata for code example
-                        code_meta = {
-                            "chunk_index": len(code_examples) - 1,
-                            "url": source_url,
-                            "source": source_id,
-                            "char_count": len(block['code']),
-                            "word_count": len(block['code'].split())
-                        }
-                        code_metadatas.append(code_meta)
-            
-            # Add all code examples to Supabase
-            if code_examples:
-                add_code_examples_to_supabase(
-                    supabase_client, 
-                    code_urls, 
-                    code_chunk_numbers, 
-                    code_examples, 
-                    code_summaries, 
-                    code_metadatas,
-                    batch_size=batch_size
-                )
+            for doc, processed in zip(crawl_results, processed_pages):
+                code_examples_stored += await asyncio.to_thread(store_code_examples_for_page, supabase_client, doc['url'], doc['markdown'], processed.code_blocks)
+        
+        if incremental:
+            crawl_rows = [build_crawl_metadata(doc['url'], page_hashes[doc['url']], doc.get('response_headers'), sitemap_lastmods.get(doc['url']))
+                          for doc in crawl_results + unchanged_docs]
+            await asyncio.to_thread(update_crawl_metadata, supabase_client, crawl_rows)
         
         return json.dumps({
             "success": True,
             "url": url,
             "crawl_type": crawl_type,
-            "pages_crawled": len(crawl_results),
+            "pages_crawled": pages_crawled,
+            "pages_unchanged": len(unchanged_docs),
+            "pages_not_modified": len(not_modified_urls),
             "chunks_stored": chunk_count,
-            "code_examples_stored": len(code_examples),
+            "code_examples_stored": code_examples_stored,
             "sources_updated": len(source_content_map),
-            "urls_crawled": [doc['url'] for doc in crawl_results][:5] + (["..."] if len(crawl_results) > 5 else [])
+            "urls_crawled": [doc['url'] for doc in crawl_results + unchanged_docs][:5] + (["..."] if pages_crawled > 5 else []),
+            "embedding_cache": get_embedding_cache_stats(),
+            "llm_scheduler": get_llm_scheduler().stats(),
+            "browser_pool": crawler.pool.stats(),
+            "http_fetch": crawler.fetcher.stats() if crawler.fetcher else None
         }, indent=2)
     except Exception as e:
         return json.dumps({
@@ -721,6 +996,78 @@ async def smart_crawl_url(ctx: Context, url: str, max_depth: int = 3, max_concur
             "error": str(e)
         }, indent=2)
 
+async def _smart_crawl_url_streaming(
+    crawler: PooledCrawler,
+    supabase_client: Client,
+    url: str,
+    max_depth: int,
+    max_concurrent: int,
+    chunk_size: int,
+    incremental: bool = False,
+    max_pages: Optional[int] = None,
+    lastmod_since: Optional[str] = None,
+    page_processor: Optional[PageProcessor] = None
+) -> str:
+    """Streaming variant of smart_crawl_url that indexes pages while the crawl is running."""
+    sitemap_lastmods = {}
+    not_modified_urls = []
+    if is_txt(url):
+        async def text_file_pages():
+            for doc in await crawl_markdown_file(crawler, url):
+                yield doc
+        pages = text_file_pages()
+        crawl_type = "text_file"
+    elif is_sitemap(url):
+        # URLs are crawled while the rest of the sitemap is still being read
+        sitemap_progress = {"urls_found": 0}
+        pages = crawl_sitemap_stream(
+            crawler, supabase_client, url, max_concurrent=max_concurrent, incremental=incremental,
+            lastmod_since=lastmod_since, sitemap_lastmods=sitemap_lastmods,
+            not_modified_urls=not_modified_urls, progress=sitemap_progress
+        )
+        crawl_type = "sitemap"
+    else:
+        pages = crawl_recursive_internal_links_stream(crawler, [url], max_depth=max_depth, max_concurrent=max_concurrent, max_pages=max_pages)
+        crawl_type = "webpage"
+
+    queue_size = int(os.getenv("CRAWL_PIPELINE_QUEUE_SIZE", "8"))
+    stats = await index_crawl_stream(
+        supabase_client, pages, crawl_type, chunk_size=chunk_size, queue_size=queue_size,
+        incremental=incremental, sitemap_lastmods=sitemap_lastmods, page_processor=page_processor
+    )
+
+    if crawl_type == "sitemap" and not sitemap_progress["urls_found"]:
+        return json.dumps({
+            "success": False,
+            "url": url,
+            "error": "No URLs found in sitemap"
+        }, indent=2)
+
+    if not stats["pages_crawled"] and not stats["pages_unchanged"] and not not_modified_urls:
+        return json.dumps({
+            "success": False,
+            "url": url,
+            "error": "No content found"
+        }, indent=2)
+
+    return json.dumps({
+        "success": True,
+        "url": url,
+        "crawl_type": crawl_type,
+        "streaming": True,
+        "pages_crawled": stats["pages_crawled"] + stats["pages_unchanged"],
+        "pages_unchanged": stats["pages_unchanged"],
+        "pages_not_modified": len(not_modified_urls),
+        "chunks_stored": stats["chunks_stored"],
+        "code_examples_stored": stats["code_examples_stored"],
+        "sources_updated": stats["sources_updated"],
+        "urls_crawled": stats["urls_crawled"] + (["..."] if stats["pages_crawled"] > len(stats["urls_crawled"]) else []),
+        "embedding_cache": get_embedding_cache_stats(),
+        "llm_scheduler": get_llm_scheduler().stats(),
+        "browser_pool": crawler.pool.stats(),
+        "http_fetch": crawler.fetcher.stats() if crawler.fetcher else None
+    }, indent=2)
+
 @mcp.tool()
 async def get_available_sources(ctx: Context) -> str:
     """
@@ -772,8 +1119,29 @@ async def get_available_sources(ctx: Context) -> str:
             "error": str(e)
         }, indent=2)
 
+def build_document_filter(source: Optional[str] = None, section: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Build the metadata filter of a document search.
+    
+    The section filter matches the section_headings list stored with each chunk, so it
+    selects every chunk nested under that heading and uses the GIN index on metadata.
+    
+    Args:
+        source: Optional source domain
+        section: Optional heading title
+        
+    Returns:
+        Metadata filter, or None if neither is provided
+    """
+    filter_metadata = {}
+    if source and source.strip():
+        filter_metadata["source"] = source
+    if section and section.strip():
+        filter_metadata["section_headings"] = [section.strip()]
+    return filter_metadata or None
+
 @mcp.tool()
-async def perform_rag_query(ctx: Context, query: str, source: str = None, match_count: int = 5) -> str:
+async def perform_rag_query(ctx: Context, query: str, source: str = None, match_count: int = 5, ef_search: int = None, probes: int = None, section: str = None) -> str:
     """
     Perform a RAG (Retrieval Augmented Generation) query on the stored content.
     
@@ -786,6 +1154,9 @@ async def perform_rag_query(ctx: Context, query: str, source: str = None, match_
         query: The search query
         source: Optional source domain to filter results (e.g., 'example.com')
         match_count: Maximum number of results to return (default: 5)
+        ef_search: Optional HNSW search breadth for this query; higher improves recall at the cost of latency
+        probes: Optional number of ivfflat lists scanned for this query; higher improves recall at the cost of latency
+        section: Optional heading to restrict results to, e.g. 'Installation' (matches chunks anywhere under that heading)
     
     Returns:
         JSON string with the search results
@@ -797,89 +1168,36 @@ async def perform_rag_query(ctx: Context, query: str, source: str = None, match_
         # Check if hybrid search is enabled
         use_hybrid_search = os.getenv("USE_HYBRID_SEARCH", "false") == "true"
         
-        # Prepare filter if source is provided and not empty
-        filter_metadata = None
-        if source and source.strip():
-            filter_metadata = {"source": source}
+        # Prepare filter if source or section is provided and not empty
+        filter_metadata = build_document_filter(source, section)
         
         if use_hybrid_search:
-            # Hybrid search: combine vector and keyword search
-            
-            # 1. Get vector search results (get more to account for filtering)
-            vector_results = search_documents(
+            # Hybrid search: vector and full-text matches fused with reciprocal rank fusion in Postgres
+            results = await hybrid_search_documents_async(
                 client=supabase_client,
                 query=query,
-                match_count=match_count * 2,  # Get double to have room for filtering
-                filter_metadata=filter_metadata
+                match_count=match_count,
+                filter_metadata=filter_metadata,
+                ef_search=ef_search,
+                probes=probes
             )
             
-            # 2. Get keyword search results using ILIKE
-            keyword_query = supabase_client.from_('crawled_pages')\
-                .select('id, url, chunk_number, content, metadata, source_id')\
-                .ilike('content', f'%{query}%')
-            
-            # Apply source filter if provided
-            if source and source.strip():
-                keyword_query = keyword_query.eq('source_id', source)
-            
-            # Execute keyword search
-            keyword_response = keyword_query.limit(match_count * 2).execute()
-            keyword_results = keyword_response.data if keyword_response.data else []
-            
-            # 3. Combine results with preference for items appearing in both
-            seen_ids = set()
-            combined_results = []
-            
-            # First, add items that appear in both searches (these are the best matches)
-            vector_ids = {r.get('id') for r in vector_results if r.get('id')}
-            for kr in keyword_results:
-                if kr['id'] in vector_ids and kr['id'] not in seen_ids:
-                    # Find the vector result to get similarity score
-                    for vr in vector_results:
-                        if vr.get('id') == kr['id']:
-                            # Boost similarity score for items in both results
-                            vr['similarity'] = min(1.0, vr.get('similarity', 0) * 1.2)
-                            combined_results.append(vr)
-                            seen_ids.add(kr['id'])
-                            break
-            
-            # Then add remaining vector results (semantic matches without exact keyword)
-            for vr in vector_results:
-                if vr.get('id') and vr['id'] not in seen_ids and len(combined_results) < match_count:
-                    combined_results.append(vr)
-                    seen_ids.add(vr['id'])
-            
-            # Finally, add pure keyword matches if we still need more results
-            for kr in keyword_results:
-                if kr['id'] not in seen_ids and len(combined_results) < match_count:
-                    # Convert keyword result to match vector result format
-                    combined_results.append({
-                        'id': kr['id'],
-                        'url': kr['url'],
-                        'chunk_number': kr['chunk_number'],
-                        'content': kr['content'],
-                        'metadata': kr['metadata'],
-                        'source_id': kr['source_id'],
-                        'similarity': 0.5  # Default similarity for keyword-only matches
-                    })
-                    seen_ids.add(kr['id'])
-            
-            # Use combined results
-            results = combined_results[:match_count]
-            
         else:
             # Standard vector search only
-            results = search_documents(
+            results = await search_documents_async(
                 client=supabase_client,
                 query=query,
                 match_count=match_count,
-                filter_metadata=filter_metadata
+                filter_metadata=filter_metadata,
+                ef_search=ef_search,
+                probes=probes
             )
         
         # Apply reranking if enabled
         use_reranking = os.getenv("USE_RERANKING", "false") == "true"
-        if use_reranking and ctx.request_context.lifespan_context.reranking_model:
-            results = rerank_results(ctx.request_context.lifespan_context.reranking_model, query, results, content_key="content")
+        reranker = await ctx.request_context.lifespan_context.reranker.get() if use_reranking else None
+        if reranker:
+            results = await rerank_results(reranker, query, results, content_key="content")
         
         # Format the results
         formatted_results = []
@@ -899,10 +1217,12 @@ async def perform_rag_query(ctx: Context, query: str, source: str = None, match_
             "success": True,
             "query": query,
             "source_filter": source,
+            "section_filter": section,
             "search_mode": "hybrid" if use_hybrid_search else "vector",
-            "reranking_applied": use_reranking and ctx.request_context.lifespan_context.reranking_model is not None,
+            "reranking_applied": use_reranking and reranker is not None,
             "results": formatted_results,
-            "count": len(formatted_results)
+            "count": len(formatted_results),
+            "query_embedding_cache": get_query_embedding_cache_stats()
         }, indent=2)
     except Exception as e:
         return json.dumps({
@@ -912,7 +1232,99 @@ async def perform_rag_query(ctx: Context, query: str, source: str = None, match_
         }, indent=2)
 
 @mcp.tool()
-async def search_code_examples(ctx: Context, query: str, source_id: str = None, match_count: int = 5) -> str:
+async def perform_rag_queries(ctx: Context, queries: List[str], source: str = None, match_count: int = 5, ef_search: int = None, probes: int = None, section: str = None) -> str:
+    """
+    Perform several RAG queries on the stored content in one call.
+    
+    Use this instead of repeated perform_rag_query calls when you have multiple sub-questions.
+    All queries are embedded with a single embedding request, searched concurrently and
+    reranked together, and the results are grouped by query.
+    
+    Args:
+        ctx: The MCP server provided context
+        queries: The search queries (at most 20)
+        source: Optional source domain to filter results (e.g., 'example.com')
+        match_count: Maximum number of results to return per query (default: 5)
+        ef_search: Optional HNSW search breadth for these queries; higher improves recall at the cost of latency
+        probes: Optional number of ivfflat lists scanned for these queries; higher improves recall at the cost of latency
+        section: Optional heading to restrict results to, e.g. 'Installation' (matches chunks anywhere under that heading)
+    
+    Returns:
+        JSON string with the search results of each query
+    """
+    if not queries or len(queries) > MAX_BATCH_QUERIES:
+        return json.dumps({
+            "success": False,
+            "error": f"Provide between 1 and {MAX_BATCH_QUERIES} queries."
+        }, indent=2)
+    
+    try:
+        # Get the Supabase client from the context
+        supabase_client = ctx.request_context.lifespan_context.supabase_client
+        
+        # Check if hybrid search is enabled
+        use_hybrid_search = os.getenv("USE_HYBRID_SEARCH", "false") == "true"
+        
+        # Prepare filter if source or section is provided and not empty
+        filter_metadata = build_document_filter(source, section)
+        
+        # Embed all queries at once, then run the searches concurrently
+        query_embeddings = await create_query_embeddings_async(queries)
+        search = hybrid_search_documents if use_hybrid_search else search_documents
+        results_per_query = await asyncio.gather(*(
+            asyncio.to_thread(search, supabase_client, query, match_count, filter_metadata, query_embedding, ef_search, probes)
+            for query, query_embedding in zip(queries, query_embeddings)
+        ))
+        
+        # Apply reranking if enabled
+        use_reranking = os.getenv("USE_RERANKING", "false") == "true"
+        reranker = await ctx.request_context.lifespan_context.reranker.get() if use_reranking else None
+        if reranker:
+            # Concurrent rerank requests are scored together in one model call
+            results_per_query = await asyncio.gather(*(
+                rerank_results(reranker, query, results, content_key="content")
+                for query, results in zip(queries, results_per_query)
+            ))
+        
+        # Format the results grouped by query
+        grouped_results = []
+        for query, results in zip(queries, results_per_query):
+            formatted_results = []
+            for result in results:
+                formatted_result = {
+                    "url": result.get("url"),
+                    "content": result.get("content"),
+                    "metadata": result.get("metadata"),
+                    "similarity": result.get("similarity")
+                }
+                # Include rerank score if available
+                if "rerank_score" in result:
+                    formatted_result["rerank_score"] = result["rerank_score"]
+                formatted_results.append(formatted_result)
+            grouped_results.append({
+                "query": query,
+                "results": formatted_results,
+                "count": len(formatted_results)
+            })
+        
+        return json.dumps({
+            "success": True,
+            "source_filter": source,
+            "section_filter": section,
+            "search_mode": "hybrid" if use_hybrid_search else "vector",
+            "reranking_applied": use_reranking and reranker is not None,
+            "queries": grouped_results,
+            "query_embedding_cache": get_query_embedding_cache_stats()
+        }, indent=2)
+    except Exception as e:
+        return json.dumps({
+            "success": False,
+            "queries": queries,
+            "error": str(e)
+        }, indent=2)
+
+@mcp.tool()
+async def search_code_examples(ctx: Context, query: str, source_id: str = None, match_count: int = 5, ef_search: int = None, probes: int = None) -> str:
     """
     Search for code examples relevant to the query.
     
@@ -927,6 +1339,8 @@ async def search_code_examples(ctx: Context, query: str, source_id: str = None,
         query: The search query
         source_id: Optional source ID to filter results (e.g., 'example.com')
         match_count: Maximum number of results to return (default: 5)
+        ef_search: Optional HNSW search breadth for this query; higher improves recall at the cost of latency
+        probes: Optional number of ivfflat lists scanned for this query; higher improves recall at the cost of latency
     
     Returns:
         JSON string with the search results
@@ -952,89 +1366,32 @@ async def search_code_examples(ctx: Context, query: str, source_id: str = None,
             filter_metadata = {"source": source_id}
         
         if use_hybrid_search:
-            # Hybrid search: combine vector and keyword search
-            
-            # Import the search function from utils
-            from utils import search_code_examples as search_code_examples_impl
-            
-            # 1. Get vector search results (get more to account for filtering)
-            vector_results = search_code_examples_impl(
+            # Hybrid search: vector and full-text matches fused with reciprocal rank fusion in Postgres
+            results = await hybrid_search_code_examples_async(
                 client=supabase_client,
                 query=query,
-                match_count=match_count * 2,  # Get double to have room for filtering
-                filter_metadata=filter_metadata
+                match_count=match_count,
+                filter_metadata=filter_metadata,
+                ef_search=ef_search,
+                probes=probes
             )
             
-            # 2. Get keyword search results using ILIKE on both content and summary
-            keyword_query = supabase_client.from_('code_examples')\
-                .select('id, url, chunk_number, content, summary, metadata, source_id')\
-                .or_(f'content.ilike.%{query}%,summary.ilike.%{query}%')
-            
-            # Apply source filter if provided
-            if source_id and source_id.strip():
-                keyword_query = keyword_query.eq('source_id', source_id)
-            
-            # Execute keyword search
-            keyword_response = keyword_query.limit(match_count * 2).execute()
-            keyword_results = keyword_response.data if keyword_response.data else []
-            
-            # 3. Combine results with preference for items appearing in both
-            seen_ids = set()
-            combined_results = []
-            
-            # First, add items that appear in both searches (these are the best matches)
-            vector_ids = {r.get('id') for r in vector_results if r.get('id')}
-            for kr in keyword_results:
-                if kr['id'] in vector_ids and kr['id'] not in seen_ids:
-                    # Find the vector result to get similarity score
-                    for vr in vector_results:
-                        if vr.get('id') == kr['id']:
-                            # Boost similarity score for items in both results
-                            vr['similarity'] = min(1.0, vr.get('similarity', 0) * 1.2)
-                            combined_results.append(vr)
-                            seen_ids.add(kr['id'])
-                            break
-            
-            # Then add remaining vector results (semantic matches without exact keyword)
-            for vr in vector_results:
-                if vr.get('id') and vr['id'] not in seen_ids and len(combined_results) < match_count:
-                    combined_results.append(vr)
-                    seen_ids.add(vr['id'])
-            
-            # Finally, add pure keyword matches if we still need more results
-            for kr in keyword_results:
-                if kr['id'] not in seen_ids and len(combined_results) < match_count:
-                    # Convert keyword result to match vector result format
-                    combined_results.append({
-                        'id': kr['id'],
-                        'url': kr['url'],
-                        'chunk_number': kr['chunk_number'],
-                        'content': kr['content'],
-                        'summary': kr['summary'],
-                        'metadata': kr['metadata'],
-                        'source_id': kr['source_id'],
-                        'similarity': 0.5  # Default similarity for keyword-only matches
-                    })
-                    seen_ids.add(kr['id'])
-            
-            # Use combined results
-            results = combined_results[:match_count]
-            
         else:
             # Standard vector search only
-            from utils import search_code_examples as search_code_examples_impl
-            
-            results = search_code_examples_impl(
+            results = await search_code_examples_async(
                 client=supabase_client,
                 query=query,
                 match_count=match_count,
-                filter_metadata=filter_metadata
+                filter_metadata=filter_metadata,
+                ef_search=ef_search,
+                probes=probes
             )
         
         # Apply reranking if enabled
         use_reranking = os.getenv("USE_RERANKING", "false") == "true"
-        if use_reranking and ctx.request_context.lifespan_context.reranking_model:
-            results = rerank_results(ctx.request_context.lifespan_context.reranking_model, query, results, content_key="content")
+        reranker = await ctx.request_context.lifespan_context.reranker.get() if use_reranking else None
+        if reranker:
+            results = await rerank_results(reranker, query, results, content_key="content", namespace="code_examples")
         
         # Format the results
         formatted_results = []
@@ -1057,9 +1414,10 @@ async def search_code_examples(ctx: Context, query: str, source_id: str = None,
             "query": query,
             "source_filter": source_id,
             "search_mode": "hybrid" if use_hybrid_search else "vector",
-            "reranking_applied": use_reranking and ctx.request_context.lifespan_context.reranking_model is not None,
+            "reranking_applied": use_reranking and reranker is not None,
             "results": formatted_results,
-            "count": len(formatted_results)
+            "count": len(formatted_results),
+            "query_embedding_cache": get_query_embedding_cache_stats()
         }, indent=2)
     except Exception as e:
         return json.dumps({
@@ -1101,7 +1459,7 @@ async def check_ai_script_hallucinations(ctx: Context, script_path: str) -> str:
             }, indent=2)
         
         # Get the knowledge validator from context
-        knowledge_validator = ctx.request_context.lifespan_context.knowledge_validator
+        knowledge_validator = await ctx.request_context.lifespan_context.knowledge_validator.get()
         
         if not knowledge_validator:
             return json.dumps({
@@ -1118,6 +1476,9 @@ async def check_ai_script_hallucinations(ctx: Context, script_path: str) -> str:
                 "error": validation["error"]
             }, indent=2)
         
+        from ai_script_analyzer import AIScriptAnalyzer
+        from hallucination_reporter import HallucinationReporter
+        
         # Step 1: Analyze script structure using AST
         analyzer = AIScriptAnalyzer()
         analysis_result = analyzer.analyze_script(script_path)
@@ -1240,7 +1601,7 @@ async def query_knowledge_graph(ctx: Context, command: str) -> str:
             }, indent=2)
         
         # Get Neo4j driver from context
-        repo_extractor = ctx.request_context.lifespan_context.repo_extractor
+        repo_extractor = await ctx.request_context.lifespan_context.repo_extractor.get()
         if not repo_extractor or not repo_extractor.driver:
             return json.dumps({
                 "success": False,
@@ -1651,7 +2012,7 @@ async def parse_github_repository(ctx: Context, repo_url: str) -> str:
             }, indent=2)
         
         # Get the repository extractor from context
-        repo_extractor = ctx.request_context.lifespan_context.repo_extractor
+        repo_extractor = await ctx.request_context.lifespan_context.repo_extractor.get()
         
         if not repo_extractor:
             return json.dumps({
@@ -1748,7 +2109,7 @@ async def parse_github_repository(ctx: Context, repo_url: str) -> str:
             "error": f"Repository parsing failed: {str(e)}"
         }, indent=2)
 
-async def crawl_markdown_file(crawler: AsyncWebCrawler, url: str) -> List[Dict[str, Any]]:
+async def crawl_markdown_file(crawler: "AsyncWebCrawler", url: str) -> List[Dict[str, Any]]:
     """
     Crawl a .txt or markdown file.
     
@@ -1759,16 +2120,84 @@ async def crawl_markdown_file(crawler: AsyncWebCrawler, url: str) -> List[Dict[s
     Returns:
         List of dictionaries with URL and markdown content
     """
+    from crawl4ai import CrawlerRunConfig
+    
     crawl_config = CrawlerRunConfig()
 
     result = await crawler.arun(url=url, config=crawl_config)
     if result.success and result.markdown:
-        return [{'url': url, 'markdown': result.markdown}]
+        return [{'url': url, 'markdown': result.markdown, 'response_headers': result.response_headers or {}}]
     else:
         print(f"Failed to crawl {url}: {result.error_message}")
         return []
 
-async def crawl_batch(crawler: AsyncWebCrawler, urls: List[str], max_concurrent: int = 10) -> List[Dict[str, Any]]:
+async def filter_unchanged_urls(
+    supabase_client: Client,
+    urls: List[str],
+    sitemap_lastmods: Optional[Dict[str, str]] = None,
+    max_concurrent: int = 20
+) -> Tuple[List[str], List[str]]:
+    """
+    Split URLs into those that need crawling and those unchanged since the last incremental crawl.
+    
+    A URL whose sitemap <lastmod> matches the recorded one is unchanged without any request.
+    Otherwise, if an ETag or Last-Modified value was recorded, a conditional HEAD request
+    decides: a 304 response (or an identical ETag) means the page is unchanged. URLs
+    without recorded crawl metadata are always crawled.
+    
+    Args:
+        supabase_client: Supabase client
+        urls: List of URLs to check
+        sitemap_lastmods: Optional mapping of URLs to their current sitemap <lastmod> value
+        max_concurrent: Maximum number of concurrent HEAD requests
+        
+    Returns:
+        Tuple of (URLs to crawl, unchanged URLs)
+    """
+    sitemap_lastmods = sitemap_lastmods or {}
+    crawl_metadata = await asyncio.to_thread(get_crawl_metadata, supabase_client, urls)
+    
+    unchanged = set()
+    to_check = []
+    for url in urls:
+        stored = crawl_metadata.get(url)
+        if not stored or not stored.get("content_hash"):
+            continue
+        lastmod = sitemap_lastmods.get(url)
+        if lastmod and stored.get("sitemap_lastmod"):
+            if lastmod == stored["sitemap_lastmod"]:
+                unchanged.add(url)
+        elif stored.get("etag") or stored.get("last_modified"):
+            to_check.append(url)
+    
+    if to_check:
+        semaphore = asyncio.Semaphore(max_concurrent)
+        
+        async def is_unchanged(http_client: httpx.AsyncClient, url: str) -> bool:
+            stored = crawl_metadata[url]
+            headers = {}
+            if stored.get("etag"):
+                headers["If-None-Match"] = stored["etag"]
+            if stored.get("last_modified"):
+                headers["If-Modified-Since"] = stored["last_modified"]
+            try:
+                async with semaphore:
+                    response = await http_client.head(url, headers=headers)
+            except Exception as e:
+                print(f"Conditional request failed for {url}: {e}")
+                return False
+            if response.status_code == 304:
+                return True
+            # Some servers ignore conditional headers but still return a stable ETag
+            return response.status_code == 200 and bool(stored.get("etag")) and response.headers.get("etag") == stored["etag"]
+        
+        async with httpx.AsyncClient(follow_redirects=True, timeout=10.0) as http_client:
+            results = await asyncio.gather(*(is_unchanged(http_client, url) for url in to_check))
+        unchanged.update(url for url, same in zip(to_check, results) if same)
+    
+    return [url for url in urls if url not in unchanged], [url for url in urls if url in unchanged]
+
+async def crawl_batch(crawler: "AsyncWebCrawler", urls: List[str], max_concurrent: int = 10) -> List[Dict[str, Any]]:
     """
     Batch crawl multiple URLs in parallel.
     
@@ -1780,6 +2209,8 @@ async def crawl_batch(crawler: AsyncWebCrawler, urls: List[str], max_concurrent:
     Returns:
         List of dictionaries with URL and markdown content
     """
+    from crawl4ai import CrawlerRunConfig, CacheMode, MemoryAdaptiveDispatcher
+    
     crawl_config = CrawlerRunConfig(cache_mode=CacheMode.BYPASS, stream=False)
     dispatcher = MemoryAdaptiveDispatcher(
         memory_threshold_percent=70.0,
@@ -1788,9 +2219,9 @@ async def crawl_batch(crawler: AsyncWebCrawler, urls: List[str], max_concurrent:
     )
 
     results = await crawler.arun_many(urls=urls, config=crawl_config, dispatcher=dispatcher)
-    return [{'url': r.url, 'markdown': r.markdown} for r in results if r.success and r.markdown]
+    return [{'url': r.url, 'markdown': r.markdown, 'response_headers': r.response_headers or {}} for r in results if r.success and r.markdown]
 
-async def crawl_recursive_internal_links(crawler: AsyncWebCrawler, start_urls: List[str], max_depth: int = 3, max_concurrent: int = 10) -> List[Dict[str, Any]]:
+async def crawl_recursive_internal_links(crawler: "AsyncWebCrawler", start_urls: List[str], max_depth: int = 3, max_concurrent: int = 10, max_pages: Optional[int] = None) -> List[Dict[str, Any]]:
     """
     Recursively crawl internal links from start URLs up to a maximum depth.
     
@@ -1799,47 +2230,136 @@ async def crawl_recursive_internal_links(crawler: AsyncWebCrawler, start_urls: L
         start_urls: List of starting URLs
         max_depth: Maximum recursion depth
         max_concurrent: Maximum number of concurrent browser sessions
+        max_pages: Maximum number of pages to crawl (defaults to CRAWL_MAX_PAGES, unlimited if unset)
         
     Returns:
         List of dictionaries with URL and markdown content
     """
-    run_config = CrawlerRunConfig(cache_mode=CacheMode.BYPASS, stream=False)
+    return [doc async for doc in crawl_recursive_internal_links_stream(crawler, start_urls, max_depth, max_concurrent, max_pages)]
+
+async def crawl_batch_stream(crawler: "AsyncWebCrawler", urls: List[str], max_concurrent: int = 10) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Batch crawl multiple URLs in parallel, yielding each page as soon as it is crawled.
+
+    Args:
+        crawler: AsyncWebCrawler instance
+        urls: List of URLs to crawl
+        max_concurrent: Maximum number of concurrent browser sessions
+
+    Yields:
+        Dictionaries with URL and markdown content
+    """
+    if not urls:
+        return
+
+    from crawl4ai import CrawlerRunConfig, CacheMode, MemoryAdaptiveDispatcher
+    
+    crawl_config = CrawlerRunConfig(cache_mode=CacheMode.BYPASS, stream=True)
     dispatcher = MemoryAdaptiveDispatcher(
         memory_threshold_percent=70.0,
         check_interval=1.0,
         max_session_permit=max_concurrent
     )
 
-    visited = set()
-
-    def normalize_url(url):
-        return urldefrag(url)[0]
+    async for r in await crawler.arun_many(urls=urls, config=crawl_config, dispatcher=dispatcher):
+        if r.success and r.markdown:
+            yield {'url': r.url, 'markdown': r.markdown, 'response_headers': r.response_headers or {}}
+
+async def crawl_sitemap_stream(
+    crawler: "AsyncWebCrawler",
+    supabase_client: Client,
+    sitemap_url: str,
+    max_concurrent: int = 10,
+    incremental: bool = False,
+    lastmod_since: Optional[str] = None,
+    sitemap_lastmods: Optional[Dict[str, str]] = None,
+    not_modified_urls: Optional[List[str]] = None,
+    progress: Optional[Dict[str, int]] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Crawl the pages of a sitemap while it is being read, yielding each page as soon as it is crawled.
 
-    current_urls = set([normalize_url(u) for u in start_urls])
-    results_all = []
+    URLs are taken from the sitemap reader in batches of SITEMAP_CRAWL_BATCH_SIZE, so
+    crawling starts after the first batch instead of after the whole sitemap.
 
-    for depth in range(max_depth):
-        urls_to_crawl = [normalize_url(url) for url in current_urls if normalize_url(url) not in visited]
-        if not urls_to_crawl:
-            break
+    Args:
+        crawler: AsyncWebCrawler instance
+        supabase_client: Supabase client, used to skip unchanged pages in incremental mode
+        sitemap_url: URL of the sitemap
+        max_concurrent: Maximum number of concurrent browser sessions
+        incremental: Skip pages unchanged since the last incremental crawl
+        lastmod_since: Optional ISO date, pages last modified before it are skipped
+        sitemap_lastmods: Optional mapping filled with the <lastmod> value of each URL
+        not_modified_urls: Optional list filled with the URLs skipped as unchanged
+        progress: Optional dictionary whose "urls_found" counts the URLs read from the sitemap
 
-        results = await crawler.arun_many(urls=urls_to_crawl, config=run_config, dispatcher=dispatcher)
-        next_level_urls = set()
+    Yields:
+        Dictionaries with URL and markdown content
+    """
+    batch_size = int(os.getenv("SITEMAP_CRAWL_BATCH_SIZE", "200"))
+    sitemap_lastmods = sitemap_lastmods if sitemap_lastmods is not None else {}
+    not_modified_urls = not_modified_urls if not_modified_urls is not None else []
+    progress = progress if progress is not None else {}
+    progress.setdefault("urls_found", 0)
+
+    async def crawl(urls: List[str]) -> AsyncIterator[Dict[str, Any]]:
+        if incremental:
+            urls, not_modified = await filter_unchanged_urls(supabase_client, urls, sitemap_lastmods)
+            not_modified_urls.extend(not_modified)
+        async for doc in crawl_batch_stream(crawler, urls, max_concurrent=max_concurrent):
+            yield doc
+
+    batch = []
+    # The reader keeps downloading and parsing in the background while a batch is crawled
+    async for entry in iter_sitemap_entries(sitemap_url, lastmod_since, max_concurrent=sitemap_max_concurrent()):
+        progress["urls_found"] += 1
+        if entry.lastmod:
+            sitemap_lastmods[entry.url] = entry.lastmod
+        batch.append(entry.url)
+        if len(batch) >= batch_size:
+            async for doc in crawl(batch):
+                yield doc
+            batch = []
+    if batch:
+        async for doc in crawl(batch):
+            yield doc
+
+async def crawl_recursive_internal_links_stream(crawler: "AsyncWebCrawler", start_urls: List[str], max_depth: int = 3, max_concurrent: int = 10, max_pages: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Recursively crawl internal links from start URLs, yielding each page as soon as it is crawled.
 
-        for result in results:
-            norm_url = normalize_url(result.url)
-            visited.add(norm_url)
+    Pages are dispatched continuously from a frontier ordered by depth rather than one
+    depth level at a time, with per-host concurrency and delay limits.
 
-            if result.success and result.markdown:
-                results_all.append({'url': result.url, 'markdown': result.markdown})
-                for link in result.links.get("internal", []):
-                    next_url = normalize_url(link["href"])
-                    if next_url not in visited:
-                        next_level_urls.add(next_url)
+    Args:
+        crawler: AsyncWebCrawler instance
+        start_urls: List of starting URLs
+        max_depth: Maximum recursion depth
+        max_concurrent: Maximum number of concurrent browser sessions
+        max_pages: Maximum number of pages to crawl (defaults to CRAWL_MAX_PAGES, unlimited if unset)
 
-        current_urls = next_level_urls
+    Yields:
+        Dictionaries with URL and markdown content
+    """
+    from crawl4ai import CrawlerRunConfig, CacheMode
+    
+    if max_pages is None:
+        max_pages = int(os.getenv("CRAWL_MAX_PAGES", "0")) or None
+    
+    frontier = FrontierCrawler(
+        crawler,
+        CrawlerRunConfig(cache_mode=CacheMode.BYPASS, stream=False),
+        max_depth=max_depth,
+        max_concurrent=max_concurrent,
+        max_per_host=int(os.getenv("CRAWL_MAX_CONCURRENT_PER_HOST", "0")) or None,
+        host_delay=float(os.getenv("CRAWL_HOST_DELAY_SECONDS", "0")),
+        max_pages=max_pages,
+        strip_query=os.getenv("CRAWL_STRIP_QUERY_PARAMS", "false") == "true"
+    )
 
-    return results_all
+    async for result in frontier.crawl(start_urls):
+        if result.success and result.markdown:
+            yield {'url': result.url, 'markdown': result.markdown, 'response_headers': result.response_headers or {}}
 
 async def main():
     transport = os.getenv("TRANSPORT", "sse")
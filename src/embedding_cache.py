@@ -0,0 +1,323 @@
+"""
+Embedding caches for the Crawl4AI MCP server.
+
+Document embeddings are stored in a local SQLite database keyed by a hash of
+(provider, model, text), so re-crawling unchanged content does not send the
+same chunks to the embedding provider again. Query embeddings are kept in a
+small in-memory cache so repeated searches skip the provider entirely.
+"""
+import asyncio
+import concurrent.futures
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# SQLite limits the number of bound parameters per statement
+_SQLITE_MAX_PARAMS = 500
+
+
+class EmbeddingCache:
+    """
+    SQLite-backed embedding cache with a size cap and least-recently-used eviction.
+
+    Vectors are stored as float32 blobs, which matches the precision pgvector
+    stores them with.
+    """
+
+    def __init__(self, path: str, max_entries: int = 500000):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            path: Path of the SQLite database file
+            max_entries: Maximum number of embeddings kept before the least recently used are evicted
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, embedding BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def make_key(provider: str, model: str, text: str) -> str:
+        """Build the cache key for a text embedded by the given provider and model."""
+        return hashlib.sha256(f"{provider}\0{model}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """
+        Look up embeddings for a list of keys and record hits and misses.
+
+        Args:
+            keys: Cache keys to look up
+
+        Returns:
+            Dictionary mapping each key found in the cache to its embedding
+        """
+        found: Dict[str, List[float]] = {}
+        unique_keys = list(dict.fromkeys(keys))
+
+        with self._lock:
+            for start in range(0, len(unique_keys), _SQLITE_MAX_PARAMS):
+                batch = unique_keys[start:start + _SQLITE_MAX_PARAMS]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, embedding FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+
+            hits = sum(1 for key in keys if key in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        """
+        Store embeddings and evict the least recently used entries if the cache is over its cap.
+
+        Args:
+            items: Dictionary mapping cache keys to embeddings
+        """
+        if not items:
+            return
+
+        now = time.time()
+        rows = [(key, array("f", embedding).tobytes(), now) for key, embedding in items.items()]
+
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, embedding, last_used) VALUES (?, ?, ?)", rows
+            )
+            self._conn.execute("COMMIT")
+            self._entries += self._conn.total_changes - before
+
+            if self._entries > self.max_entries:
+                # Evict down to 90% of the cap so eviction does not run on every insert
+                excess = self._entries - int(self.max_entries * 0.9)
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (excess,)
+                )
+                self._entries -= excess
+                self.evictions += excess
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and the current size of the cache."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": self._entries,
+            "evictions": self.evictions
+        }
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class QueryEmbeddingCache:
+    """
+    In-memory LRU cache of query embeddings with a time-to-live.
+
+    Concurrent requests for the same key are coalesced: the first caller creates the
+    embedding and the others wait for its result instead of calling the provider too.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600):
+        """
+        Create an empty cache.
+
+        Args:
+            max_entries: Maximum number of query embeddings kept
+            ttl_seconds: Number of seconds a query embedding stays valid
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, List[float]]]" = OrderedDict()
+        self._in_flight: Dict[str, concurrent.futures.Future] = {}
+
+    def _claim(self, key: str) -> Tuple[Optional[List[float]], Optional[concurrent.futures.Future], bool]:
+        # Returns (cached embedding, future to wait on or resolve, whether the caller must create it)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, embedding = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return embedding, None, False
+                del self._entries[key]
+
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return None, future, False
+
+            future = concurrent.futures.Future()
+            self._in_flight[key] = future
+            self.misses += 1
+            return None, future, True
+
+    def _resolve(self, key: str, future: concurrent.futures.Future, embedding: Optional[List[float]], error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self._in_flight.pop(key, None)
+            # Zero vectors signal a failed embedding request and are not cached
+            if embedding is not None and any(embedding):
+                self._entries[key] = (time.monotonic() + self.ttl_seconds, embedding)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(embedding)
+
+    def get_or_create(self, key: str, create: Callable[[], List[float]]) -> List[float]:
+        """
+        Get the embedding for a key, creating it with create() on a miss.
+
+        Args:
+            key: Cache key of the normalized query
+            create: Function creating the embedding
+
+        Returns:
+            The query embedding
+        """
+        embedding, future, owner = self._claim(key)
+        if embedding is not None:
+            return embedding
+        if not owner:
+            return future.result()
+
+        try:
+            embedding = create()
+        except BaseException as e:
+            self._resolve(key, future, None, e)
+            raise
+        self._resolve(key, future, embedding)
+        return embedding
+
+    async def get_or_create_async(self, key: str, create: Callable[[], Awaitable[List[float]]]) -> List[float]:
+        """
+        Get the embedding for a key without blocking the event loop, awaiting create() on a miss.
+
+        Args:
+            key: Cache key of the normalized query
+            create: Coroutine function creating the embedding
+
+        Returns:
+            The query embedding
+        """
+        embedding, future, owner = self._claim(key)
+        if embedding is not None:
+            return embedding
+        if not owner:
+            return await asyncio.wrap_future(future)
+
+        try:
+            embedding = await create()
+        except BaseException as e:
+            self._resolve(key, future, None, e)
+            raise
+        self._resolve(key, future, embedding)
+        return embedding
+
+    async def get_or_create_many_async(self, keys: List[str], create_many: Callable[[List[int]], Awaitable[List[List[float]]]]) -> List[List[float]]:
+        """
+        Get the embeddings for several keys, creating all missing ones with a single create_many() call.
+
+        Args:
+            keys: Cache keys of the normalized queries
+            create_many: Coroutine function creating the embeddings for the given key indices
+
+        Returns:
+            One embedding per key, in input order
+        """
+        embeddings: List[Optional[List[float]]] = [None] * len(keys)
+        owned: List[Tuple[int, concurrent.futures.Future]] = []
+        waiting: List[Tuple[int, concurrent.futures.Future]] = []
+        for i, key in enumerate(keys):
+            embedding, future, owner = self._claim(key)
+            if embedding is not None:
+                embeddings[i] = embedding
+            elif owner:
+                owned.append((i, future))
+            else:
+                waiting.append((i, future))
+
+        if owned:
+            error: BaseException = RuntimeError("Query embedding was not created")
+            try:
+                created = await create_many([i for i, _ in owned])
+                if len(created) != len(owned):
+                    raise ValueError(f"Expected {len(owned)} query embeddings, got {len(created)}")
+                for (i, future), embedding in zip(owned, created):
+                    embeddings[i] = embedding
+                    self._resolve(keys[i], future, embedding)
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                # Fail whatever is left unresolved, so coalesced waiters on these keys don't hang
+                for i, future in owned:
+                    if not future.done():
+                        self._resolve(keys[i], future, None, error)
+
+        # Duplicate keys within this call wait on futures resolved above
+        for i, future in waiting:
+            embeddings[i] = await asyncio.wrap_future(future)
+
+        return embeddings
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and the current size of the cache."""
+        with self._lock:
+            lookups = self.hits + self.coalesced + self.misses
+            return {
+                "hits": self.hits,
+                "coalesced": self.coalesced,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries)
+            }
@@ -0,0 +1,212 @@
+"""
+Frontier-based recursive crawler for the Crawl4AI MCP server.
+
+Instead of crawling one depth level at a time, pages are dispatched continuously
+from a priority frontier (shallowest first) as soon as a crawl slot frees up, so a
+slow page never holds back the rest of the crawl. Each host has its own concurrency
+limit and minimum delay between requests, URLs are canonicalized before they are
+queued, and visited URLs are remembered as 8-byte hashes.
+"""
+import asyncio
+import hashlib
+import heapq
+import itertools
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only track the visitor and never change the page content
+TRACKING_PARAMS = {"fbclid", "gclid", "msclkid", "mc_cid", "mc_eid", "ref", "ref_src", "_ga", "_gl"}
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonicalize_url(url: str, strip_query: bool = False) -> str:
+    """
+    Normalize a URL so that different spellings of the same page are crawled once.
+
+    Lowercases the scheme and host, drops default ports, fragments, credentials and
+    trailing slashes, and removes tracking parameters (or the whole query string if
+    strip_query is set) before sorting the remaining parameters.
+
+    Args:
+        url: The URL to normalize
+        strip_query: Remove the whole query string
+
+    Returns:
+        The canonical URL
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host if port is None or port == _DEFAULT_PORTS.get(scheme) else f"{host}:{port}"
+
+    path = parts.path or "/"
+    if len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/") or "/"
+
+    query = ""
+    if not strip_query and parts.query:
+        params = [
+            (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if key.lower() not in TRACKING_PARAMS and not key.lower().startswith("utm_")
+        ]
+        query = urlencode(sorted(params))
+
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+class VisitedSet:
+    """Set of URLs stored as 64-bit hashes instead of full strings."""
+
+    def __init__(self):
+        self._hashes: Set[int] = set()
+
+    @staticmethod
+    def _hash(url: str) -> int:
+        return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "little")
+
+    def add(self, url: str) -> bool:
+        """Add a URL, returning False if it was already present."""
+        key = self._hash(url)
+        if key in self._hashes:
+            return False
+        self._hashes.add(key)
+        return True
+
+    def __contains__(self, url: str) -> bool:
+        return self._hash(url) in self._hashes
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+
+class FrontierCrawler:
+    """Crawl internal links breadth-first with continuous dispatch and per-host politeness."""
+
+    def __init__(
+        self,
+        crawler: Any,
+        config: Any,
+        max_depth: int = 3,
+        max_concurrent: int = 10,
+        max_per_host: Optional[int] = None,
+        host_delay: float = 0.0,
+        max_pages: Optional[int] = None,
+        strip_query: bool = False
+    ):
+        """
+        Configure the crawl.
+
+        Args:
+            crawler: AsyncWebCrawler or PooledCrawler used to crawl each page
+            config: CrawlerRunConfig passed to every arun call
+            max_depth: Maximum link depth, where the start URLs are depth 0
+            max_concurrent: Maximum number of pages crawled at once
+            max_per_host: Maximum number of pages crawled at once per host (defaults to max_concurrent)
+            host_delay: Minimum seconds between the start of two requests to the same host
+            max_pages: Maximum number of pages to crawl (None for no limit)
+            strip_query: Treat URLs that only differ in their query string as the same page
+        """
+        self.crawler = crawler
+        self.config = config
+        self.max_depth = max_depth
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_per_host = max(1, max_per_host or max_concurrent)
+        self.host_delay = host_delay
+        self.max_pages = max_pages
+        self.strip_query = strip_query
+
+        self.visited = VisitedSet()
+        self.pages_dispatched = 0
+        self._sequence = itertools.count()
+        # Per-host frontiers of (depth, sequence, url)
+        self._frontier: Dict[str, List[Tuple[int, int, str]]] = {}
+        self._host_active: Dict[str, int] = {}
+        self._host_next_start: Dict[str, float] = {}
+
+    def _enqueue(self, url: str, depth: int) -> None:
+        url = canonicalize_url(url, self.strip_query)
+        if not url.startswith(("http://", "https://")) or not self.visited.add(url):
+            return
+        host = urlsplit(url).netloc
+        heapq.heappush(self._frontier.setdefault(host, []), (depth, next(self._sequence), url))
+
+    def _next_ready(self, now: float) -> Tuple[Optional[Tuple[str, int, str]], Optional[float]]:
+        """Pick the shallowest queued URL whose host allows a request now, or the time until one does."""
+        best = None
+        wait = None
+        for host, queue in self._frontier.items():
+            if not queue or self._host_active.get(host, 0) >= self.max_per_host:
+                continue
+            ready_at = self._host_next_start.get(host, 0.0)
+            if ready_at > now:
+                wait = ready_at - now if wait is None else min(wait, ready_at - now)
+                continue
+            if best is None or queue[0] < self._frontier[best][0]:
+                best = host
+        if best is None:
+            return None, wait
+        depth, _, url = heapq.heappop(self._frontier[best])
+        return (best, depth, url), None
+
+    async def _crawl_page(self, host: str, depth: int, url: str) -> Tuple[str, int, Any]:
+        try:
+            return host, depth, await self.crawler.arun(url=url, config=self.config)
+        except Exception as e:
+            print(f"Failed to crawl {url}: {e}")
+            return host, depth, None
+
+    async def crawl(self, start_urls: Iterable[str]) -> AsyncIterator[Any]:
+        """
+        Crawl from the start URLs, yielding each crawl result as soon as it is available.
+
+        Args:
+            start_urls: URLs to start from (depth 0)
+
+        Yields:
+            Crawl results, including unsuccessful ones
+        """
+        for url in start_urls:
+            self._enqueue(url, 0)
+
+        in_flight: Set[asyncio.Task] = set()
+        try:
+            while True:
+                # Start as many pages as the concurrency, politeness and page budget allow
+                wait = None
+                while len(in_flight) < self.max_concurrent and (self.max_pages is None or self.pages_dispatched < self.max_pages):
+                    now = time.monotonic()
+                    picked, wait = self._next_ready(now)
+                    if picked is None:
+                        break
+                    host, depth, url = picked
+                    self._host_active[host] = self._host_active.get(host, 0) + 1
+                    self._host_next_start[host] = now + self.host_delay
+                    self.pages_dispatched += 1
+                    in_flight.add(asyncio.ensure_future(self._crawl_page(host, depth, url)))
+
+                if not in_flight:
+                    if wait is None:
+                        break
+                    # Every queued host is waiting out its delay
+                    await asyncio.sleep(wait)
+                    continue
+
+                done, in_flight = await asyncio.wait(in_flight, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    host, depth, result = task.result()
+                    self._host_active[host] -= 1
+                    if result is None:
+                        continue
+                    if result.success and depth + 1 < self.max_depth:
+                        for link in result.links.get("internal", []):
+                            self._enqueue(link["href"], depth + 1)
+                    yield result
+        finally:
+            for task in in_flight:
+                task.cancel()
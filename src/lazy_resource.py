@@ -0,0 +1,101 @@
+"""
+Lazily initialized server components for the Crawl4AI MCP server.
+
+The reranking model and the Neo4j clients are slow to start. They are wrapped in
+LazyResource so the server can accept connections right away: each component is
+created on first use, or ahead of time by a background warmup task.
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Seconds before a component that could not be created is tried again
+RETRY_AFTER_SECONDS = 300.0
+
+
+class LazyResource(Generic[T]):
+    """An async component created once, on first use or by a background warmup."""
+
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], Awaitable[Optional[T]]],
+        close: Optional[Callable[[T], Awaitable[None]]] = None,
+        retry_after: float = RETRY_AFTER_SECONDS
+    ):
+        """
+        Wrap a component without creating it.
+
+        Args:
+            name: Component name used in log messages
+            factory: Coroutine function creating the component, or returning None if it is unavailable
+            close: Optional coroutine function releasing the component
+            retry_after: Seconds during which a failed or unavailable component is not tried again
+        """
+        self.name = name
+        self._factory = factory
+        self._close = close
+        self._value: Optional[T] = None
+        self._lock = asyncio.Lock()
+        self._warmup_task: Optional[asyncio.Task] = None
+        self._retry_after = retry_after
+        self._failed_at: Optional[float] = None
+        self.init_seconds: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        """Whether the component has been created."""
+        return self._value is not None
+
+    async def get(self) -> Optional[T]:
+        """
+        Get the component, creating it if needed.
+
+        Concurrent callers wait for a single initialization. A failed initialization,
+        or a factory returning None, is remembered for retry_after seconds, so calls in
+        the meantime return None right away instead of running the factory again.
+
+        Returns:
+            The component, or None if it could not be created
+        """
+        if self._value is not None or self._failed_recently():
+            return self._value
+        async with self._lock:
+            if self._value is None and not self._failed_recently():
+                start = time.perf_counter()
+                try:
+                    self._value = await self._factory()
+                except Exception as e:
+                    print(f"Failed to initialize {self.name}: {e}")
+                if self._value is None:
+                    self._failed_at = time.monotonic()
+                else:
+                    self._failed_at = None
+                    self.init_seconds = time.perf_counter() - start
+                    print(f"✓ {self.name} initialized in {self.init_seconds:.2f}s")
+        return self._value
+
+    def _failed_recently(self) -> bool:
+        return self._failed_at is not None and time.monotonic() - self._failed_at < self._retry_after
+
+    def warmup(self) -> asyncio.Task:
+        """Start creating the component in the background."""
+        if self._warmup_task is None:
+            self._warmup_task = asyncio.create_task(self.get())
+        return self._warmup_task
+
+    async def close(self) -> None:
+        """Wait for a pending warmup, then release the component if it was created."""
+        if self._warmup_task is not None:
+            await asyncio.gather(self._warmup_task, return_exceptions=True)
+        async with self._lock:
+            if self._value is not None and self._close is not None:
+                try:
+                    await self._close(self._value)
+                    print(f"✓ {self.name} closed")
+                except Exception as e:
+                    print(f"Error closing {self.name}: {e}")
+            self._value = None
+
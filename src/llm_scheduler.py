@@ -0,0 +1,276 @@
+"""
+Process-wide scheduler for the LLM calls made by the Crawl4AI MCP server.
+
+Contextual embeddings, code example summaries and source summaries all submit
+their chat completions to a single scheduler. Concurrent tool calls therefore
+share one concurrency limit and one requests/min and tokens/min budget, and
+interactive work is dispatched ahead of bulk crawls.
+"""
+import asyncio
+import concurrent.futures
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Lower values are dispatched first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 10
+
+_current_priority: contextvars.ContextVar[int] = contextvars.ContextVar("llm_priority", default=PRIORITY_BULK)
+
+# Maximum number of times a request is requeued after the provider answered 429
+MAX_RATE_LIMIT_RETRIES = 3
+
+
+def set_llm_priority(priority: int) -> None:
+    """
+    Set the priority of LLM requests submitted from the current context.
+
+    The priority is stored in a context variable, so it follows the current
+    MCP tool call into asyncio tasks and asyncio.to_thread workers.
+    """
+    _current_priority.set(priority)
+
+
+def get_llm_priority() -> int:
+    """Get the priority of LLM requests submitted from the current context."""
+    return _current_priority.get()
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at a per-minute rate."""
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = float(rate_per_minute)
+        self.tokens = float(rate_per_minute)
+        self.refill_per_second = rate_per_minute / 60.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.refill_per_second)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Get the number of seconds until the given amount can be consumed."""
+        with self._lock:
+            self._refill()
+            amount = min(amount, self.capacity)
+            if self.tokens >= amount:
+                return 0.0
+            return (amount - self.tokens) / self.refill_per_second
+
+    def consume(self, amount: float) -> None:
+        """Consume tokens, capped at the bucket capacity."""
+        with self._lock:
+            self._refill()
+            self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta: float) -> None:
+        """Correct a previous consumption by delta tokens once the actual usage is known."""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - delta)
+
+
+@dataclass
+class _Job:
+    fn: Callable[[], Any]
+    estimated_tokens: int
+    priority: int
+    future: concurrent.futures.Future
+    submitted_at: float
+    attempts: int = 0
+
+
+@dataclass
+class _Metrics:
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    rate_limited: int = 0
+    tokens_used: int = 0
+    total_latency: float = 0.0
+    total_queue_wait: float = 0.0
+    by_priority: Dict[int, int] = field(default_factory=dict)
+
+
+class LLMScheduler:
+    """
+    Priority scheduler with a bounded worker pool and token-bucket rate limits.
+
+    A single dispatcher thread hands the highest-priority queued request to a worker
+    once a worker is free and the requests/min and tokens/min budgets allow it.
+    Requests rejected by the provider with HTTP 429 pause dispatching and are requeued.
+    """
+
+    def __init__(self, max_concurrency: int = 10, requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        """
+        Start the scheduler.
+
+        Args:
+            max_concurrency: Maximum number of LLM requests in flight at once
+            requests_per_minute: Request budget per minute (0 for unlimited)
+            tokens_per_minute: Prompt plus completion token budget per minute (0 for unlimited)
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self._request_bucket = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self._token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+
+        self._queue: List[Tuple[int, int, _Job]] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._slots = threading.Semaphore(self.max_concurrency)
+        self._in_flight = 0
+        self._cooldown_until = 0.0
+        self._metrics = _Metrics()
+
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="llm-worker"
+        )
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="llm-dispatcher", daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, fn: Callable[[], Any], estimated_tokens: int = 0, priority: Optional[int] = None) -> concurrent.futures.Future:
+        """
+        Queue an LLM request.
+
+        Args:
+            fn: Callable performing exactly one LLM request
+            estimated_tokens: Estimated prompt plus completion tokens of the request
+            priority: Dispatch priority, defaults to the priority of the current context
+
+        Returns:
+            Future resolved with the return value of fn
+        """
+        if priority is None:
+            priority = get_llm_priority()
+        job = _Job(fn, estimated_tokens, priority, concurrent.futures.Future(), time.monotonic())
+        with self._condition:
+            self._metrics.submitted += 1
+            self._metrics.by_priority[priority] = self._metrics.by_priority.get(priority, 0) + 1
+            self._push(job)
+        return job.future
+
+    async def run(self, fn: Callable[[], Any], estimated_tokens: int = 0, priority: Optional[int] = None) -> Any:
+        """Queue an LLM request and await its result without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(fn, estimated_tokens, priority))
+
+    def _push(self, job: _Job) -> None:
+        heapq.heappush(self._queue, (job.priority, next(self._sequence), job))
+        self._condition.notify_all()
+
+    def _wait_time(self, job: _Job) -> float:
+        wait = max(0.0, self._cooldown_until - time.monotonic())
+        if self._request_bucket:
+            wait = max(wait, self._request_bucket.wait_time(1))
+        if self._token_bucket:
+            wait = max(wait, self._token_bucket.wait_time(job.estimated_tokens))
+        return wait
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            self._slots.acquire()
+            with self._condition:
+                while True:
+                    if not self._queue:
+                        self._condition.wait()
+                        continue
+                    # Re-check the head after every wait so newly queued higher-priority work goes first
+                    job = self._queue[0][2]
+                    wait = self._wait_time(job)
+                    if wait <= 0:
+                        break
+                    self._condition.wait(timeout=wait)
+                heapq.heappop(self._queue)
+                if self._request_bucket:
+                    self._request_bucket.consume(1)
+                if self._token_bucket:
+                    self._token_bucket.consume(job.estimated_tokens)
+                self._in_flight += 1
+            self._executor.submit(self._run_job, job)
+
+    def _run_job(self, job: _Job) -> None:
+        started = time.monotonic()
+        try:
+            result = job.fn()
+        except Exception as e:
+            if _is_rate_limit_error(e) and job.attempts < MAX_RATE_LIMIT_RETRIES:
+                job.attempts += 1
+                with self._condition:
+                    self._metrics.rate_limited += 1
+                    self._cooldown_until = max(self._cooldown_until, time.monotonic() + 2 ** job.attempts)
+                    self._in_flight -= 1
+                    self._push(job)
+                self._slots.release()
+                return
+            with self._condition:
+                self._metrics.failed += 1
+                self._in_flight -= 1
+            self._slots.release()
+            job.future.set_exception(e)
+            return
+
+        tokens_used = _usage_total_tokens(result)
+        if self._token_bucket and tokens_used is not None:
+            self._token_bucket.adjust(tokens_used - job.estimated_tokens)
+        with self._condition:
+            self._metrics.completed += 1
+            self._metrics.tokens_used += tokens_used if tokens_used is not None else job.estimated_tokens
+            self._metrics.total_latency += time.monotonic() - started
+            self._metrics.total_queue_wait += started - job.submitted_at
+            self._in_flight -= 1
+        self._slots.release()
+        job.future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get request counters, queue depth, token usage and average latencies."""
+        with self._condition:
+            metrics = self._metrics
+            return {
+                "submitted": metrics.submitted,
+                "completed": metrics.completed,
+                "failed": metrics.failed,
+                "rate_limited_retries": metrics.rate_limited,
+                "queued": len(self._queue),
+                "in_flight": self._in_flight,
+                "tokens_used": metrics.tokens_used,
+                "avg_latency_seconds": round(metrics.total_latency / metrics.completed, 3) if metrics.completed else 0.0,
+                "avg_queue_wait_seconds": round(metrics.total_queue_wait / metrics.completed, 3) if metrics.completed else 0.0,
+                "submitted_by_priority": dict(metrics.by_priority)
+            }
+
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    """Check whether an exception raised by an LLM client is an HTTP 429 response."""
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def _usage_total_tokens(response: Any) -> Optional[int]:
+    """Get the total token usage reported in a chat completion response, if any."""
+    usage = getattr(response, "usage", None)
+    total_tokens = getattr(usage, "total_tokens", None)
+    return total_tokens if isinstance(total_tokens, int) else None
+
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """Get the process-wide LLM scheduler, creating it from environment variables on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler(
+                max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "10")),
+                requests_per_minute=float(os.getenv("LLM_REQUESTS_PER_MINUTE", "0")),
+                tokens_per_minute=float(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+            )
+        return _scheduler
@@ -0,0 +1,17 @@
+"""
+Entry point of the Crawl4AI MCP server.
+
+Page processing workers are spawned processes, which re-run the parent's __main__
+module before they import page_processing. Starting the server from this module,
+whose top level imports nothing, keeps each worker down to the chunking and code
+block modules instead of the whole server (mcp, supabase, openai, the .env file and
+the FastMCP tools). Running src/crawl4ai_mcp.py directly still works, but every
+worker then imports the server too.
+"""
+
+if __name__ == "__main__":
+    import asyncio
+
+    from crawl4ai_mcp import main
+
+    asyncio.run(main())
@@ -0,0 +1,115 @@
+"""
+Process pool for the CPU-bound page processing of the Crawl4AI MCP server.
+
+Chunking a crawled page and extracting its code blocks are pure Python and can take
+seconds on multi-MB pages. Running them on the event loop (or in a thread, which
+still holds the GIL) stalls every other MCP request, so each page is sent to a pool
+of worker processes as one task and its chunks and code blocks come back together.
+"""
+import asyncio
+import concurrent.futures
+import multiprocessing
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from chunking import Chunk, chunk_markdown_sections, get_token_counter
+from code_blocks import CodeBlock, extract_code_blocks
+
+
+@dataclass
+class ProcessedPage:
+    """The chunks and code blocks of a page."""
+    chunks: List[Chunk]
+    code_blocks: List[CodeBlock] = field(default_factory=list)
+
+
+def process_page(
+    markdown: str,
+    max_tokens: int,
+    overlap_tokens: int,
+    model: Optional[str],
+    extract_code: bool
+) -> ProcessedPage:
+    """
+    Chunk a page and extract its code blocks. Runs in a worker process.
+
+    Args:
+        markdown: Markdown content of the page
+        max_tokens: Maximum number of tokens per chunk
+        overlap_tokens: Maximum number of tokens repeated at the start of the next chunk
+        model: Embedding model whose tokenizer counts the tokens
+        extract_code: Whether to extract the code blocks of the page
+
+    Returns:
+        ProcessedPage with the chunks and, if requested, the code blocks
+    """
+    chunks = chunk_markdown_sections(markdown, max_tokens, overlap_tokens, get_token_counter(model))
+    code_blocks = extract_code_blocks(markdown) if extract_code else []
+    return ProcessedPage(chunks, code_blocks)
+
+
+class PageProcessor:
+    """Run process_page in a pool of worker processes, or in a thread if the pool is disabled."""
+
+    def __init__(self, max_workers: int = 2, model: Optional[str] = None):
+        """
+        Create the processor. Worker processes are started on first use.
+
+        Args:
+            max_workers: Number of worker processes (0 processes pages in a thread instead)
+            model: Embedding model whose tokenizer counts the tokens
+        """
+        self.max_workers = max_workers
+        self.model = model
+        self._executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self.pages_processed = 0
+
+    def _get_executor(self) -> concurrent.futures.ProcessPoolExecutor:
+        if self._executor is None:
+            # Forking a process that runs the event loop and helper threads is unsafe, so workers are spawned.
+            # A spawned worker re-runs the parent's __main__ module first, see src/main.py
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def process(self, markdown: str, max_tokens: int, overlap_tokens: int = 0, extract_code: bool = False) -> ProcessedPage:
+        """
+        Chunk a page and extract its code blocks off the event loop.
+
+        Args:
+            markdown: Markdown content of the page
+            max_tokens: Maximum number of tokens per chunk
+            overlap_tokens: Maximum number of tokens repeated at the start of the next chunk
+            extract_code: Whether to extract the code blocks of the page
+
+        Returns:
+            ProcessedPage with the chunks and, if requested, the code blocks
+        """
+        args = (markdown, max_tokens, overlap_tokens, self.model, extract_code)
+        if self.max_workers <= 0:
+            result = await asyncio.to_thread(process_page, *args)
+        else:
+            loop = asyncio.get_running_loop()
+            executor = self._get_executor()
+            try:
+                result = await loop.run_in_executor(executor, process_page, *args)
+            except concurrent.futures.process.BrokenProcessPool:
+                # A worker died (e.g. killed for memory), retry once on a fresh pool
+                if self._executor is executor:
+                    print("Page processing pool broken, restarting it")
+                    self._executor = None
+                    executor.shutdown(wait=False)
+                result = await loop.run_in_executor(self._get_executor(), process_page, *args)
+            # Code blocks come back as offsets, point them at the page again
+            for block in result.code_blocks:
+                block.document = markdown
+        self.pages_processed += 1
+        return result
+
+    def close(self) -> None:
+        """Stop the worker processes, cancelling pages not started yet."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
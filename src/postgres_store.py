@@ -0,0 +1,189 @@
+"""
+Direct Postgres bulk-load backend for the Crawl4AI MCP server.
+
+Supabase REST inserts send every embedding as a JSON array through PostgREST.
+When USE_POSTGRES_BULK_LOAD is enabled, chunks and code examples are instead
+loaded over a pooled Postgres connection with binary COPY into a temporary
+staging table and merged into the target table in the same transaction.
+"""
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+try:
+    from psycopg import OperationalError
+    from psycopg.types.json import Jsonb
+    from psycopg_pool import ConnectionPool
+except ImportError:
+    ConnectionPool = None
+    OperationalError = None
+
+# Seconds to wait for the first pooled connection before falling back to REST inserts
+CONNECT_TIMEOUT_SECONDS = 10.0
+
+# Columns loaded into each table, with the Postgres type used in the staging table.
+# Embeddings are staged as real[] because binary COPY has a built-in encoding for it,
+# and are cast to vector during the merge.
+_TABLE_COLUMNS = {
+    "crawled_pages": [
+        ("url", "text"),
+        ("chunk_number", "int4"),
+        ("content", "text"),
+        ("metadata", "jsonb"),
+        ("source_id", "text"),
+        ("embedding", "float4[]")
+    ],
+    "code_examples": [
+        ("url", "text"),
+        ("chunk_number", "int4"),
+        ("content", "text"),
+        ("summary", "text"),
+        ("metadata", "jsonb"),
+        ("source_id", "text"),
+        ("embedding", "float4[]")
+    ]
+}
+
+
+class BulkLoaderUnavailable(Exception):
+    """Raised when Postgres can no longer be reached; the bulk loader is disabled for the process."""
+
+
+class PostgresBulkLoader:
+    """Load rows into crawled_pages and code_examples with binary COPY over a connection pool."""
+
+    def __init__(self, dsn: str, min_size: int = 1, max_size: int = 4, timeout: float = CONNECT_TIMEOUT_SECONDS):
+        """
+        Open the connection pool and wait for its first connections.
+
+        Args:
+            dsn: Postgres connection string
+            min_size: Minimum number of pooled connections
+            max_size: Maximum number of pooled connections
+            timeout: Seconds to wait for the connections before giving up
+
+        Raises:
+            psycopg_pool.PoolTimeout: If the database cannot be reached within the timeout
+        """
+        self._pool = ConnectionPool(dsn, min_size=min_size, max_size=max_size, open=False)
+        try:
+            # The pool connects in the background by default, so a bad DSN would only
+            # surface as a timeout on every COPY
+            self._pool.open(wait=True, timeout=timeout)
+        except Exception:
+            self._pool.close()
+            raise
+
+    def copy_rows(self, table: str, rows: List[Dict[str, Any]]) -> int:
+        """
+        Load rows into a table, replacing existing rows with the same (url, chunk_number).
+
+        Args:
+            table: Either "crawled_pages" or "code_examples"
+            rows: Rows in the same format as the Supabase REST inserts
+
+        Returns:
+            Number of rows loaded
+
+        Raises:
+            BulkLoaderUnavailable: If no connection could be obtained, after disabling the loader
+        """
+        if not rows:
+            return 0
+
+        columns = _TABLE_COLUMNS[table]
+        names = [name for name, _ in columns]
+        column_list = ", ".join(names)
+        staging = f"{table}_staging"
+        select_list = ", ".join("embedding::vector" if name == "embedding" else name for name in names)
+        update_list = ", ".join(f"{name} = excluded.{name}" for name in names if name not in ("url", "chunk_number"))
+
+        try:
+            with self._pool.connection() as conn:
+                with conn.transaction():
+                    with conn.cursor() as cursor:
+                        cursor.execute(
+                            f"create temp table {staging} ("
+                            + ", ".join(f"{name} {pg_type}" for name, pg_type in columns)
+                            + ") on commit drop"
+                        )
+                        with cursor.copy(f"copy {staging} ({column_list}) from stdin (format binary)") as copy:
+                            copy.set_types([pg_type for _, pg_type in columns])
+                            for row in rows:
+                                copy.write_row([
+                                    Jsonb(row[name]) if name == "metadata" else row[name]
+                                    for name in names
+                                ])
+                        # ON CONFLICT cannot update the same row twice in one statement, so collapse duplicates
+                        cursor.execute(
+                            f"insert into {table} ({column_list}) "
+                            f"select distinct on (url, chunk_number) {select_list} from {staging} "
+                            f"order by url, chunk_number "
+                            f"on conflict (url, chunk_number) do update set {update_list}"
+                        )
+        except OperationalError as e:
+            # Connection failures (including pool timeouts) won't clear up by retrying the batch
+            disable_bulk_loader(self, e)
+            raise BulkLoaderUnavailable(str(e)) from e
+        return len(rows)
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        self._pool.close()
+
+
+_bulk_loader: Optional[PostgresBulkLoader] = None
+_bulk_loader_unavailable = False
+_bulk_loader_lock = threading.Lock()
+
+
+def get_bulk_loader() -> Optional[PostgresBulkLoader]:
+    """
+    Get the process-wide bulk loader if USE_POSTGRES_BULK_LOAD is enabled.
+
+    Returns:
+        PostgresBulkLoader instance, or None if bulk loading is disabled or unavailable
+    """
+    global _bulk_loader, _bulk_loader_unavailable
+    if os.getenv("USE_POSTGRES_BULK_LOAD", "false") != "true":
+        return None
+
+    with _bulk_loader_lock:
+        if _bulk_loader is None and not _bulk_loader_unavailable:
+            # Only report a missing configuration once, then stay on Supabase REST inserts
+            _bulk_loader_unavailable = True
+            dsn = os.getenv("DATABASE_URL")
+            if not dsn:
+                print("USE_POSTGRES_BULK_LOAD is enabled but DATABASE_URL is not set. Using Supabase REST inserts.")
+                return None
+            if ConnectionPool is None:
+                print("Warning: psycopg is not installed. Install with `pip install \"psycopg[binary,pool]\"`. Using Supabase REST inserts.")
+                return None
+            try:
+                _bulk_loader = PostgresBulkLoader(dsn, max_size=int(os.getenv("POSTGRES_POOL_MAX_SIZE", "4")))
+            except Exception as e:
+                print(f"Error connecting to Postgres for bulk loading: {e}. Using Supabase REST inserts.")
+                return None
+            _bulk_loader_unavailable = False
+        return _bulk_loader
+
+
+def disable_bulk_loader(loader: PostgresBulkLoader, error: Exception) -> None:
+    """
+    Stop using a bulk loader whose database can no longer be reached.
+
+    Args:
+        loader: The bulk loader that failed
+        error: The connection error
+    """
+    global _bulk_loader, _bulk_loader_unavailable
+    with _bulk_loader_lock:
+        if _bulk_loader is not loader:
+            return
+        _bulk_loader = None
+        _bulk_loader_unavailable = True
+    print(f"Error connecting to Postgres for bulk loading: {error}. Using Supabase REST inserts.")
+    try:
+        loader.close()
+    except Exception as e:
+        print(f"Error closing Postgres connection pool: {e}")
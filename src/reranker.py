@@ -0,0 +1,203 @@
+"""
+Asynchronous cross-encoder reranking for the Crawl4AI MCP server.
+
+Scoring runs on a dedicated worker thread so the event loop keeps serving
+other requests. Pairs from requests that arrive within a short window are
+scored together in one predict() call, and scores are cached per
+(query, chunk) so repeated searches skip the model.
+"""
+import asyncio
+import concurrent.futures
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+# Rough number of characters per token, used to cut documents before tokenization
+_CHARS_PER_TOKEN = 4
+
+RERANKING_MODEL_NAME = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+# int8-quantized ONNX export published in the model repository, portable across x86 CPUs
+DEFAULT_ONNX_FILE = "onnx/model_quint8_avx2.onnx"
+
+
+def load_reranking_model(backend: Optional[str] = None) -> Any:
+    """
+    Load the cross-encoder used for reranking.
+
+    Args:
+        backend: "torch" for the PyTorch model or "onnx" for the int8-quantized ONNX Runtime
+            export of the same model (defaults to the RERANKING_BACKEND environment variable)
+
+    Returns:
+        CrossEncoder instance
+    """
+    from sentence_transformers import CrossEncoder
+
+    backend = backend or os.getenv("RERANKING_BACKEND", "torch")
+    if backend == "onnx":
+        return CrossEncoder(
+            RERANKING_MODEL_NAME,
+            backend="onnx",
+            model_kwargs={"file_name": os.getenv("RERANKING_ONNX_FILE") or DEFAULT_ONNX_FILE}
+        )
+    if backend != "torch":
+        raise ValueError(f"Unknown reranking backend: {backend} (expected 'torch' or 'onnx')")
+    return CrossEncoder(RERANKING_MODEL_NAME)
+
+
+class RerankExecutor:
+    """
+    Micro-batching wrapper around a cross-encoder model.
+
+    The model only needs a predict(pairs) method returning one score per [query, text] pair.
+    """
+
+    def __init__(self, model: Any, batch_window_ms: float = 5, max_batch_size: int = 256, cache_size: int = 10000):
+        """
+        Create the executor.
+
+        Args:
+            model: Cross-encoder model with a predict(pairs) method
+            batch_window_ms: How long to wait for more requests before scoring a batch
+            max_batch_size: Number of pending pairs that triggers scoring immediately
+            cache_size: Maximum number of cached (query, chunk) scores
+        """
+        self.model = model
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.cache_size = cache_size
+        # Documents are cut to the model's input length before tokenization, which
+        # otherwise tokenizes the whole text only to truncate it afterwards
+        self.max_chars = (getattr(model, "max_length", None) or 512) * _CHARS_PER_TOKEN
+
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="reranker")
+        self._cache: "OrderedDict[Hashable, float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._pending: List[Tuple[List[List[str]], asyncio.Future]] = []
+        self._pending_pairs = 0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    async def score(self, pairs: List[List[str]]) -> List[float]:
+        """
+        Score [query, text] pairs, batched with the pairs of concurrent callers.
+
+        Args:
+            pairs: List of [query, text] pairs
+
+        Returns:
+            One score per pair
+        """
+        if not pairs:
+            return []
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((pairs, future))
+        self._pending_pairs += len(pairs)
+
+        if self._pending_pairs >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_window, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._pending, self._pending_pairs = self._pending, [], 0
+        if not batch:
+            return
+
+        self.batches += 1
+        all_pairs = [pair for pairs, _ in batch for pair in pairs]
+        scoring = asyncio.get_running_loop().run_in_executor(self._executor, self.model.predict, all_pairs)
+
+        def distribute(done: asyncio.Future) -> None:
+            error = done.exception() if not done.cancelled() else asyncio.CancelledError()
+            offset = 0
+            for pairs, future in batch:
+                if future.done():
+                    offset += len(pairs)
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    scores = done.result()
+                    future.set_result([float(score) for score in scores[offset:offset + len(pairs)]])
+                offset += len(pairs)
+
+        scoring.add_done_callback(distribute)
+
+    def _cache_key(self, namespace: str, query: str, result: Dict[str, Any], text: str) -> Hashable:
+        # The text hash keeps scores of re-crawled chunks that kept their id from being reused
+        return (namespace, query, result.get("id"), hash(text))
+
+    async def rerank(self, query: str, results: List[Dict[str, Any]], content_key: str = "content", namespace: str = "crawled_pages") -> List[Dict[str, Any]]:
+        """
+        Rerank search results by cross-encoder score.
+
+        Args:
+            query: The search query
+            results: List of search results
+            content_key: The key in each result dict that contains the text content
+            namespace: Table the results come from, so ids of different tables do not collide
+
+        Returns:
+            Results sorted by rerank score, each with a rerank_score field
+        """
+        if not results:
+            return results
+
+        texts = [(result.get(content_key) or "")[:self.max_chars] for result in results]
+        keys = [self._cache_key(namespace, query, result, text) for result, text in zip(results, texts)]
+
+        scores: List[Optional[float]] = [None] * len(results)
+        with self._cache_lock:
+            for i, key in enumerate(keys):
+                score = self._cache.get(key)
+                if score is not None:
+                    self._cache.move_to_end(key)
+                    scores[i] = score
+            missing = [i for i, score in enumerate(scores) if score is None]
+            self.hits += len(results) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            new_scores = await self.score([[query, texts[i]] for i in missing])
+            with self._cache_lock:
+                for i, score in zip(missing, new_scores):
+                    scores[i] = score
+                    self._cache[keys[i]] = score
+                    self._cache.move_to_end(keys[i])
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        for result, score in zip(results, scores):
+            result["rerank_score"] = score
+
+        return sorted(results, key=lambda x: x.get("rerank_score", 0), reverse=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get score cache counters and the number of model calls."""
+        with self._cache_lock:
+            lookups = self.hits + self.misses
+            return {
+                "cache_hits": self.hits,
+                "cache_misses": self.misses,
+                "cache_hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "cached_scores": len(self._cache),
+                "model_batches": self.batches
+            }
+
+    def close(self) -> None:
+        """Stop the scoring thread."""
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,180 @@
+"""
+Asynchronous, incremental sitemap reader for the Crawl4AI MCP server.
+
+Sitemaps are downloaded in chunks and parsed with a pull parser as the bytes arrive,
+so URLs are yielded long before a large sitemap has finished downloading and the
+whole document is never held in memory. Gzipped sitemaps are decompressed on the
+fly, and the child sitemaps of a <sitemapindex> are read concurrently.
+"""
+import asyncio
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional, Set, Union
+from xml.etree.ElementTree import XMLPullParser
+
+import httpx
+
+# Maximum number of nested <sitemapindex> levels followed
+MAX_SITEMAP_DEPTH = 3
+
+# Entries buffered between the sitemap readers and the consumer
+_QUEUE_SIZE = 1000
+
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+@dataclass
+class SitemapEntry:
+    """A page listed in a sitemap."""
+    url: str
+    lastmod: Optional[str] = None
+
+
+def parse_lastmod(value: Optional[str]) -> Optional[datetime]:
+    """
+    Parse a W3C datetime <lastmod> value (e.g. "2024-05-01" or "2024-05-01T10:00:00Z").
+
+    Returns:
+        Timezone-aware datetime (UTC if no offset is given), or None if the value is missing or invalid
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip())
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _child_text(element, name: str) -> Optional[str]:
+    for child in element:
+        if _local_name(child.tag) == name:
+            return child.text.strip() if child.text else None
+    return None
+
+
+class _SitemapReader:
+    """Reads one sitemap tree, expanding nested sitemap indexes concurrently."""
+
+    def __init__(self, client: httpx.AsyncClient, since: Optional[datetime], max_concurrent: int):
+        self.client = client
+        self.since = since
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=_QUEUE_SIZE)
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.seen: Set[str] = set()
+        self.pending = 0
+        self.tasks: Set[asyncio.Task] = set()
+
+    def _is_stale(self, lastmod: Optional[str]) -> bool:
+        if self.since is None:
+            return False
+        parsed = parse_lastmod(lastmod)
+        return parsed is not None and parsed < self.since
+
+    def start(self, url: str, depth: int) -> None:
+        if url in self.seen or depth > MAX_SITEMAP_DEPTH:
+            return
+        self.seen.add(url)
+        self.pending += 1
+        task = asyncio.ensure_future(self._read(url, depth))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _read(self, url: str, depth: int) -> None:
+        try:
+            async with self.semaphore:
+                await self._parse(url, depth)
+        except Exception as e:
+            print(f"Error reading sitemap {url}: {e}")
+        finally:
+            self.pending -= 1
+            if self.pending == 0:
+                # Tell the consumer that every sitemap has been read
+                await self.queue.put(None)
+
+    async def _parse(self, url: str, depth: int) -> None:
+        parser = XMLPullParser(events=("start", "end"))
+        decompressor = None
+        first_chunk = True
+        root = None
+
+        async with self.client.stream("GET", url) as response:
+            if response.status_code != 200:
+                print(f"Sitemap {url} returned HTTP {response.status_code}")
+                return
+            # httpx already undoes Content-Encoding: gzip, this handles .xml.gz files
+            async for chunk in response.aiter_bytes():
+                if first_chunk:
+                    first_chunk = False
+                    if chunk.startswith(_GZIP_MAGIC):
+                        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                if decompressor is not None:
+                    chunk = decompressor.decompress(chunk)
+                parser.feed(chunk)
+
+                for event, element in parser.read_events():
+                    if event == "start":
+                        if root is None:
+                            root = element
+                        continue
+                    name = _local_name(element.tag)
+                    if name == "url":
+                        loc = _child_text(element, "loc")
+                        lastmod = _child_text(element, "lastmod")
+                        if loc and not self._is_stale(lastmod):
+                            await self.queue.put(SitemapEntry(loc, lastmod))
+                    elif name == "sitemap":
+                        loc = _child_text(element, "loc")
+                        # A child sitemap last modified before the cutoff only lists older pages
+                        if loc and not self._is_stale(_child_text(element, "lastmod")):
+                            self.start(loc, depth + 1)
+                    else:
+                        continue
+                    # Drop parsed entries so memory stays flat on large sitemaps
+                    root.clear()
+        parser.close()
+
+
+async def iter_sitemap_entries(
+    sitemap_url: str,
+    lastmod_since: Optional[Union[str, datetime]] = None,
+    max_concurrent: int = 4,
+    client: Optional[httpx.AsyncClient] = None
+) -> AsyncIterator[SitemapEntry]:
+    """
+    Read a sitemap or sitemap index, yielding page entries as they are parsed.
+
+    Args:
+        sitemap_url: URL of the sitemap (plain or gzipped XML, urlset or sitemapindex)
+        lastmod_since: Skip pages (and child sitemaps) whose <lastmod> is older than this date
+        max_concurrent: Maximum number of sitemaps downloaded at once
+        client: Optional HTTP client to reuse
+
+    Yields:
+        SitemapEntry for each page, in no particular order across child sitemaps
+    """
+    since = parse_lastmod(lastmod_since) if isinstance(lastmod_since, str) else lastmod_since
+    if since is not None and since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+
+    own_client = client is None
+    if own_client:
+        client = httpx.AsyncClient(follow_redirects=True, timeout=30.0)
+    reader = _SitemapReader(client, since, max_concurrent)
+    try:
+        reader.start(sitemap_url, 0)
+        while True:
+            entry = await reader.queue.get()
+            if entry is None:
+                break
+            yield entry
+    finally:
+        for task in list(reader.tasks):
+            task.cancel()
+        if own_client:
+            await client.aclose()
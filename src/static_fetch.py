@@ -0,0 +1,204 @@
+"""
+Browserless fetch path for static pages, .txt and .md files.
+
+Pages are downloaded over a pooled HTTP client and converted to markdown with the
+same html2text-based generator crawl4ai uses. A page is only handed to the headless
+browser when it looks rendered by JavaScript: a non-2xx response, an unsupported
+content type, hardly any text, a noscript warning or an empty SPA mount point.
+"""
+import asyncio
+import re
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse, urldefrag
+
+import httpx
+
+# Pages with less visible text than this are assumed to be rendered client-side
+MIN_STATIC_TEXT_LENGTH = 200
+
+# Larger responses are left to the browser rather than buffered in memory
+MAX_RESPONSE_BYTES = 10 * 1024 * 1024
+
+_TEXT_EXTENSIONS = (".txt", ".md", ".markdown")
+_NOSCRIPT_HINT = re.compile(r"<noscript[^>]*>[^<]*?(enable|requires?|turn on|need)\b[^<]{0,40}javascript", re.IGNORECASE)
+_EMPTY_APP_ROOT = re.compile(r"<div\s+id=[\"'](root|app|__next|__nuxt|svelte)[\"'][^>]*>\s*</div>", re.IGNORECASE)
+
+
+@dataclass
+class StaticCrawlResult:
+    """The subset of crawl4ai's CrawlResult used by the crawl tools."""
+    url: str
+    markdown: str
+    response_headers: Dict[str, str]
+    links: Dict[str, List[Dict[str, str]]] = field(default_factory=lambda: {"internal": [], "external": []})
+    status_code: int = 200
+    success: bool = True
+    error_message: str = ""
+
+
+class _LinkExtractor(HTMLParser):
+    """Collect <a href> targets and the <base href> of an HTML document."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.base: Optional[str] = None
+        self.hrefs: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            href = dict(attrs).get("href")
+            if href:
+                self.hrefs.append(href)
+        elif tag == "base" and self.base is None:
+            self.base = dict(attrs).get("href")
+
+
+def extract_links(html: str, url: str) -> Dict[str, List[Dict[str, str]]]:
+    """
+    Extract the links of an HTML page, split into internal and external links.
+
+    Args:
+        html: The page HTML
+        url: The page URL, used to resolve relative links
+
+    Returns:
+        Dictionary with "internal" and "external" lists of {"href": absolute URL}
+    """
+    parser = _LinkExtractor()
+    try:
+        parser.feed(html)
+    except Exception:
+        pass
+    base = urljoin(url, parser.base) if parser.base else url
+    host = urlparse(url).netloc.lower()
+
+    links = {"internal": [], "external": []}
+    seen = set()
+    for href in parser.hrefs:
+        absolute = urldefrag(urljoin(base, href.strip()))[0]
+        parsed = urlparse(absolute)
+        if parsed.scheme not in ("http", "https") or absolute in seen:
+            continue
+        seen.add(absolute)
+        kind = "internal" if parsed.netloc.lower() == host else "external"
+        links[kind].append({"href": absolute})
+    return links
+
+
+def html_to_markdown(html: str, url: str) -> str:
+    """Convert HTML to markdown with crawl4ai's default markdown generator."""
+    from crawl4ai.markdown_generation_strategy import DefaultMarkdownGenerator
+
+    return DefaultMarkdownGenerator().generate_markdown(html, base_url=url, citations=False).raw_markdown
+
+
+def _convert_html(html: str, url: str) -> Tuple[str, Dict[str, List[Dict[str, str]]]]:
+    return html_to_markdown(html, url), extract_links(html, url)
+
+
+def looks_client_rendered(html: str, markdown: str) -> bool:
+    """Check whether a page probably needs JavaScript to show its content."""
+    text_length = len(re.sub(r"\s+", " ", markdown).strip())
+    if text_length < MIN_STATIC_TEXT_LENGTH:
+        return True
+    return bool(_NOSCRIPT_HINT.search(html) or _EMPTY_APP_ROOT.search(html))
+
+
+class StaticFetcher:
+    """Fetch pages over pooled HTTP connections, declining the ones that need a browser."""
+
+    def __init__(self, max_connections: int = 32, timeout: float = 15.0):
+        """
+        Create the HTTP client.
+
+        Args:
+            max_connections: Maximum number of open connections across all hosts
+            timeout: Request timeout in seconds
+        """
+        self._client = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            headers={"User-Agent": "Mozilla/5.0 (compatible; crawl4ai-mcp)"}
+        )
+        # Queue fetches here rather than in the client, whose pool timeout would fail them
+        self._semaphore = asyncio.Semaphore(max_connections)
+        self.fetched = 0
+        self.fallbacks = 0
+
+    async def fetch(self, url: str) -> Optional[StaticCrawlResult]:
+        """
+        Fetch a page without a browser.
+
+        Args:
+            url: URL of the page
+
+        Returns:
+            StaticCrawlResult, or None if the page should be crawled with the browser
+        """
+        async with self._semaphore:
+            result = await self._fetch(url)
+        if result is None:
+            self.fallbacks += 1
+        else:
+            self.fetched += 1
+        return result
+
+    async def _fetch(self, url: str) -> Optional[StaticCrawlResult]:
+        try:
+            async with self._client.stream("GET", url) as response:
+                if response.status_code != 200:
+                    return None
+                content_length = response.headers.get("content-length", "")
+                if content_length.isdigit() and int(content_length) > MAX_RESPONSE_BYTES:
+                    return None
+
+                # Links are resolved against the final URL, results keep the requested URL like the browser path
+                final_url = str(response.url)
+                content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+                headers = dict(response.headers)
+
+                # Plain text and markdown files are already in the format we store
+                is_html = content_type in ("text/html", "application/xhtml+xml")
+                is_text = content_type in ("text/plain", "text/markdown", "text/x-markdown") or (
+                    not is_html and urlparse(final_url).path.lower().endswith(_TEXT_EXTENSIONS)
+                )
+                if not (is_html or is_text):
+                    return None
+
+                # Stop reading as soon as the body passes the limit, the length header may be missing or wrong
+                body = bytearray()
+                async for data in response.aiter_bytes():
+                    body.extend(data)
+                    if len(body) > MAX_RESPONSE_BYTES:
+                        return None
+                text = body.decode(response.encoding or "utf-8", errors="replace")
+        except httpx.HTTPError as e:
+            print(f"HTTP fetch failed for {url}, using the browser: {e}")
+            return None
+
+        if is_text:
+            if not text.strip():
+                return None
+            return StaticCrawlResult(url=url, markdown=text, response_headers=headers)
+
+        # html2text and link parsing are CPU-bound, so keep them off the event loop
+        markdown, links = await asyncio.to_thread(_convert_html, text, final_url)
+        if looks_client_rendered(text, markdown):
+            return None
+        return StaticCrawlResult(url=url, markdown=markdown, response_headers=headers, links=links)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the number of pages fetched over HTTP and handed to the browser."""
+        total = self.fetched + self.fallbacks
+        return {
+            "fetched_without_browser": self.fetched,
+            "browser_fallbacks": self.fallbacks,
+            "static_rate": round(self.fetched / total, 4) if total else 0.0
+        }
+
+    async def close(self) -> None:
+        """Close the pooled connections."""
+        await self._client.aclose()
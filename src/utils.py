@@ -3,19 +3,42 @@ Utility functions for the Crawl4AI MCP server.
 """
 import os
 import concurrent.futures
+from datetime import datetime, timezone
 from typing import List, Dict, Any, Optional, Tuple
+import hashlib
 import json
 from supabase import create_client, Client
 from urllib.parse import urlparse
 import openai
 import ollama
+import asyncio
 import re
 import time
 
+from embedding_cache import EmbeddingCache, QueryEmbeddingCache
+from llm_scheduler import get_llm_scheduler
+from postgres_store import BulkLoaderUnavailable, get_bulk_loader
+
 # Embedding provider configuration
 EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "ollama").lower()
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
 OLLAMA_EMBEDDING_MODEL = os.getenv("OLLAMA_EMBEDDING_MODEL", "nomic-embed-text")
+# Maximum number of embedding requests in flight at once for the async API
+EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))
+OPENAI_EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Persistent embedding cache configuration
+USE_EMBEDDING_CACHE = os.getenv("USE_EMBEDDING_CACHE", "false") == "true"
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH") or os.path.expanduser("~/.cache/crawl4ai-mcp/embeddings.sqlite3")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "500000"))
+
+# In-memory cache of search query embeddings (size 0 disables it)
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+QUERY_EMBEDDING_CACHE_TTL = float(os.getenv("QUERY_EMBEDDING_CACHE_TTL", "3600"))
+
+# Default per-query vector index settings (0 keeps the database defaults)
+VECTOR_SEARCH_EF_SEARCH = int(os.getenv("VECTOR_SEARCH_EF_SEARCH", "0"))
+VECTOR_SEARCH_PROBES = int(os.getenv("VECTOR_SEARCH_PROBES", "0"))
 
 # LLM provider configuration for contextual embeddings and summaries
 LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai").lower()  # "openai" or "openrouter"
@@ -23,6 +46,14 @@ OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "openai/gpt-4o-mini")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 MODEL_CHOICE = os.getenv("MODEL_CHOICE", "gpt-4o-mini")  # For OpenAI
+# Number of chunks contextualized per LLM call (1 sends one request per chunk)
+CONTEXTUAL_EMBEDDING_BATCH_SIZE = int(os.getenv("CONTEXTUAL_EMBEDDING_BATCH_SIZE", "1"))
+
+# Adaptive document batching in add_documents_to_supabase
+DOCUMENT_BATCH_MAX_SIZE = int(os.getenv("DOCUMENT_BATCH_MAX_SIZE", "200"))
+DOCUMENT_BATCH_TARGET_SECONDS = float(os.getenv("DOCUMENT_BATCH_TARGET_SECONDS", "2.0"))
+# Keep insert requests well below typical API gateway body limits
+MAX_BATCH_PAYLOAD_BYTES = 4 * 1024 * 1024
 
 # Initialize LLM clients
 openai_llm_client = None
@@ -46,6 +77,13 @@ except ImportError:
 if EMBEDDING_PROVIDER == "openai":
     openai.api_key = os.getenv("OPENAI_API_KEY")
 
+# Async embedding clients, created on first use so they bind to the running event loop
+_async_openai_embedding_client = None
+_async_ollama_embedding_client = None
+_embedding_semaphore = None
+_embedding_cache = None
+_query_embedding_cache = None
+
 def get_supabase_client() -> Client:
     """
     Get a Supabase client with the URL and key from environment variables.
@@ -92,9 +130,82 @@ def get_embedding_dimension() -> int:
     else:
         return 1536  # Default fallback
 
+def get_embedding_model_name() -> str:
+    """
+    Get the name of the embedding model used by the configured provider.
+    
+    Returns:
+        Embedding model name
+    """
+    if EMBEDDING_PROVIDER == "ollama":
+        return OLLAMA_EMBEDDING_MODEL
+    return OPENAI_EMBEDDING_MODEL
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Get the persistent embedding cache, opening it on first use.
+    
+    Returns:
+        The embedding cache, or None if caching is disabled or the cache cannot be opened
+    """
+    global _embedding_cache, USE_EMBEDDING_CACHE
+    if not USE_EMBEDDING_CACHE:
+        return None
+    if _embedding_cache is None:
+        try:
+            _embedding_cache = EmbeddingCache(EMBEDDING_CACHE_PATH, max_entries=EMBEDDING_CACHE_MAX_ENTRIES)
+        except Exception as e:
+            print(f"Failed to open embedding cache at {EMBEDDING_CACHE_PATH}: {e}. Embedding cache disabled.")
+            USE_EMBEDDING_CACHE = False
+            return None
+    return _embedding_cache
+
+def get_embedding_cache_stats() -> Optional[Dict[str, Any]]:
+    """
+    Get the hit/miss counters of the embedding cache.
+    
+    Returns:
+        Dictionary of cache statistics, or None if caching is disabled
+    """
+    cache = get_embedding_cache()
+    return cache.stats() if cache else None
+
+def _lookup_cached_embeddings(cache: EmbeddingCache, texts: List[str]) -> Tuple[List[str], Dict[str, List[float]], List[str]]:
+    """
+    Split texts into cache hits and the unique texts that still need to be embedded.
+    
+    Returns:
+        Tuple of (cache key per text, cached embeddings by key, texts to embed)
+    """
+    model_name = get_embedding_model_name()
+    keys = [EmbeddingCache.make_key(EMBEDDING_PROVIDER, model_name, text) for text in texts]
+    cached = cache.get_many(keys)
+    
+    missing_texts = {}
+    for key, text in zip(keys, texts):
+        if key not in cached and key not in missing_texts:
+            missing_texts[key] = text
+    
+    return keys, cached, list(missing_texts.values())
+
+def _store_new_embeddings(cache: EmbeddingCache, cached: Dict[str, List[float]], texts: List[str], embeddings: List[List[float]]) -> None:
+    """
+    Add freshly created embeddings to the cache lookup and persist the valid ones.
+    Zero vectors are fallbacks for failed provider calls and are never persisted.
+    """
+    model_name = get_embedding_model_name()
+    new_items = {}
+    for text, embedding in zip(texts, embeddings):
+        key = EmbeddingCache.make_key(EMBEDDING_PROVIDER, model_name, text)
+        cached[key] = embedding
+        if embedding and any(v != 0.0 for v in embedding):
+            new_items[key] = embedding
+    cache.put_many(new_items)
+
 def create_embeddings_batch(texts: List[str]) -> List[List[float]]:
     """
     Create embeddings for multiple texts using the configured provider.
+    Texts already in the embedding cache are not sent to the provider.
     
     Args:
         texts: List of texts to create embeddings for
@@ -105,6 +216,19 @@ def create_embeddings_batch(texts: List[str]) -> List[List[float]]:
     if not texts:
         return []
     
+    cache = get_embedding_cache()
+    if cache is None:
+        return _create_embeddings_batch_uncached(texts)
+    
+    keys, cached, missing_texts = _lookup_cached_embeddings(cache, texts)
+    if missing_texts:
+        _store_new_embeddings(cache, cached, missing_texts, _create_embeddings_batch_uncached(missing_texts))
+    return [cached[key] for key in keys]
+
+def _create_embeddings_batch_uncached(texts: List[str]) -> List[List[float]]:
+    """
+    Create embeddings for multiple texts by calling the configured provider.
+    """
     if EMBEDDING_PROVIDER == "openai":
         return _create_openai_embeddings_batch(texts)
     elif EMBEDDING_PROVIDER == "ollama":
@@ -122,7 +246,7 @@ def _create_openai_embeddings_batch(texts: List[str]) -> List[List[float]]:
     for retry in range(max_retries):
         try:
             response = openai.embeddings.create(
-                model="text-embedding-3-small",
+                model=OPENAI_EMBEDDING_MODEL,
                 input=texts
             )
             return [item.embedding for item in response.data]
@@ -142,7 +266,7 @@ def _create_openai_embeddings_batch(texts: List[str]) -> List[List[float]]:
                 for i, text in enumerate(texts):
                     try:
                         individual_response = openai.embeddings.create(
-                            model="text-embedding-3-small",
+                            model=OPENAI_EMBEDDING_MODEL,
                             input=[text]
                         )
                         embeddings.append(individual_response.data[0].embedding)
@@ -188,6 +312,157 @@ def _create_ollama_embeddings_batch(texts: List[str]) -> List[List[float]]:
     # This should not be reached, but adding for completeness
     return [[0.0] * embedding_dim for _ in texts]
 
+def _get_embedding_semaphore() -> asyncio.Semaphore:
+    """Get the semaphore bounding the number of in-flight async embedding requests."""
+    global _embedding_semaphore
+    if _embedding_semaphore is None:
+        _embedding_semaphore = asyncio.Semaphore(max(1, EMBEDDING_MAX_CONCURRENCY))
+    return _embedding_semaphore
+
+async def create_embeddings_batch_async(texts: List[str]) -> List[List[float]]:
+    """
+    Create embeddings for multiple texts using the configured provider without blocking the event loop.
+    Texts already in the embedding cache are not sent to the provider.
+    
+    Args:
+        texts: List of texts to create embeddings for
+        
+    Returns:
+        List of embeddings (each embedding is a list of floats)
+    """
+    if not texts:
+        return []
+    
+    cache = get_embedding_cache()
+    if cache is None:
+        return await _create_embeddings_batch_uncached_async(texts)
+    
+    keys, cached, missing_texts = await asyncio.to_thread(_lookup_cached_embeddings, cache, texts)
+    if missing_texts:
+        embeddings = await _create_embeddings_batch_uncached_async(missing_texts)
+        await asyncio.to_thread(_store_new_embeddings, cache, cached, missing_texts, embeddings)
+    return [cached[key] for key in keys]
+
+async def _create_embeddings_batch_uncached_async(texts: List[str]) -> List[List[float]]:
+    """
+    Create embeddings for multiple texts by calling the configured provider asynchronously.
+    """
+    if EMBEDDING_PROVIDER == "openai":
+        return await _create_openai_embeddings_batch_async(texts)
+    elif EMBEDDING_PROVIDER == "ollama":
+        return await _create_ollama_embeddings_batch_async(texts)
+    else:
+        raise ValueError(f"Unsupported embedding provider: {EMBEDDING_PROVIDER}")
+
+async def _create_openai_embeddings_batch_async(texts: List[str]) -> List[List[float]]:
+    """
+    Create embeddings using the async OpenAI API.
+    """
+    global _async_openai_embedding_client
+    if _async_openai_embedding_client is None:
+        _async_openai_embedding_client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    client = _async_openai_embedding_client
+    semaphore = _get_embedding_semaphore()
+    
+    max_retries = 3
+    retry_delay = 1.0
+    
+    for retry in range(max_retries):
+        try:
+            async with semaphore:
+                response = await client.embeddings.create(
+                    model=OPENAI_EMBEDDING_MODEL,
+                    input=texts
+                )
+            return [item.embedding for item in response.data]
+        except Exception as e:
+            if retry < max_retries - 1:
+                print(f"Error creating OpenAI batch embeddings (attempt {retry + 1}/{max_retries}): {e}")
+                print(f"Retrying in {retry_delay} seconds...")
+                await asyncio.sleep(retry_delay)
+                retry_delay *= 2
+            else:
+                print(f"Failed to create OpenAI batch embeddings after {max_retries} attempts: {e}")
+                # Try creating embeddings one by one as fallback
+                print("Attempting to create OpenAI embeddings individually...")
+                
+                async def create_individual(i: int, text: str) -> Optional[List[float]]:
+                    try:
+                        async with semaphore:
+                            individual_response = await client.embeddings.create(
+                                model=OPENAI_EMBEDDING_MODEL,
+                                input=[text]
+                            )
+                        return individual_response.data[0].embedding
+                    except Exception as individual_error:
+                        print(f"Failed to create OpenAI embedding for text {i}: {individual_error}")
+                        return None
+                
+                results = await asyncio.gather(*(create_individual(i, text) for i, text in enumerate(texts)))
+                successful_count = sum(1 for embedding in results if embedding is not None)
+                print(f"Successfully created {successful_count}/{len(texts)} OpenAI embeddings individually")
+                return [embedding if embedding is not None else [0.0] * 1536 for embedding in results]
+    
+    # This should never be reached, but adding for completeness
+    return [[0.0] * 1536 for _ in texts]
+
+async def _create_ollama_embeddings_batch_async(texts: List[str]) -> List[List[float]]:
+    """
+    Create embeddings using the async Ollama API in a single batch.
+    """
+    global _async_ollama_embedding_client
+    if _async_ollama_embedding_client is None:
+        _async_ollama_embedding_client = ollama.AsyncClient(host=OLLAMA_HOST)
+    client = _async_ollama_embedding_client
+    semaphore = _get_embedding_semaphore()
+    
+    max_retries = 3
+    retry_delay = 1.0
+    embedding_dim = get_embedding_dimension()
+
+    for retry in range(max_retries):
+        try:
+            async with semaphore:
+                response = await client.embed(
+                    model=OLLAMA_EMBEDDING_MODEL,
+                    input=texts
+                )
+            return response['embeddings']
+        except Exception as e:
+            if retry < max_retries - 1:
+                print(f"Error creating Ollama batch embeddings (attempt {retry + 1}/{max_retries}): {e}")
+                print(f"Retrying in {retry_delay} seconds...")
+                await asyncio.sleep(retry_delay)
+                retry_delay *= 2
+            else:
+                print(f"Failed to create Ollama batch embeddings after {max_retries} attempts: {e}")
+                # Return a list of zero vectors as a fallback
+                return [[0.0] * embedding_dim for _ in texts]
+    
+    # This should not be reached, but adding for completeness
+    return [[0.0] * embedding_dim for _ in texts]
+
+async def create_embedding_async(text: str) -> List[float]:
+    """
+    Create an embedding for a single text without blocking the event loop.
+    
+    Args:
+        text: Text to create an embedding for
+        
+    Returns:
+        List of floats representing the embedding
+    """
+    try:
+        embeddings = await create_embeddings_batch_async([text])
+        if embeddings:
+            return embeddings[0]
+        else:
+            return [0.0] * get_embedding_dimension()
+    except Exception as e:
+        print(f"Error creating embedding: {e}")
+        # Return empty embedding if there's an error
+        return [0.0] * get_embedding_dimension()
+
 def create_embedding(text: str) -> List[float]:
     """
     Create an embedding for a single text using the configured provider.
@@ -211,6 +486,170 @@ def create_embedding(text: str) -> List[float]:
         embedding_dim = get_embedding_dimension()
         return [0.0] * embedding_dim
 
+def normalize_query(query: str) -> str:
+    """Normalize whitespace and case so trivially different queries share one cache entry."""
+    return " ".join(query.split()).lower()
+
+def get_query_embedding_cache() -> Optional[QueryEmbeddingCache]:
+    """
+    Get the process-wide query embedding cache.
+    
+    Returns:
+        QueryEmbeddingCache instance, or None if QUERY_EMBEDDING_CACHE_SIZE is 0
+    """
+    global _query_embedding_cache
+    if QUERY_EMBEDDING_CACHE_SIZE <= 0:
+        return None
+    if _query_embedding_cache is None:
+        _query_embedding_cache = QueryEmbeddingCache(QUERY_EMBEDDING_CACHE_SIZE, QUERY_EMBEDDING_CACHE_TTL)
+    return _query_embedding_cache
+
+def get_query_embedding_cache_stats() -> Optional[Dict[str, Any]]:
+    """Get query embedding cache statistics, or None if the cache is disabled."""
+    cache = get_query_embedding_cache()
+    return cache.stats() if cache else None
+
+def _query_embedding_key(text: str) -> str:
+    # Only the cache key is normalized, the query itself is embedded as written
+    return f"{EMBEDDING_PROVIDER}\0{get_embedding_model_name()}\0{normalize_query(text)}"
+
+def create_query_embedding(text: str) -> List[float]:
+    """
+    Create the embedding of a search query, reusing recent embeddings of the same normalized text.
+    
+    Args:
+        text: Query text to embed
+        
+    Returns:
+        List of floats representing the embedding
+    """
+    cache = get_query_embedding_cache()
+    if cache is None:
+        return create_embedding(text)
+    return cache.get_or_create(_query_embedding_key(text), lambda: create_embedding(text))
+
+async def create_query_embedding_async(text: str) -> List[float]:
+    """
+    Create the embedding of a search query without blocking the event loop.
+    
+    Recent embeddings of the same normalized text are reused, and concurrent requests
+    for the same text share a single provider call.
+    
+    Args:
+        text: Query text to embed
+        
+    Returns:
+        List of floats representing the embedding
+    """
+    cache = get_query_embedding_cache()
+    if cache is None:
+        return await create_embedding_async(text)
+    return await cache.get_or_create_async(_query_embedding_key(text), lambda: create_embedding_async(text))
+
+async def create_query_embeddings_async(texts: List[str]) -> List[List[float]]:
+    """
+    Create the embeddings of several search queries with at most one provider call.
+    
+    Args:
+        texts: Query texts to embed
+        
+    Returns:
+        One embedding per text, in input order
+    """
+    cache = get_query_embedding_cache()
+    if cache is None:
+        return await create_embeddings_batch_async(texts)
+    
+    async def create_missing(indices: List[int]) -> List[List[float]]:
+        return await create_embeddings_batch_async([texts[i] for i in indices])
+    
+    return await cache.get_or_create_many_async([_query_embedding_key(text) for text in texts], create_missing)
+
+CONTEXTUAL_EMBEDDING_SYSTEM_PROMPT = "You are a helpful assistant that provides concise contextual information."
+
+def _contextual_document_prefix(full_document: str) -> str:
+    """
+    Build the document part of a contextual embedding prompt.
+    
+    Every contextualization request for a document starts with exactly this text, so
+    providers that cache prompt prefixes can reuse it across the document's chunks.
+    """
+    return f"""<document> 
+{full_document[:25000]} 
+</document>
+"""
+
+def _submit_chat_completion(llm_client: Any, model_name: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> concurrent.futures.Future:
+    """
+    Queue a chat completion on the process-wide LLM scheduler.
+    
+    The request shares the concurrency limit and rate limits of every other LLM call made
+    by the server and is dispatched with the priority of the calling tool.
+    
+    Returns:
+        Future resolved with the chat completion response
+    """
+    # Roughly four characters per prompt token, plus the completion budget
+    estimated_tokens = sum(len(message["content"]) for message in messages) // 4 + max_tokens
+    return get_llm_scheduler().submit(
+        lambda: llm_client.chat.completions.create(
+            model=model_name,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        ),
+        estimated_tokens=estimated_tokens
+    )
+
+def _submit_contextual_request(llm_client: Any, model_name: str, full_document: str, chunks: List[str]) -> concurrent.futures.Future:
+    """Queue one contextualization request covering one or more chunks of the same document."""
+    if len(chunks) == 1:
+        prompt = f"""{_contextual_document_prefix(full_document)}Here is the chunk we want to situate within the whole document 
+<chunk> 
+{chunks[0]}
+</chunk> 
+Please give a short succinct context to situate this chunk within the overall document for the purposes of improving search retrieval of the chunk. Answer only with the succinct context and nothing else."""
+    else:
+        chunk_sections = "\n".join(f'<chunk id="{i + 1}">\n{chunk}\n</chunk>' for i, chunk in enumerate(chunks))
+        prompt = f"""{_contextual_document_prefix(full_document)}Here are {len(chunks)} chunks we want to situate within the whole document 
+{chunk_sections}
+For each chunk, please give a short succinct context to situate it within the overall document for the purposes of improving search retrieval of the chunk. Answer only with a JSON object of the form {{"contexts": ["context for chunk 1", "context for chunk 2", ...]}} containing exactly {len(chunks)} strings in chunk order."""
+    
+    return _submit_chat_completion(
+        llm_client,
+        model_name,
+        [
+            {"role": "system", "content": CONTEXTUAL_EMBEDDING_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.3,
+        max_tokens=200 * len(chunks)
+    )
+
+def _collect_contextual_results(future: concurrent.futures.Future, chunks: List[str]) -> Optional[List[Tuple[str, bool]]]:
+    """
+    Wait for a contextualization request and combine each context with its chunk.
+    
+    Returns:
+        List of (contextual text, True) tuples in chunk order, or None if the request
+        failed or its response could not be parsed
+    """
+    try:
+        response = future.result()
+        response_text = response.choices[0].message.content or ""
+    except Exception as e:
+        print(f"Error generating contextual embedding: {e}")
+        return None
+    
+    if len(chunks) == 1:
+        contexts = [response_text.strip()]
+    else:
+        contexts = _parse_batched_contexts(response_text, len(chunks))
+        if contexts is None:
+            return None
+    
+    return [(f"{context}\n---\n{chunk}", True) for context, chunk in zip(contexts, chunks)]
+
 def generate_contextual_embedding(full_document: str, chunk: str) -> Tuple[str, bool]:
     """
     Generate contextual information for a chunk within a document to improve retrieval.
@@ -231,39 +670,126 @@ def generate_contextual_embedding(full_document: str, chunk: str) -> Tuple[str,
         print(f"No LLM client available (provider: {LLM_PROVIDER}). Using original chunk instead.")
         return chunk, False
     
+    results = _collect_contextual_results(
+        _submit_contextual_request(llm_client, model_name, full_document, [chunk]), [chunk]
+    )
+    if results is None:
+        print("Using original chunk instead.")
+        return chunk, False
+    
+    return results[0]
+
+def _parse_batched_contexts(response_text: str, expected_count: int) -> Optional[List[str]]:
+    """
+    Parse the list of contexts from a batched contextualization response.
+    
+    Returns:
+        List of contexts in chunk order, or None if the response is malformed
+    """
     try:
-        # Create the prompt for generating contextual information
-        prompt = f"""<document> 
-{full_document[:25000]} 
-</document>
-Here is the chunk we want to situate within the whole document 
-<chunk> 
-{chunk}
-</chunk> 
-Please give a short succinct context to situate this chunk within the overall document for the purposes of improving search retrieval of the chunk. Answer only with the succinct context and nothing else."""
+        data = json.loads(response_text)
+    except json.JSONDecodeError:
+        # Tolerate models that wrap the JSON object in prose or code fences
+        match = re.search(r'\{.*\}', response_text, re.DOTALL)
+        if not match:
+            return None
+        try:
+            data = json.loads(match.group(0))
+        except json.JSONDecodeError:
+            return None
+    
+    contexts = data.get("contexts") if isinstance(data, dict) else data
+    if not isinstance(contexts, list) or len(contexts) != expected_count:
+        return None
+    if not all(isinstance(context, str) and context.strip() for context in contexts):
+        return None
+    return [context.strip() for context in contexts]
 
-        # Call the LLM API to generate contextual information
-        response = llm_client.chat.completions.create(
-            model=model_name,
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that provides concise contextual information."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=200
-        )
-        
-        # Extract the generated context
-        context = response.choices[0].message.content.strip()
+def generate_contextual_embeddings_batch(full_document: str, chunks: List[str]) -> List[Tuple[str, bool]]:
+    """
+    Generate contextual information for several chunks of the same document with a single LLM call.
+    
+    The document is sent once, followed by all chunks, and the contexts are parsed from a
+    JSON response. If the response cannot be parsed, each chunk is contextualized on its own.
+    
+    Args:
+        full_document: The complete document text
+        chunks: The chunks of the document to generate context for
         
-        # Combine the context with the original chunk
-        contextual_text = f"{context}\n---\n{chunk}"
+    Returns:
+        List of tuples, one per chunk, containing:
+        - The contextual text that situates the chunk within the document
+        - Boolean indicating if contextual embedding was performed
+    """
+    return contextualize_chunks([""] * len(chunks), chunks, {"": full_document}, group_size=len(chunks))
+
+def contextualize_chunks(urls: List[str], contents: List[str], url_to_full_document: Dict[str, str], group_size: Optional[int] = None) -> List[Tuple[str, bool]]:
+    """
+    Generate contextual text for a list of chunks, batching chunks of the same document.
+    
+    Chunks are grouped by document into groups of CONTEXTUAL_EMBEDDING_BATCH_SIZE. The first
+    group of each document is sent before the others so that the shared document prefix is
+    already in the provider's prompt cache when the remaining groups are sent. Requests are
+    queued on the process-wide LLM scheduler, which bounds how many run concurrently.
+    
+    Args:
+        urls: URL of each chunk
+        contents: Content of each chunk
+        url_to_full_document: Dictionary mapping URLs to their full document content
+        group_size: Number of chunks per LLM call, defaults to CONTEXTUAL_EMBEDDING_BATCH_SIZE
         
-        return contextual_text, True
+    Returns:
+        List of (contextual text, contextual embedding performed) tuples in input order
+    """
+    results: List[Tuple[str, bool]] = [(content, False) for content in contents]
     
-    except Exception as e:
-        print(f"Error generating contextual embedding: {e}. Using original chunk instead.")
-        return chunk, False
+    llm_client, model_name = get_llm_client_and_model()
+    
+    if not llm_client:
+        print(f"No LLM client available (provider: {LLM_PROVIDER}). Using original chunks instead.")
+        return results
+    
+    group_size = max(1, group_size or CONTEXTUAL_EMBEDDING_BATCH_SIZE)
+    
+    # Group chunk indices by document, preserving order within each document
+    indices_by_url: Dict[str, List[int]] = {}
+    for idx, url in enumerate(urls):
+        indices_by_url.setdefault(url, []).append(idx)
+    
+    first_groups = []
+    remaining_groups = []
+    for url, indices in indices_by_url.items():
+        groups = [indices[k:k + group_size] for k in range(0, len(indices), group_size)]
+        first_groups.append((url, groups[0]))
+        remaining_groups.extend((url, group) for group in groups[1:])
+    
+    def run_groups(groups: List[Tuple[str, List[int]]]) -> List[Tuple[str, List[int]]]:
+        # Queue every request before waiting on any of them, and return the groups that failed
+        pending = [
+            (url, group, _submit_contextual_request(
+                llm_client, model_name, url_to_full_document.get(url, ""), [contents[idx] for idx in group]
+            ))
+            for url, group in groups
+        ]
+        failed = []
+        for url, group, future in pending:
+            group_results = _collect_contextual_results(future, [contents[idx] for idx in group])
+            if group_results is None:
+                failed.append((url, group))
+                continue
+            for idx, result in zip(group, group_results):
+                results[idx] = result
+        return failed
+    
+    for groups in (first_groups, remaining_groups):
+        failed = run_groups(groups)
+        # Retry chunks of failed batched requests one per request; failed single chunks keep their original content
+        retry = [(url, [idx]) for url, group in failed if len(group) > 1 for idx in group]
+        if retry:
+            print(f"Batched contextualization failed for {len(retry)} chunks. Contextualizing them individually.")
+            run_groups(retry)
+    
+    return results
 
 def process_chunk_with_context(args):
     """
@@ -281,6 +807,164 @@ def process_chunk_with_context(args):
     url, content, full_document = args
     return generate_contextual_embedding(full_document, content)
 
+def compute_content_hash(content: str) -> str:
+    """
+    Compute the content hash used to detect unchanged pages and chunks.
+    
+    Args:
+        content: Text to hash
+        
+    Returns:
+        Hex-encoded SHA-256 digest of the text
+    """
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+def get_crawl_metadata(client: Client, urls: List[str], batch_size: int = 50) -> Dict[str, Dict[str, Any]]:
+    """
+    Get the crawl metadata recorded for pages during previous incremental crawls.
+    
+    Args:
+        client: Supabase client
+        urls: List of page URLs
+        batch_size: Number of URLs per query
+        
+    Returns:
+        Dictionary mapping each previously crawled URL to its content hash, ETag,
+        Last-Modified header and sitemap <lastmod> value
+    """
+    crawl_metadata = {}
+    unique_urls = list(dict.fromkeys(urls))
+    for i in range(0, len(unique_urls), batch_size):
+        try:
+            result = client.table("crawl_metadata")\
+                .select("url, content_hash, etag, last_modified, sitemap_lastmod")\
+                .in_("url", unique_urls[i:i + batch_size])\
+                .execute()
+            for row in result.data or []:
+                crawl_metadata[row["url"]] = row
+        except Exception as e:
+            print(f"Error fetching crawl metadata: {e}")
+    return crawl_metadata
+
+def get_page_hashes(client: Client, urls: List[str]) -> Dict[str, str]:
+    """
+    Get the content hashes recorded for pages during previous incremental crawls.
+    
+    Args:
+        client: Supabase client
+        urls: List of page URLs
+        
+    Returns:
+        Dictionary mapping each previously crawled URL to its page content hash
+    """
+    return {url: row["content_hash"] for url, row in get_crawl_metadata(client, urls).items()
+            if row.get("content_hash")}
+
+def build_crawl_metadata(url: str, content_hash: str, response_headers: Optional[Dict[str, str]] = None, sitemap_lastmod: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Build the crawl metadata row recorded for a freshly crawled page.
+    
+    Args:
+        url: Page URL
+        content_hash: Content hash of the page markdown
+        response_headers: HTTP response headers of the page, if available
+        sitemap_lastmod: The page's <lastmod> value from the sitemap, if any
+        
+    Returns:
+        Dictionary with the columns of the crawl_metadata table
+    """
+    headers = {k.lower(): v for k, v in (response_headers or {}).items()}
+    return {
+        "url": url,
+        "content_hash": content_hash,
+        "etag": headers.get("etag"),
+        "last_modified": headers.get("last-modified"),
+        "sitemap_lastmod": sitemap_lastmod
+    }
+
+def update_crawl_metadata(client: Client, rows: List[Dict[str, Any]]) -> None:
+    """
+    Record the crawl metadata of freshly crawled pages for the next incremental crawl.
+    
+    Args:
+        client: Supabase client
+        rows: Rows built with build_crawl_metadata
+    """
+    if not rows:
+        return
+    
+    crawled_at = datetime.now(timezone.utc).isoformat()
+    try:
+        client.table("crawl_metadata").upsert(
+            [{**row, "updated_at": crawled_at} for row in rows], on_conflict="url"
+        ).execute()
+    except Exception as e:
+        print(f"Error updating crawl metadata: {e}")
+
+def _get_chunk_hashes(client: Client, urls: List[str], batch_size: int = 20, page_size: int = 1000) -> Dict[Tuple[str, int], Optional[str]]:
+    """
+    Get the content hash stored for every existing chunk of the given URLs.
+    
+    Returns:
+        Dictionary mapping (url, chunk_number) to the stored chunk hash
+    """
+    chunk_hashes = {}
+    for i in range(0, len(urls), batch_size):
+        batch_urls = urls[i:i + batch_size]
+        offset = 0
+        while True:
+            result = client.table("crawled_pages")\
+                .select("url, chunk_number, content_hash:metadata->>content_hash")\
+                .in_("url", batch_urls)\
+                .order("id")\
+                .range(offset, offset + page_size - 1)\
+                .execute()
+            rows = result.data or []
+            for row in rows:
+                chunk_hashes[(row["url"], row["chunk_number"])] = row.get("content_hash")
+            if len(rows) < page_size:
+                break
+            offset += page_size
+    return chunk_hashes
+
+def _delete_documents(client: Client, unique_urls: List[str]) -> None:
+    """Delete every stored chunk of the given URLs."""
+    try:
+        if unique_urls:
+            # Use the .in_() filter to delete all records with matching URLs
+            client.table("crawled_pages").delete().in_("url", unique_urls).execute()
+    except Exception as e:
+        print(f"Batch delete failed: {e}. Trying one-by-one deletion as fallback.")
+        # Fallback: delete records one by one
+        for url in unique_urls:
+            try:
+                client.table("crawled_pages").delete().eq("url", url).execute()
+            except Exception as inner_e:
+                print(f"Error deleting record for URL {url}: {inner_e}")
+                # Continue with the next URL even if one fails
+
+class _AdaptiveBatchSizer:
+    """
+    Adapt the number of chunks per batch to the measured stage latency and payload size.
+    
+    The batch grows while batches finish well under the target time and payload limit,
+    which amortizes per-request overhead, and shrinks as soon as either is exceeded.
+    """
+    
+    def __init__(self, initial_size: int, max_size: int, target_seconds: float, min_size: int = 1, max_payload_bytes: Optional[int] = MAX_BATCH_PAYLOAD_BYTES):
+        self.min_size = min_size
+        self.max_size = max(min_size, max_size)
+        self.target_seconds = target_seconds
+        self.max_payload_bytes = max_payload_bytes if max_payload_bytes is not None else float("inf")
+        self.size = min(max(initial_size, min_size), self.max_size)
+    
+    def update(self, seconds: float, payload_bytes: int) -> None:
+        """Record the slowest stage time and payload size of the last completed batch."""
+        if seconds > self.target_seconds or payload_bytes > self.max_payload_bytes:
+            self.size = max(self.min_size, self.size // 2)
+        elif seconds < self.target_seconds / 2 and payload_bytes < self.max_payload_bytes / 2:
+            self.size = min(self.max_size, self.size + max(1, self.size // 2))
+
 def add_documents_to_supabase(
     client: Client, 
     urls: List[str], 
@@ -288,12 +972,22 @@ def add_documents_to_supabase(
     contents: List[str], 
     metadatas: List[Dict[str, Any]],
     url_to_full_document: Dict[str, str],
-    batch_size: int = 20
-) -> None:
+    batch_size: int = 20,
+    incremental: bool = False
+) -> int:
     """
     Add documents to the Supabase crawled_pages table in batches.
     Deletes existing records with the same URLs before inserting to prevent duplicates.
     
+    In incremental mode existing records are kept: only chunks whose content hash
+    differs from the stored one are contextualized, embedded and upserted on
+    (url, chunk_number), and chunks past the new end of a page are deleted.
+    
+    Embedding and insertion are pipelined: the next batch is contextualized and embedded
+    while the previous one is being written, and the batch size grows or shrinks with the
+    measured stage latency and payload size (see DOCUMENT_BATCH_MAX_SIZE and
+    DOCUMENT_BATCH_TARGET_SECONDS).
+    
     Args:
         client: Supabase client
         urls: List of URLs
@@ -301,141 +995,264 @@ def add_documents_to_supabase(
         contents: List of document contents
         metadatas: List of document metadata
         url_to_full_document: Dictionary mapping URLs to their full document content
-        batch_size: Size of each batch for insertion
+        batch_size: Initial size of each batch, adapted to the measured latency and payload size
+            (and its minimum size when contextual embeddings are enabled)
+        incremental: Whether to only write chunks that changed since the last crawl
+        
+    Returns:
+        Number of chunks written
     """
     # Get unique URLs to delete existing records
     unique_urls = list(set(urls))
     
-    # Delete existing records for these URLs in a single operation
-    try:
-        if unique_urls:
-            # Use the .in_() filter to delete all records with matching URLs
-            client.table("crawled_pages").delete().in_("url", unique_urls).execute()
-    except Exception as e:
-        print(f"Batch delete failed: {e}. Trying one-by-one deletion as fallback.")
-        # Fallback: delete records one by one
-        for url in unique_urls:
+    # Record the hash of the original chunk so later crawls can detect changes
+    for content, metadata in zip(contents, metadatas):
+        metadata["content_hash"] = compute_content_hash(content)
+    
+    if incremental:
+        try:
+            existing_hashes = _get_chunk_hashes(client, unique_urls)
+        except Exception as e:
+            print(f"Error fetching existing chunk hashes: {e}. Replacing all chunks instead.")
+            existing_hashes = None
+        
+        if existing_hashes is None:
+            _delete_documents(client, unique_urls)
+        else:
+            # Delete chunks past the new end of each page
+            new_chunk_counts = {}
+            for url, chunk_number in zip(urls, chunk_numbers):
+                new_chunk_counts[url] = max(new_chunk_counts.get(url, 0), chunk_number + 1)
+            existing_chunk_counts = {}
+            for url, chunk_number in existing_hashes:
+                existing_chunk_counts[url] = max(existing_chunk_counts.get(url, 0), chunk_number + 1)
+            for url, chunk_count in new_chunk_counts.items():
+                if existing_chunk_counts.get(url, 0) > chunk_count:
+                    try:
+                        client.table("crawled_pages").delete().eq("url", url).gte("chunk_number", chunk_count).execute()
+                    except Exception as e:
+                        print(f"Error deleting stale chunks for URL {url}: {e}")
+            
+            # Keep only the chunks that changed
+            changed = [i for i in range(len(contents))
+                       if existing_hashes.get((urls[i], chunk_numbers[i])) != metadatas[i]["content_hash"]]
+            print(f"Incremental update: {len(changed)}/{len(contents)} chunks changed")
+            urls = [urls[i] for i in changed]
+            chunk_numbers = [chunk_numbers[i] for i in changed]
+            contents = [contents[i] for i in changed]
+            metadatas = [metadatas[i] for i in changed]
+    else:
+        # Delete existing records for these URLs in a single operation
+        _delete_documents(client, unique_urls)
+    
+    bulk_loader = get_bulk_loader()
+    
+    def write_batch(rows):
+        nonlocal bulk_loader
+        if bulk_loader:
             try:
-                client.table("crawled_pages").delete().eq("url", url).execute()
-            except Exception as inner_e:
-                print(f"Error deleting record for URL {url}: {inner_e}")
-                # Continue with the next URL even if one fails
+                return bulk_loader.copy_rows("crawled_pages", rows if isinstance(rows, list) else [rows])
+            except BulkLoaderUnavailable:
+                # Postgres went away: write this and later batches through REST within its payload limit
+                bulk_loader = None
+                sizer.max_payload_bytes = MAX_BATCH_PAYLOAD_BYTES
+        if incremental:
+            return client.table("crawled_pages").upsert(rows, on_conflict="url,chunk_number").execute()
+        return client.table("crawled_pages").insert(rows).execute()
+    
+    def insert_batch(batch_data: List[Dict[str, Any]]) -> float:
+        # Insert batch into Supabase with retry logic, returning the time spent
+        start_time = time.perf_counter()
+        max_retries = 3
+        retry_delay = 1.0  # Start with 1 second delay
+        
+        for retry in range(max_retries):
+            try:
+                write_batch(batch_data)
+                # Success - break out of retry loop
+                break
+            except Exception as e:
+                if retry < max_retries - 1:
+                    print(f"Error inserting batch into Supabase (attempt {retry + 1}/{max_retries}): {e}")
+                    print(f"Retrying in {retry_delay} seconds...")
+                    time.sleep(retry_delay)
+                    retry_delay *= 2  # Exponential backoff
+                else:
+                    # Final attempt failed
+                    print(f"Failed to insert batch after {max_retries} attempts: {e}")
+                    # Optionally, try inserting records one by one as a last resort
+                    print("Attempting to insert records individually...")
+                    successful_inserts = 0
+                    for record in batch_data:
+                        try:
+                            write_batch(record)
+                            successful_inserts += 1
+                        except Exception as individual_error:
+                            print(f"Failed to insert individual record for URL {record['url']}: {individual_error}")
+                    
+                    if successful_inserts > 0:
+                        print(f"Successfully inserted {successful_inserts}/{len(batch_data)} records individually")
+        
+        return time.perf_counter() - start_time
     
     # Check if MODEL_CHOICE is set for contextual embeddings
     use_contextual_embeddings = os.getenv("USE_CONTEXTUAL_EMBEDDINGS", "false") == "true"
     print(f"\n\nUse contextual embeddings: {use_contextual_embeddings}\n\n")
     
-    # Process in batches to avoid memory issues
-    for i in range(0, len(contents), batch_size):
-        batch_end = min(i + batch_size, len(contents))
-        
-        # Get batch slices
-        batch_urls = urls[i:batch_end]
-        batch_chunk_numbers = chunk_numbers[i:batch_end]
-        batch_contents = contents[i:batch_end]
-        batch_metadatas = metadatas[i:batch_end]
-        
-        # Apply contextual embedding to each chunk if MODEL_CHOICE is set
-        if use_contextual_embeddings:
-            # Prepare arguments for parallel processing
-            process_args = []
-            for j, content in enumerate(batch_contents):
-                url = batch_urls[j]
-                full_document = url_to_full_document.get(url, "")
-                process_args.append((url, content, full_document))
+    sizer = _AdaptiveBatchSizer(
+        batch_size,
+        max_size=DOCUMENT_BATCH_MAX_SIZE,
+        target_seconds=DOCUMENT_BATCH_TARGET_SECONDS,
+        # Contextualization groups chunks by CONTEXTUAL_EMBEDDING_BATCH_SIZE, don't shrink below the initial size
+        min_size=min(batch_size, DOCUMENT_BATCH_MAX_SIZE) if use_contextual_embeddings else 1,
+        # COPY streams the rows, so only REST inserts are bound by a request body limit
+        max_payload_bytes=None if bulk_loader else MAX_BATCH_PAYLOAD_BYTES
+    )
+    
+    # Batches are prepared (contextualized and embedded) on this thread while the previous
+    # batch is written on the writer thread, so the slowest stage bounds the throughput
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="supabase-writer") as writer:
+        pending_write = None
+        i = 0
+        while i < len(contents):
+            batch_end = min(i + sizer.size, len(contents))
             
-            # Process in parallel using ThreadPoolExecutor
-            contextual_contents = []
-            with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-                # Submit all tasks and collect results
-                future_to_idx = {executor.submit(process_chunk_with_context, arg): idx 
-                                for idx, arg in enumerate(process_args)}
-                
-                # Process results as they complete
-                for future in concurrent.futures.as_completed(future_to_idx):
-                    idx = future_to_idx[future]
-                    try:
-                        result, success = future.result()
-                        contextual_contents.append(result)
-                        if success:
-                            batch_metadatas[idx]["contextual_embedding"] = True
-                    except Exception as e:
-                        print(f"Error processing chunk {idx}: {e}")
-                        # Use original content as fallback
-                        contextual_contents.append(batch_contents[idx])
+            # Get batch slices
+            batch_urls = urls[i:batch_end]
+            batch_chunk_numbers = chunk_numbers[i:batch_end]
+            batch_contents = contents[i:batch_end]
+            batch_metadatas = metadatas[i:batch_end]
+            i = batch_end
             
-            # Sort results back into original order if needed
-            if len(contextual_contents) != len(batch_contents):
-                print(f"Warning: Expected {len(batch_contents)} results but got {len(contextual_contents)}")
-                # Use original contents as fallback
+            # Apply contextual embedding to each chunk if MODEL_CHOICE is set
+            if use_contextual_embeddings:
+                # Chunks of the same document share one prompt prefix and are batched together
+                contextual_contents = []
+                for idx, (result, success) in enumerate(contextualize_chunks(batch_urls, batch_contents, url_to_full_document)):
+                    contextual_contents.append(result)
+                    if success:
+                        batch_metadatas[idx]["contextual_embedding"] = True
+            else:
+                # If not using contextual embeddings, use original contents
                 contextual_contents = batch_contents
-        else:
-            # If not using contextual embeddings, use original contents
-            contextual_contents = batch_contents
-        
-        # Create embeddings for the entire batch at once
-        batch_embeddings = create_embeddings_batch(contextual_contents)
-        
-        batch_data = []
-        for j in range(len(contextual_contents)):
-            # Extract metadata fields
-            chunk_size = len(contextual_contents[j])
             
-            # Extract source_id from URL
-            parsed_url = urlparse(batch_urls[j])
-            source_id = parsed_url.netloc or parsed_url.path
+            # Only the stages the batch size controls are timed: the per-chunk LLM calls of
+            # contextualization take as long whatever the batch size
+            prepare_start = time.perf_counter()
             
-            # Prepare data for insertion
-            data = {
-                "url": batch_urls[j],
-                "chunk_number": batch_chunk_numbers[j],
-                "content": contextual_contents[j],  # Store original content
-                "metadata": {
-                    "chunk_size": chunk_size,
-                    **batch_metadatas[j]
-                },
-                "source_id": source_id,  # Add source_id field
-                "embedding": batch_embeddings[j]  # Use embedding from contextual content
-            }
+            # Create embeddings for the entire batch at once
+            batch_embeddings = create_embeddings_batch(contextual_contents)
             
-            batch_data.append(data)
+            batch_data = []
+            payload_bytes = 0
+            for j in range(len(contextual_contents)):
+                # Extract metadata fields
+                chunk_size = len(contextual_contents[j])
+                
+                # Extract source_id from URL
+                parsed_url = urlparse(batch_urls[j])
+                source_id = parsed_url.netloc or parsed_url.path
+                
+                # Prepare data for insertion
+                data = {
+                    "url": batch_urls[j],
+                    "chunk_number": batch_chunk_numbers[j],
+                    "content": contextual_contents[j],  # Store original content
+                    "metadata": {
+                        "chunk_size": chunk_size,
+                        **batch_metadatas[j]
+                    },
+                    "source_id": source_id,  # Add source_id field
+                    "embedding": batch_embeddings[j]  # Use embedding from contextual content
+                }
+                
+                batch_data.append(data)
+                # Roughly 12 bytes per serialized vector component
+                payload_bytes += chunk_size + len(batch_embeddings[j]) * 12
+            
+            prepare_seconds = time.perf_counter() - prepare_start
+            
+            # Wait for the previous batch to be written before queueing this one
+            if pending_write is not None:
+                write_future, previous_prepare_seconds, previous_payload_bytes = pending_write
+                sizer.update(max(previous_prepare_seconds, write_future.result()), previous_payload_bytes)
+            pending_write = (writer.submit(insert_batch, batch_data), prepare_seconds, payload_bytes)
+        
+        if pending_write is not None:
+            pending_write[0].result()
+    
+    return len(contents)
+
+def _add_vector_index_params(params: Dict[str, Any], ef_search: Optional[int], probes: Optional[int]) -> None:
+    """Add the per-query vector index settings, defaulting to VECTOR_SEARCH_EF_SEARCH and VECTOR_SEARCH_PROBES."""
+    ef_search = ef_search or VECTOR_SEARCH_EF_SEARCH
+    probes = probes or VECTOR_SEARCH_PROBES
+    # Only send the settings when set, so databases with older search functions keep working
+    if ef_search:
+        params['ef_search'] = ef_search
+    if probes:
+        params['probes'] = probes
+
+def _rank_as_similarity(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Fill in the similarity of keyword-only results from their full-text rank.
+    
+    ts_rank_cd is unbounded, so it is mapped to rank / (rank + 1) (ts_rank_cd's normalization
+    option 32) to stay within [0, 1] and in the same order as the rank.
+    
+    Args:
+        results: Rows returned by a keyword_match_* function
+        
+    Returns:
+        The same rows, each with a similarity field
+    """
+    for result in results:
+        if result.get("similarity") is None:
+            rank = max(result.get("rank") or 0.0, 0.0)
+            result["similarity"] = rank / (rank + 1)
+    return results
+
+def keyword_search_documents(
+    client: Client, 
+    query: str, 
+    match_count: int = 10, 
+    filter_metadata: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Search for documents with the full-text index, ranked by ts_rank_cd.
+    
+    Args:
+        client: Supabase client
+        query: Query text in web search syntax (quoted phrases, OR, -exclusions)
+        match_count: Maximum number of results to return
+        filter_metadata: Optional metadata filter
+        
+    Returns:
+        List of matching documents, best rank first, with a similarity derived from the rank
+    """
+    try:
+        params = {
+            'query_text': query,
+            'match_count': match_count
+        }
+        if filter_metadata:
+            params['filter'] = filter_metadata
         
-        # Insert batch into Supabase with retry logic
-        max_retries = 3
-        retry_delay = 1.0  # Start with 1 second delay
+        result = client.rpc('keyword_match_crawled_pages', params).execute()
         
-        for retry in range(max_retries):
-            try:
-                client.table("crawled_pages").insert(batch_data).execute()
-                # Success - break out of retry loop
-                break
-            except Exception as e:
-                if retry < max_retries - 1:
-                    print(f"Error inserting batch into Supabase (attempt {retry + 1}/{max_retries}): {e}")
-                    print(f"Retrying in {retry_delay} seconds...")
-                    time.sleep(retry_delay)
-                    retry_delay *= 2  # Exponential backoff
-                else:
-                    # Final attempt failed
-                    print(f"Failed to insert batch after {max_retries} attempts: {e}")
-                    # Optionally, try inserting records one by one as a last resort
-                    print("Attempting to insert records individually...")
-                    successful_inserts = 0
-                    for record in batch_data:
-                        try:
-                            client.table("crawled_pages").insert(record).execute()
-                            successful_inserts += 1
-                        except Exception as individual_error:
-                            print(f"Failed to insert individual record for URL {record['url']}: {individual_error}")
-                    
-                    if successful_inserts > 0:
-                        print(f"Successfully inserted {successful_inserts}/{len(batch_data)} records individually")
+        return _rank_as_similarity(result.data)
+    except Exception as e:
+        print(f"Error in keyword document search: {e}")
+        return []
 
 def search_documents(
     client: Client, 
     query: str, 
     match_count: int = 10, 
-    filter_metadata: Optional[Dict[str, Any]] = None
+    filter_metadata: Optional[Dict[str, Any]] = None,
+    query_embedding: Optional[List[float]] = None,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None
 ) -> List[Dict[str, Any]]:
     """
     Search for documents in Supabase using vector similarity.
@@ -445,12 +1262,20 @@ def search_documents(
         query: Query text
         match_count: Maximum number of results to return
         filter_metadata: Optional metadata filter
+        query_embedding: Optional precomputed embedding of the query
+        ef_search: Optional HNSW ef_search for this query (higher is more accurate but slower)
+        probes: Optional ivfflat probes for this query (higher is more accurate but slower)
         
     Returns:
         List of matching documents
     """
     # Create embedding for the query
-    query_embedding = create_embedding(query)
+    if query_embedding is None:
+        query_embedding = create_query_embedding(query)
+    
+    # Without a usable query embedding, the full-text ranking is the only meaningful one
+    if not any(query_embedding):
+        return keyword_search_documents(client, query, match_count, filter_metadata)
     
     # Execute the search using the match_crawled_pages function
     try:
@@ -464,6 +1289,8 @@ def search_documents(
         if filter_metadata:
             params['filter'] = filter_metadata  # Pass the dictionary directly, not JSON-encoded
         
+        _add_vector_index_params(params, ef_search, probes)
+        
         result = client.rpc('match_crawled_pages', params).execute()
         
         return result.data
@@ -471,109 +1298,115 @@ def search_documents(
         print(f"Error searching documents: {e}")
         return []
 
-
-def extract_code_blocks(markdown_content: str, min_length: int = 1000) -> List[Dict[str, Any]]:
+async def search_documents_async(
+    client: Client, 
+    query: str, 
+    match_count: int = 10, 
+    filter_metadata: Optional[Dict[str, Any]] = None,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None
+) -> List[Dict[str, Any]]:
     """
-    Extract code blocks from markdown content along with context.
+    Search for documents in Supabase using vector similarity without blocking the event loop.
     
     Args:
-        markdown_content: The markdown content to extract code blocks from
-        min_length: Minimum length of code blocks to extract (default: 1000 characters)
+        client: Supabase client
+        query: Query text
+        match_count: Maximum number of results to return
+        filter_metadata: Optional metadata filter
+        ef_search: Optional HNSW ef_search for this query (higher is more accurate but slower)
+        probes: Optional ivfflat probes for this query (higher is more accurate but slower)
         
     Returns:
-        List of dictionaries containing code blocks and their context
+        List of matching documents
     """
-    code_blocks = []
-    
-    # Skip if content starts with triple backticks (edge case for files wrapped in backticks)
-    content = markdown_content.strip()
-    start_offset = 0
-    if content.startswith('```'):
-        # Skip the first triple backticks
-        start_offset = 3
-        print("Skipping initial triple backticks")
+    query_embedding = await create_query_embedding_async(query)
+    return await asyncio.to_thread(
+        search_documents, client, query, match_count, filter_metadata, query_embedding, ef_search, probes
+    )
+
+def hybrid_search_documents(
+    client: Client, 
+    query: str, 
+    match_count: int = 10, 
+    filter_metadata: Optional[Dict[str, Any]] = None,
+    query_embedding: Optional[List[float]] = None,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Search for documents with vector similarity and full-text search in a single round trip.
     
-    # Find all occurrences of triple backticks
-    backtick_positions = []
-    pos = start_offset
-    while True:
-        pos = markdown_content.find('```', pos)
-        if pos == -1:
-            break
-        backtick_positions.append(pos)
-        pos += 3
+    The hybrid_match_crawled_pages function fuses both rankings with reciprocal rank fusion
+    in Postgres. If the function does not exist yet, a vector-only search is performed.
     
-    # Process pairs of backticks
-    i = 0
-    while i < len(backtick_positions) - 1:
-        start_pos = backtick_positions[i]
-        end_pos = backtick_positions[i + 1]
-        
-        # Extract the content between backticks
-        code_section = markdown_content[start_pos+3:end_pos]
-        
-        # Check if there's a language specifier on the first line
-        lines = code_section.split('\n', 1)
-        if len(lines) > 1:
-            # Check if first line is a language specifier (no spaces, common language names)
-            first_line = lines[0].strip()
-            if first_line and not ' ' in first_line and len(first_line) < 20:
-                language = first_line
-                code_content = lines[1].strip() if len(lines) > 1 else ""
-            else:
-                language = ""
-                code_content = code_section.strip()
-        else:
-            language = ""
-            code_content = code_section.strip()
-        
-        # Skip if code block is too short
-        if len(code_content) < min_length:
-            i += 2  # Move to next pair
-            continue
+    Args:
+        client: Supabase client
+        query: Query text
+        match_count: Maximum number of results to return
+        filter_metadata: Optional metadata filter
+        query_embedding: Optional precomputed embedding of the query
+        ef_search: Optional HNSW ef_search for this query (higher is more accurate but slower)
+        probes: Optional ivfflat probes for this query (higher is more accurate but slower)
         
-        # Extract context before (1000 chars)
-        context_start = max(0, start_pos - 1000)
-        context_before = markdown_content[context_start:start_pos].strip()
+    Returns:
+        List of matching documents, best fused rank first
+    """
+    if query_embedding is None:
+        query_embedding = create_query_embedding(query)
+    
+    # Without a usable query embedding, the full-text ranking is the only meaningful one
+    if not any(query_embedding):
+        return keyword_search_documents(client, query, match_count, filter_metadata)
+    
+    try:
+        params = {
+            'query_text': query,
+            'query_embedding': query_embedding,
+            'match_count': match_count
+        }
+        if filter_metadata:
+            params['filter'] = filter_metadata
         
-        # Extract context after (1000 chars)
-        context_end = min(len(markdown_content), end_pos + 3 + 1000)
-        context_after = markdown_content[end_pos + 3:context_end].strip()
+        _add_vector_index_params(params, ef_search, probes)
         
-        code_blocks.append({
-            'code': code_content,
-            'language': language,
-            'context_before': context_before,
-            'context_after': context_after,
-            'full_context': f"{context_before}\n\n{code_content}\n\n{context_after}"
-        })
+        result = client.rpc('hybrid_match_crawled_pages', params).execute()
         
-        # Move to next pair (skip the closing backtick we just processed)
-        i += 2
-    
-    return code_blocks
-
+        return result.data
+    except Exception as e:
+        print(f"Error in hybrid document search: {e}. Falling back to vector search.")
+        return search_documents(client, query, match_count, filter_metadata, query_embedding, ef_search, probes)
 
-def generate_code_example_summary(code: str, context_before: str, context_after: str) -> str:
+async def hybrid_search_documents_async(
+    client: Client, 
+    query: str, 
+    match_count: int = 10, 
+    filter_metadata: Optional[Dict[str, Any]] = None,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None
+) -> List[Dict[str, Any]]:
     """
-    Generate a summary for a code example using its surrounding context.
+    Search for documents with vector similarity and full-text search without blocking the event loop.
     
     Args:
-        code: The code example
-        context_before: Context before the code
-        context_after: Context after the code
+        client: Supabase client
+        query: Query text
+        match_count: Maximum number of results to return
+        filter_metadata: Optional metadata filter
+        ef_search: Optional HNSW ef_search for this query (higher is more accurate but slower)
+        probes: Optional ivfflat probes for this query (higher is more accurate but slower)
         
     Returns:
-        A summary of what the code example demonstrates
+        List of matching documents, best fused rank first
     """
-    # Get the appropriate LLM client and model
-    llm_client, model_name = get_llm_client_and_model()
-    
-    if not llm_client:
-        print(f"No LLM client available (provider: {LLM_PROVIDER}). Using default summary.")
-        return "Code example for demonstration purposes."
-    
-    # Create the prompt
+    query_embedding = await create_query_embedding_async(query)
+    return await asyncio.to_thread(
+        hybrid_search_documents, client, query, match_count, filter_metadata, query_embedding, ef_search, probes
+    )
+
+
+def _submit_code_example_summary(llm_client: Any, model_name: str, code: str, context_before: str, context_after: str) -> concurrent.futures.Future:
+    """Queue the LLM request summarizing one code example."""
     prompt = f"""<context_before>
 {context_before[-500:] if len(context_before) > 500 else context_before}
 </context_before>
@@ -589,17 +1422,22 @@ def generate_code_example_summary(code: str, context_before: str, context_after:
 Based on the code example and its surrounding context, provide a concise summary (2-3 sentences) that describes what this code example demonstrates and its purpose. Focus on the practical application and key concepts illustrated.
 """
     
+    return _submit_chat_completion(
+        llm_client,
+        model_name,
+        [
+            {"role": "system", "content": "You are a helpful assistant that provides concise code example summaries."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.3,
+        max_tokens=100
+    )
+
+
+def _collect_code_example_summary(future: concurrent.futures.Future) -> str:
+    """Wait for a code example summary request, falling back to the default summary on errors."""
     try:
-        response = llm_client.chat.completions.create(
-            model=model_name,
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that provides concise code example summaries."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=100
-        )
-        
+        response = future.result()
         return response.choices[0].message.content.strip()
     
     except Exception as e:
@@ -607,6 +1445,54 @@ Based on the code example and its surrounding context, provide a concise summary
         return "Code example for demonstration purposes."
 
 
+def generate_code_example_summary(code: str, context_before: str, context_after: str) -> str:
+    """
+    Generate a summary for a code example using its surrounding context.
+    
+    Args:
+        code: The code example
+        context_before: Context before the code
+        context_after: Context after the code
+        
+    Returns:
+        A summary of what the code example demonstrates
+    """
+    return generate_code_example_summaries([{
+        'code': code,
+        'context_before': context_before,
+        'context_after': context_after
+    }])[0]
+
+
+def generate_code_example_summaries(code_blocks: List[Dict[str, Any]]) -> List[str]:
+    """
+    Generate summaries for several code examples.
+    
+    All requests are queued on the process-wide LLM scheduler before waiting on any of
+    them, so they run concurrently up to the scheduler's limits.
+    
+    Args:
+        code_blocks: Code blocks as returned by extract_code_blocks
+        
+    Returns:
+        One summary per code block, in input order
+    """
+    # Get the appropriate LLM client and model
+    llm_client, model_name = get_llm_client_and_model()
+    
+    if not llm_client:
+        print(f"No LLM client available (provider: {LLM_PROVIDER}). Using default summary.")
+        return ["Code example for demonstration purposes."] * len(code_blocks)
+    
+    futures = [
+        _submit_code_example_summary(
+            llm_client, model_name, block['code'], block['context_before'], block['context_after']
+        )
+        for block in code_blocks
+    ]
+    return [_collect_code_example_summary(future) for future in futures]
+
+
 def add_code_examples_to_supabase(
     client: Client,
     urls: List[str],
@@ -639,6 +1525,18 @@ def add_code_examples_to_supabase(
         except Exception as e:
             print(f"Error deleting existing code examples for {url}: {e}")
     
+    bulk_loader = get_bulk_loader()
+    
+    def write_batch(rows):
+        nonlocal bulk_loader
+        if bulk_loader:
+            try:
+                return bulk_loader.copy_rows("code_examples", rows if isinstance(rows, list) else [rows])
+            except BulkLoaderUnavailable:
+                # Postgres went away: write this and later batches through REST
+                bulk_loader = None
+        return client.table('code_examples').insert(rows).execute()
+    
     # Process in batches
     total_items = len(urls)
     for i in range(0, total_items, batch_size):
@@ -689,7 +1587,7 @@ def add_code_examples_to_supabase(
         
         for retry in range(max_retries):
             try:
-                client.table('code_examples').insert(batch_data).execute()
+                write_batch(batch_data)
                 # Success - break out of retry loop
                 break
             except Exception as e:
@@ -706,7 +1604,7 @@ def add_code_examples_to_supabase(
                     successful_inserts = 0
                     for record in batch_data:
                         try:
-                            client.table('code_examples').insert(record).execute()
+                            write_batch(record)
                             successful_inserts += 1
                         except Exception as individual_error:
                             print(f"Failed to insert individual record for URL {record['url']}: {individual_error}")
@@ -789,15 +1687,16 @@ The above content is from the documentation for '{source_id}'. Please provide a
     
     try:
         # Call the LLM API to generate the summary
-        response = llm_client.chat.completions.create(
-            model=model_name,
-            messages=[
+        response = _submit_chat_completion(
+            llm_client,
+            model_name,
+            [
                 {"role": "system", "content": "You are a helpful assistant that provides concise library/tool/framework summaries."},
                 {"role": "user", "content": prompt}
             ],
             temperature=0.3,
             max_tokens=150
-        )
+        ).result()
         
         # Extract the generated summary
         summary = response.choices[0].message.content.strip()
@@ -813,12 +1712,63 @@ The above content is from the documentation for '{source_id}'. Please provide a
         return default_summary
 
 
-def search_code_examples(
+def enhance_code_query(query: str) -> str:
+    """
+    Create a more descriptive query for better embedding match against code examples.
+    
+    Since code examples are embedded with their summaries, the query is phrased
+    like a code example summary.
+    """
+    return f"Code example for {query}\n\nSummary: Example code showing {query}"
+
+
+def keyword_search_code_examples(
     client: Client, 
     query: str, 
     match_count: int = 10, 
     filter_metadata: Optional[Dict[str, Any]] = None,
     source_id: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Search for code examples with the full-text index over code and summaries, ranked by ts_rank_cd.
+    
+    Args:
+        client: Supabase client
+        query: Query text in web search syntax (quoted phrases, OR, -exclusions)
+        match_count: Maximum number of results to return
+        filter_metadata: Optional metadata filter
+        source_id: Optional source ID to filter results
+        
+    Returns:
+        List of matching code examples, best rank first, with a similarity derived from the rank
+    """
+    try:
+        params = {
+            'query_text': query,
+            'match_count': match_count
+        }
+        if filter_metadata:
+            params['filter'] = filter_metadata
+        if source_id:
+            params['source_filter'] = source_id
+        
+        result = client.rpc('keyword_match_code_examples', params).execute()
+        
+        return _rank_as_similarity(result.data)
+    except Exception as e:
+        print(f"Error in keyword code example search: {e}")
+        return []
+
+
+def search_code_examples(
+    client: Client, 
+    query: str, 
+    match_count: int = 10, 
+    filter_metadata: Optional[Dict[str, Any]] = None,
+    source_id: Optional[str] = None,
+    query_embedding: Optional[List[float]] = None,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None
 ) -> List[Dict[str, Any]]:
     """
     Search for code examples in Supabase using vector similarity.
@@ -829,16 +1779,20 @@ def search_code_examples(
         match_count: Maximum number of results to return
         filter_metadata: Optional metadata filter
         source_id: Optional source ID to filter results
+        query_embedding: Optional precomputed embedding of the enhanced code query
+        ef_search: Optional HNSW ef_search for this query (higher is more accurate but slower)
+        probes: Optional ivfflat probes for this query (higher is more accurate but slower)
         
     Returns:
         List of matching code examples
     """
-    # Create a more descriptive query for better embedding match
-    # Since code examples are embedded with their summaries, we should make the query more descriptive
-    enhanced_query = f"Code example for {query}\n\nSummary: Example code showing {query}"
-    
     # Create embedding for the enhanced query
-    query_embedding = create_embedding(enhanced_query)
+    if query_embedding is None:
+        query_embedding = create_query_embedding(enhance_code_query(query))
+    
+    # Without a usable query embedding, the full-text ranking is the only meaningful one
+    if not any(query_embedding):
+        return keyword_search_code_examples(client, query, match_count, filter_metadata, source_id)
     
     # Execute the search using the match_code_examples function
     try:
@@ -856,9 +1810,128 @@ def search_code_examples(
         if source_id:
             params['source_filter'] = source_id
         
+        _add_vector_index_params(params, ef_search, probes)
+        
         result = client.rpc('match_code_examples', params).execute()
         
         return result.data
     except Exception as e:
         print(f"Error searching code examples: {e}")
-        return []
\ No newline at end of file
+        return []
+
+
+async def search_code_examples_async(
+    client: Client, 
+    query: str, 
+    match_count: int = 10, 
+    filter_metadata: Optional[Dict[str, Any]] = None,
+    source_id: Optional[str] = None,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Search for code examples in Supabase using vector similarity without blocking the event loop.
+    
+    Args:
+        client: Supabase client
+        query: Query text
+        match_count: Maximum number of results to return
+        filter_metadata: Optional metadata filter
+        source_id: Optional source ID to filter results
+        ef_search: Optional HNSW ef_search for this query (higher is more accurate but slower)
+        probes: Optional ivfflat probes for this query (higher is more accurate but slower)
+        
+    Returns:
+        List of matching code examples
+    """
+    query_embedding = await create_query_embedding_async(enhance_code_query(query))
+    return await asyncio.to_thread(
+        search_code_examples, client, query, match_count, filter_metadata, source_id, query_embedding, ef_search, probes
+    )
+
+
+def hybrid_search_code_examples(
+    client: Client, 
+    query: str, 
+    match_count: int = 10, 
+    filter_metadata: Optional[Dict[str, Any]] = None,
+    source_id: Optional[str] = None,
+    query_embedding: Optional[List[float]] = None,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Search for code examples with vector similarity and full-text search in a single round trip.
+    
+    The hybrid_match_code_examples function fuses both rankings with reciprocal rank fusion
+    in Postgres. If the function does not exist yet, a vector-only search is performed.
+    
+    Args:
+        client: Supabase client
+        query: Query text
+        match_count: Maximum number of results to return
+        filter_metadata: Optional metadata filter
+        source_id: Optional source ID to filter results
+        query_embedding: Optional precomputed embedding of the enhanced code query
+        ef_search: Optional HNSW ef_search for this query (higher is more accurate but slower)
+        probes: Optional ivfflat probes for this query (higher is more accurate but slower)
+        
+    Returns:
+        List of matching code examples, best fused rank first
+    """
+    if query_embedding is None:
+        query_embedding = create_query_embedding(enhance_code_query(query))
+    
+    # Without a usable query embedding, the full-text ranking is the only meaningful one
+    if not any(query_embedding):
+        return keyword_search_code_examples(client, query, match_count, filter_metadata, source_id)
+    
+    try:
+        params = {
+            'query_text': query,
+            'query_embedding': query_embedding,
+            'match_count': match_count
+        }
+        if filter_metadata:
+            params['filter'] = filter_metadata
+        if source_id:
+            params['source_filter'] = source_id
+        
+        _add_vector_index_params(params, ef_search, probes)
+        
+        result = client.rpc('hybrid_match_code_examples', params).execute()
+        
+        return result.data
+    except Exception as e:
+        print(f"Error in hybrid code example search: {e}. Falling back to vector search.")
+        return search_code_examples(client, query, match_count, filter_metadata, source_id, query_embedding, ef_search, probes)
+
+
+async def hybrid_search_code_examples_async(
+    client: Client, 
+    query: str, 
+    match_count: int = 10, 
+    filter_metadata: Optional[Dict[str, Any]] = None,
+    source_id: Optional[str] = None,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Search for code examples with vector similarity and full-text search without blocking the event loop.
+    
+    Args:
+        client: Supabase client
+        query: Query text
+        match_count: Maximum number of results to return
+        filter_metadata: Optional metadata filter
+        source_id: Optional source ID to filter results
+        ef_search: Optional HNSW ef_search for this query (higher is more accurate but slower)
+        probes: Optional ivfflat probes for this query (higher is more accurate but slower)
+        
+    Returns:
+        List of matching code examples, best fused rank first
+    """
+    query_embedding = await create_query_embedding_async(enhance_code_query(query))
+    return await asyncio.to_thread(
+        hybrid_search_code_examples, client, query, match_count, filter_metadata, source_id, query_embedding, ef_search, probes
+    )
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Test script for the token-aware markdown chunker.
+
+Tokens are counted as whitespace-separated words so the expected chunk boundaries
+don't depend on the tokenizer. Runs with pytest or as a script.
+"""
+import sys
+from pathlib import Path
+
+# Add src directory to path
+src_path = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_path))
+
+from chunking import chunk_markdown, chunk_markdown_sections, parse_blocks
+
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+
+def paragraph(name: str, words: int, sentence_length: int = 8) -> str:
+    """A paragraph of numbered words, with a sentence end every sentence_length words."""
+    return " ".join(
+        f"{name}w{i}." if (i + 1) % sentence_length == 0 else f"{name}w{i}"
+        for i in range(words)
+    )
+
+
+def test_empty_document():
+    """Empty and whitespace-only documents have no chunks"""
+    assert chunk_markdown_sections("", 100, count_tokens=count_words) == []
+    assert chunk_markdown_sections(" \n\n\t\n", 100, count_tokens=count_words) == []
+
+
+def test_heading_only_document():
+    """A document of headings only becomes one chunk with its breadcrumb"""
+    chunks = chunk_markdown_sections("# Guide\n\n## Install\n\n### Linux", 100, count_tokens=count_words)
+    assert len(chunks) == 1
+    assert chunks[0].text == "# Guide\n\n## Install\n\n### Linux"
+    assert chunks[0].section == ["Guide", "Install", "Linux"]
+    assert chunks[0].headers == ["# Guide", "## Install", "### Linux"]
+
+
+def test_section_paths():
+    """Chunks start at headings and record the heading path of their content"""
+    text = "\n\n".join([
+        "# Guide", paragraph("a", 40),
+        "## Install", paragraph("b", 40),
+        "### Linux ###", paragraph("c", 40),
+        "## Usage", paragraph("d", 40)
+    ])
+    chunks = chunk_markdown_sections(text, 60, count_tokens=count_words)
+    assert [chunk.section for chunk in chunks] == [
+        ["Guide"], ["Guide", "Install"], ["Guide", "Install", "Linux"], ["Guide", "Usage"]
+    ]
+    # Each chunk starts with its heading rather than ending with the next one
+    assert all(chunk.text.startswith("#") for chunk in chunks)
+    metadata = chunks[2].metadata()
+    assert metadata["section_path"] == "Guide > Install > Linux"
+    assert metadata["section_headings"] == ["Guide", "Install", "Linux"]
+    assert metadata["token_count"] == count_words(chunks[2].text)
+
+
+def test_chunks_stay_within_budget():
+    """Paragraphs longer than the budget are split at sentences, chunks stay within it"""
+    text = "# Long\n\n" + paragraph("a", 500)
+    chunks = chunk_markdown_sections(text, 50, count_tokens=count_words)
+    assert len(chunks) > 1
+    assert all(chunk.token_count <= 50 for chunk in chunks)
+    # Every word is kept, in order
+    assert " ".join(chunk_markdown(text, 50, count_tokens=count_words)).split() == text.split()
+
+
+def test_code_blocks_are_never_split():
+    """Fenced code blocks stay whole, even when longer than the budget"""
+    code = "```python\n" + "\n".join(f"x_{i} = {i}  # comment" for i in range(100)) + "\n```"
+    text = "\n\n".join(["# Code", paragraph("a", 20), code, paragraph("b", 20)])
+    chunks = chunk_markdown_sections(text, 60, count_tokens=count_words)
+    assert sum(code in chunk.text for chunk in chunks) == 1
+    assert all(chunk.text.count("```") % 2 == 0 for chunk in chunks)
+
+
+def test_fence_contents_are_not_headings():
+    """Lines starting with # inside a fence don't start sections"""
+    text = "# Script\n\n~~~bash\n# install the package\npip install crawl4ai\n~~~\n\nDone."
+    blocks = parse_blocks(text, count_words)
+    assert [block.kind for block in blocks] == ["heading", "code", "text"]
+    assert all(block.path == ("Script",) for block in blocks)
+
+
+def test_fence_matching():
+    """A fence closes only on the same character at least as long, an unclosed one runs to the end"""
+    text = "````markdown\n```python\nprint(1)\n```\n````\n\nAfter.\n\n```\nnever closed\n\n# not a heading"
+    blocks = parse_blocks(text, count_words)
+    assert [block.kind for block in blocks] == ["code", "text", "code"]
+    assert text[blocks[0].start:blocks[0].end].endswith("```\n````")
+    assert text[blocks[2].start:blocks[2].end].endswith("# not a heading")
+
+
+def test_inline_code_is_not_a_fence():
+    """A line starting with inline triple-backtick code is a paragraph"""
+    blocks = parse_blocks("```inline``` code\n\n# Heading", count_words)
+    assert [block.kind for block in blocks] == ["text", "heading"]
+
+
+def test_overlap_with_whole_paragraphs():
+    """Trailing paragraphs that fit the overlap are repeated at the start of the next chunk"""
+    paragraphs = [paragraph(f"p{i}", 10) for i in range(6)]
+    chunks = chunk_markdown_sections("\n\n".join(paragraphs), 30, 10, count_words)
+    assert len(chunks) > 1
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.text.startswith(previous.text.split("\n\n")[-1])
+    assert all(chunk.token_count <= 30 for chunk in chunks)
+
+
+def test_overlap_splits_long_paragraphs():
+    """A paragraph longer than the overlap is repeated from a sentence or word boundary"""
+    paragraphs = [paragraph(f"p{i}", 56) for i in range(4)]
+    chunks = chunk_markdown_sections("\n\n".join(paragraphs), 100, 30, count_words)
+    assert len(chunks) == 4
+    for i, chunk in enumerate(chunks[1:]):
+        overlap = chunk.text.split("\n\n")[0]
+        assert paragraphs[i].endswith(overlap)
+        # Cut at a sentence end: the overlap starts right after a "."
+        assert paragraphs[i][:-len(overlap)].rstrip().endswith(".")
+        assert 0 < count_words(overlap) <= 30
+
+    # The overlap is limited by the room left next to the block that starts the chunk
+    chunks = chunk_markdown_sections("\n\n".join(paragraphs), 60, 30, count_words)
+    assert all(chunk.token_count <= 60 for chunk in chunks)
+    assert all(count_words(chunk.text.split("\n\n")[0]) == 4 for chunk in chunks[1:])
+
+
+def test_no_overlap_across_sections():
+    """A chunk starting a new section doesn't repeat the end of the previous section"""
+    text = "\n\n".join(["# One", paragraph("a", 40), "# Two", paragraph("b", 40)])
+    chunks = chunk_markdown_sections(text, 50, 20, count_words)
+    assert [chunk.section for chunk in chunks] == [["One"], ["Two"]]
+    assert chunks[1].text.startswith("# Two")
+
+
+def test_overlap_does_not_repeat_code_partially():
+    """Code blocks are only repeated whole"""
+    code = "```\n" + " ".join(f"c{i}" for i in range(20)) + "\n```"
+    text = "\n\n".join([paragraph("a", 20), code, paragraph("b", 30)])
+    chunks = chunk_markdown_sections(text, 50, 10, count_words)
+    assert len(chunks) == 2
+    assert chunks[1].text.startswith(paragraph("b", 30))
+
+
+TESTS = [
+    test_empty_document,
+    test_heading_only_document,
+    test_section_paths,
+    test_chunks_stay_within_budget,
+    test_code_blocks_are_never_split,
+    test_fence_contents_are_not_headings,
+    test_fence_matching,
+    test_inline_code_is_not_a_fence,
+    test_overlap_with_whole_paragraphs,
+    test_overlap_splits_long_paragraphs,
+    test_no_overlap_across_sections,
+    test_overlap_does_not_repeat_code_partially
+]
+
+if __name__ == "__main__":
+    print("Testing Markdown Chunking")
+    print("=" * 50)
+    failed = 0
+    for test in TESTS:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__doc__}: {e or 'assertion failed'}")
+
+    print("\n" + "=" * 50)
+    print(f"🎉 SUCCESS: all {len(TESTS)} tests passed!" if not failed else f"❌ FAILED: {failed}/{len(TESTS)} tests failed.")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test script for fenced code block extraction.
+
+Runs with pytest or as a script.
+"""
+import pickle
+import sys
+from pathlib import Path
+
+# Add src directory to path
+src_path = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_path))
+
+from code_blocks import extract_code_blocks, iter_fenced_blocks, parse_min_lengths
+
+
+def test_backtick_and_tilde_fences():
+    """Backtick and tilde fences are found with their language"""
+    markdown = "Intro\n\n```Python\nprint(1)\n```\n\nMiddle\n\n~~~bash extra info\nls -la\n~~~\n\nEnd"
+    blocks = list(iter_fenced_blocks(markdown))
+    assert [(block.language, block.code) for block in blocks] == [("python", "print(1)"), ("bash", "ls -la")]
+    assert blocks[0].context_before == "Intro"
+    assert blocks[0].context_after.startswith("Middle")
+    assert blocks[1].context_after == "End"
+    assert blocks[0]["code"] == "print(1)"
+
+
+def test_nested_fences():
+    """A fence only closes on the same character and at least the same length"""
+    markdown = "````markdown\n```python\nprint(1)\n```\n~~~~\n````\n\n```\nafter\n```"
+    blocks = list(iter_fenced_blocks(markdown))
+    assert len(blocks) == 2
+    assert blocks[0].language == "markdown"
+    assert blocks[0].code == "```python\nprint(1)\n```\n~~~~"
+    assert blocks[1].code == "after"
+
+
+def test_inline_code_is_not_a_fence():
+    """Inline triple-backtick code doesn't open a block"""
+    markdown = "Use ```pip install x``` to install.\n\n```\ncode\n```"
+    blocks = list(iter_fenced_blocks(markdown))
+    assert [block.code for block in blocks] == ["code"]
+
+
+def test_indented_fences():
+    """Fences indented by up to 3 spaces count, 4 spaces is an indented code line"""
+    markdown = "   ```js\n   let a = 1\n   ```\n\n    ```\n    not a fence\n    ```"
+    blocks = list(iter_fenced_blocks(markdown))
+    assert [block.language for block in blocks] == ["js"]
+
+
+def test_unclosed_fence():
+    """An unclosed fence runs to the end of the document"""
+    markdown = "```python\n\ndef f():\n    return 1\n"
+    blocks = list(iter_fenced_blocks(markdown))
+    assert len(blocks) == 1
+    assert blocks[0].code == "def f():\n    return 1"
+    assert blocks[0].end == len(markdown)
+    assert blocks[0].context_after == ""
+
+
+def test_minimum_lengths():
+    """Blocks shorter than the minimum length of their language are skipped"""
+    markdown = "```bash\n" + "x" * 50 + "\n```\n\n```python\n" + "y" * 50 + "\n```\n\n```\n" + "z" * 150 + "\n```"
+    assert [block.language for block in extract_code_blocks(markdown, 100)] == [""]
+    assert [block.language for block in extract_code_blocks(markdown, 100, {"bash": 10})] == ["bash", ""]
+    assert extract_code_blocks(markdown, 1000, {}) == []
+
+
+def test_parse_min_lengths():
+    """Per-language minimums are parsed from language=length pairs"""
+    assert parse_min_lengths("Bash=200, shell = 200,python=800") == {"bash": 200, "shell": 200, "python": 800}
+    assert parse_min_lengths("bash=abc,=5,python") == {}
+    assert parse_min_lengths(None) == {}
+
+
+def test_pickling_drops_the_document():
+    """Pickled blocks carry their offsets but not the document"""
+    markdown = "Before\n\n```python\nprint(1)\n```\n"
+    block = next(iter_fenced_blocks(markdown))
+    copy = pickle.loads(pickle.dumps(block))
+    assert copy.document is None
+    assert (copy.start, copy.end, copy.code_start, copy.code_end) == (block.start, block.end, block.code_start, block.code_end)
+    copy.document = markdown
+    assert copy.code == "print(1)"
+
+
+TESTS = [
+    test_backtick_and_tilde_fences,
+    test_nested_fences,
+    test_inline_code_is_not_a_fence,
+    test_indented_fences,
+    test_unclosed_fence,
+    test_minimum_lengths,
+    test_parse_min_lengths,
+    test_pickling_drops_the_document
+]
+
+if __name__ == "__main__":
+    print("Testing Code Block Extraction")
+    print("=" * 50)
+    failed = 0
+    for test in TESTS:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__doc__}: {e or 'assertion failed'}")
+
+    print("\n" + "=" * 50)
+    print(f"🎉 SUCCESS: all {len(TESTS)} tests passed!" if not failed else f"❌ FAILED: {failed}/{len(TESTS)} tests failed.")
+    sys.exit(1 if failed else 0)
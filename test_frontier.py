@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Test script for the frontier-based recursive crawler.
+
+Pages are served by a fake crawler over an in-memory link graph, so no browser or
+network is needed. Runs with pytest or as a script.
+"""
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add src directory to path
+src_path = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_path))
+
+from frontier import FrontierCrawler, VisitedSet, canonicalize_url
+
+
+class FakeCrawler:
+    """Serve pages from a {url: [linked urls]} graph, recording the crawl order and concurrency."""
+
+    def __init__(self, pages, delay=0.0, fail=()):
+        self.pages = pages
+        self.delay = delay
+        self.fail = set(fail)
+        self.crawled = []
+        self.active = 0
+        self.max_active = 0
+
+    async def arun(self, url, config=None):
+        self.crawled.append(url)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if url in self.fail:
+                raise RuntimeError("navigation failed")
+            links = [{"href": href} for href in self.pages.get(url, [])]
+            return SimpleNamespace(url=url, success=url in self.pages, links={"internal": links, "external": []})
+        finally:
+            self.active -= 1
+
+
+def run_crawl(frontier, start_urls):
+    async def collect():
+        return [result.url async for result in frontier.crawl(start_urls)]
+    return asyncio.run(collect())
+
+
+# A three level site: / links to /a and /b, which link to deeper pages
+SITE = {
+    "https://example.com/": ["https://example.com/a", "https://example.com/b#top", "https://example.com/"],
+    "https://example.com/a": ["https://example.com/a/1", "https://example.com/a/2", "https://example.com/b/"],
+    "https://example.com/b": ["https://example.com/b/1"],
+    "https://example.com/a/1": ["https://example.com/a/1/x"],
+    "https://example.com/a/2": [],
+    "https://example.com/b/1": [],
+    "https://example.com/a/1/x": []
+}
+
+
+def test_canonicalize_url():
+    """Different spellings of a URL canonicalize to the same string"""
+    assert canonicalize_url("HTTPS://Example.COM:443/docs/?b=2&utm_source=x&a=1#intro") == "https://example.com/docs?a=1&b=2"
+    assert canonicalize_url("http://user:pw@example.com:80") == "http://example.com/"
+    assert canonicalize_url("http://example.com:8080/a//") == "http://example.com:8080/a"
+    assert canonicalize_url("https://example.com/p?fbclid=1&gclid=2") == "https://example.com/p"
+    assert canonicalize_url("https://example.com/p?page=2", strip_query=True) == "https://example.com/p"
+
+
+def test_visited_set():
+    """The visited set reports whether a URL was new"""
+    visited = VisitedSet()
+    assert visited.add("https://example.com/")
+    assert not visited.add("https://example.com/")
+    assert "https://example.com/" in visited
+    assert "https://example.com/other" not in visited
+    assert len(visited) == 1
+
+
+def test_crawl_respects_depth():
+    """Links are followed up to max_depth levels, each page once"""
+    crawler = FakeCrawler(SITE)
+    urls = run_crawl(FrontierCrawler(crawler, None, max_depth=2), ["https://example.com"])
+    assert sorted(urls) == ["https://example.com/", "https://example.com/a", "https://example.com/b"]
+
+    crawler = FakeCrawler(SITE)
+    urls = run_crawl(FrontierCrawler(crawler, None, max_depth=3), ["https://example.com/"])
+    assert len(urls) == len(set(urls)) == 6
+    assert "https://example.com/a/1/x" not in urls
+
+
+def test_crawl_is_shallowest_first():
+    """With one crawl slot, pages are crawled in depth order"""
+    crawler = FakeCrawler(SITE)
+    run_crawl(FrontierCrawler(crawler, None, max_depth=4, max_concurrent=1), ["https://example.com/"])
+    depths = [url.rstrip("/").count("/") - 2 for url in crawler.crawled]
+    assert depths == sorted(depths)
+    assert len(crawler.crawled) == 7
+
+
+def test_crawl_respects_max_pages():
+    """No more than max_pages pages are crawled"""
+    crawler = FakeCrawler(SITE)
+    frontier = FrontierCrawler(crawler, None, max_depth=4, max_pages=3)
+    urls = run_crawl(frontier, ["https://example.com/"])
+    assert len(urls) == len(crawler.crawled) == frontier.pages_dispatched == 3
+
+
+def test_crawl_respects_concurrency_limits():
+    """At most max_per_host pages of one host are crawled at once"""
+    pages = {"https://example.com/": [f"https://example.com/{i}" for i in range(10)]}
+    pages.update({f"https://example.com/{i}": [] for i in range(10)})
+    crawler = FakeCrawler(pages, delay=0.01)
+    run_crawl(FrontierCrawler(crawler, None, max_depth=2, max_concurrent=8, max_per_host=3), ["https://example.com/"])
+    assert len(crawler.crawled) == 11
+    assert crawler.max_active == 3
+
+
+def test_failed_pages_are_skipped():
+    """Pages that raise are skipped, unsuccessful results are yielded without following links"""
+    pages = dict(SITE)
+    del pages["https://example.com/b"]
+    crawler = FakeCrawler(pages, fail=["https://example.com/a"])
+    urls = run_crawl(FrontierCrawler(crawler, None, max_depth=3), ["https://example.com/"])
+    assert sorted(urls) == ["https://example.com/", "https://example.com/b"]
+
+
+TESTS = [
+    test_canonicalize_url,
+    test_visited_set,
+    test_crawl_respects_depth,
+    test_crawl_is_shallowest_first,
+    test_crawl_respects_max_pages,
+    test_crawl_respects_concurrency_limits,
+    test_failed_pages_are_skipped
+]
+
+if __name__ == "__main__":
+    print("Testing Frontier Crawler")
+    print("=" * 50)
+    failed = 0
+    for test in TESTS:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__doc__}: {e or 'assertion failed'}")
+
+    print("\n" + "=" * 50)
+    print(f"🎉 SUCCESS: all {len(TESTS)} tests passed!" if not failed else f"❌ FAILED: {failed}/{len(TESTS)} tests failed.")
+    sys.exit(1 if failed else 0)
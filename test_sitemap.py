@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Test script for the incremental sitemap reader.
+
+Sitemaps are served by an httpx mock transport, so no network is needed. Runs with
+pytest or as a script.
+"""
+import asyncio
+import gzip
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+# Add src directory to path
+src_path = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_path))
+
+from sitemap import MAX_SITEMAP_DEPTH, SitemapEntry, iter_sitemap_entries, parse_lastmod
+
+NAMESPACE = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+
+def urlset(*entries):
+    """Build a <urlset> from (loc, lastmod) pairs, lastmod may be None."""
+    urls = "".join(
+        f"<url><loc>{loc}</loc>{f'<lastmod>{lastmod}</lastmod>' if lastmod else ''}</url>"
+        for loc, lastmod in entries
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?><urlset {NAMESPACE}>{urls}</urlset>'.encode()
+
+
+def sitemapindex(*entries):
+    """Build a <sitemapindex> from (loc, lastmod) pairs, lastmod may be None."""
+    sitemaps = "".join(
+        f"<sitemap><loc>{loc}</loc>{f'<lastmod>{lastmod}</lastmod>' if lastmod else ''}</sitemap>"
+        for loc, lastmod in entries
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex {NAMESPACE}>{sitemaps}</sitemapindex>'.encode()
+
+
+def read_sitemap(files, url, **kwargs):
+    """Read a sitemap served from a {url: body} dictionary, returning the entries and requested URLs."""
+    requested = []
+
+    def handler(request):
+        requested.append(str(request.url))
+        body = files.get(str(request.url))
+        if body is None:
+            return httpx.Response(404)
+        return httpx.Response(200, content=body)
+
+    async def collect():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return [entry async for entry in iter_sitemap_entries(url, client=client, **kwargs)]
+
+    return asyncio.run(collect()), requested
+
+
+def test_parse_lastmod():
+    """lastmod dates are parsed as UTC unless they carry an offset"""
+    assert parse_lastmod("2024-05-01") == datetime(2024, 5, 1, tzinfo=timezone.utc)
+    assert parse_lastmod("2024-05-01T10:00:00+02:00") == datetime(2024, 5, 1, 8, tzinfo=timezone.utc)
+    assert parse_lastmod("not a date") is None
+    assert parse_lastmod(None) is None
+
+
+def test_urlset():
+    """Pages of a urlset are yielded in order with their lastmod"""
+    files = {"https://example.com/sitemap.xml": urlset(("https://example.com/a", "2024-01-01"), ("https://example.com/b", None))}
+    entries, _ = read_sitemap(files, "https://example.com/sitemap.xml")
+    assert entries == [SitemapEntry("https://example.com/a", "2024-01-01"), SitemapEntry("https://example.com/b")]
+
+
+def test_sitemap_index():
+    """Child sitemaps of an index are read, including gzipped and missing ones"""
+    files = {
+        "https://example.com/sitemap.xml": sitemapindex(
+            ("https://example.com/docs.xml", None),
+            ("https://example.com/blog.xml.gz", None),
+            ("https://example.com/missing.xml", None)
+        ),
+        "https://example.com/docs.xml": urlset(("https://example.com/docs/1", None), ("https://example.com/docs/2", None)),
+        "https://example.com/blog.xml.gz": gzip.compress(urlset(("https://example.com/blog/1", None)))
+    }
+    entries, requested = read_sitemap(files, "https://example.com/sitemap.xml")
+    assert sorted(entry.url for entry in entries) == [
+        "https://example.com/blog/1", "https://example.com/docs/1", "https://example.com/docs/2"
+    ]
+    assert "https://example.com/missing.xml" in requested
+
+
+def test_lastmod_filter():
+    """Pages and child sitemaps older than lastmod_since are skipped"""
+    files = {
+        "https://example.com/sitemap.xml": sitemapindex(
+            ("https://example.com/old.xml", "2020-01-01"),
+            ("https://example.com/new.xml", "2024-06-01")
+        ),
+        "https://example.com/old.xml": urlset(("https://example.com/old", "2020-01-01")),
+        "https://example.com/new.xml": urlset(
+            ("https://example.com/stale", "2023-12-31"),
+            ("https://example.com/fresh", "2024-05-01T00:00:00Z"),
+            ("https://example.com/undated", None)
+        )
+    }
+    entries, requested = read_sitemap(files, "https://example.com/sitemap.xml", lastmod_since="2024-01-01")
+    assert sorted(entry.url for entry in entries) == ["https://example.com/fresh", "https://example.com/undated"]
+    assert "https://example.com/old.xml" not in requested
+
+
+def test_nested_index_depth():
+    """Nested indexes are followed up to MAX_SITEMAP_DEPTH levels and cycles are read once"""
+    files = {}
+    for level in range(MAX_SITEMAP_DEPTH + 2):
+        files[f"https://example.com/index{level}.xml"] = sitemapindex(
+            (f"https://example.com/index{level + 1}.xml", None),
+            (f"https://example.com/pages{level}.xml", None),
+            ("https://example.com/index0.xml", None)
+        )
+        files[f"https://example.com/pages{level}.xml"] = urlset((f"https://example.com/page{level}", None))
+
+    entries, requested = read_sitemap(files, "https://example.com/index0.xml")
+    assert sorted(entry.url for entry in entries) == [f"https://example.com/page{level}" for level in range(MAX_SITEMAP_DEPTH)]
+    assert requested.count("https://example.com/index0.xml") == 1
+    assert f"https://example.com/index{MAX_SITEMAP_DEPTH + 1}.xml" not in requested
+
+
+def test_invalid_xml():
+    """A malformed child sitemap doesn't stop the others"""
+    files = {
+        "https://example.com/sitemap.xml": sitemapindex(("https://example.com/bad.xml", None), ("https://example.com/good.xml", None)),
+        "https://example.com/bad.xml": b"<urlset><url><loc>oops</url>",
+        "https://example.com/good.xml": urlset(("https://example.com/good", None))
+    }
+    entries, _ = read_sitemap(files, "https://example.com/sitemap.xml")
+    assert [entry.url for entry in entries] == ["https://example.com/good"]
+
+
+TESTS = [
+    test_parse_lastmod,
+    test_urlset,
+    test_sitemap_index,
+    test_lastmod_filter,
+    test_nested_index_depth,
+    test_invalid_xml
+]
+
+if __name__ == "__main__":
+    print("Testing Sitemap Reader")
+    print("=" * 50)
+    failed = 0
+    for test in TESTS:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__doc__}: {e or 'assertion failed'}")
+
+    print("\n" + "=" * 50)
+    print(f"🎉 SUCCESS: all {len(TESTS)} tests passed!" if not failed else f"❌ FAILED: {failed}/{len(TESTS)} tests failed.")
+    sys.exit(1 if failed else 0)